@@ -0,0 +1,213 @@
+"""
+Read-only JSON API for the Tournament Manager application.
+
+Responses are built straight from Core SELECT row tuples rather than ORM
+objects: each table is sent as a list of column names plus a list of row
+arrays, which keeps both the serialisation cost and the payload small.
+
+Every response carries the tournament's version. The ETag is derived from
+the URL and that version, so a client revalidating with If-None-Match gets
+a 304 after a single primary-key lookup. /matches?since=<version> returns
+only the matches changed after that version, letting a scoreboard poll for
+deltas instead of the whole schedule. Encoded bodies are kept in the page
+cache under the same version token, and gzip is applied when the client
+accepts it and the body is large enough to benefit.
+
+/tournaments lists tournaments a page at a time by keyset cursor, with the
+same filters and search as the home page (see queries.tournament_page).
+"""
+
+import gzip
+import hashlib
+import json
+from datetime import date, time
+
+from flask import Blueprint, jsonify, make_response, request
+from sqlalchemy import select
+
+from models import db, Tournament, Group, Team, Match
+import cache
+import queries
+import ranking
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+GZIP_MIN_BYTES = 512
+
+GROUP_COLUMNS = (Group.id, Group.name)
+TEAM_COLUMNS = (Team.id, Team.name, Team.group_id)
+STANDING_FIELDS = ('group_id', 'team_id', 'team_name', 'played', 'wins', 'draws', 'losses',
+                   'goals_for', 'goals_against', 'points')
+MATCH_COLUMNS = (Match.id, Match.stage, Match.group_name, Match.bracket_slot, Match.match_date,
+                 Match.match_time, Match.venue, Match.home_team_id, Match.home_team_name,
+                 Match.away_team_id, Match.away_team_name, Match.home_score, Match.away_score,
+                 Match.status, Match.updated_version)
+LISTING_FIELDS = ('id', 'name', 'start_date', 'end_date', 'status', 'created_at',
+                  'group_count', 'team_count', 'match_count')
+
+
+def _encode(value):
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def dumps(payload):
+    """Serialise a payload as compact JSON text."""
+    return json.dumps(payload, separators=(',', ':'), default=_encode)
+
+
+def _table(columns, statement):
+    """Return {'columns': [...], 'rows': [[...], ...]} for a Core SELECT."""
+    return {
+        'columns': [column.key for column in columns],
+        'rows': [list(row) for row in db.session.execute(statement)],
+    }
+
+
+def _not_found():
+    return jsonify({'error': 'Tournament not found'}), 404
+
+
+def _cached(page_cache, key):
+    return page_cache.backend.get(key) if page_cache.backend else None
+
+
+def _store(page_cache, key, body):
+    if page_cache.backend:
+        page_cache.backend.set(key, body)
+
+
+def versioned_json(name, build):
+    """Serve ``build(tournament_id, version)`` as JSON, cached by tournament version.
+
+    The version is read before the payload, so a write that lands in between
+    can only make the body newer than its ETag, never older; a client
+    polling with ?since= simply receives those rows again next time.
+    """
+    def view(tournament_id):
+        token = cache.tournament_token(tournament_id)
+        if token is None:
+            return _not_found()
+        version, last_modified = token
+
+        use_gzip = 'gzip' in request.accept_encodings
+        key = ':'.join(['api', name, str(tournament_id), request.query_string.decode(), version])
+        etag = hashlib.sha1(key.encode()).hexdigest()
+
+        # Only compressed bodies get the -gz ETag; small ones are sent as they are either way
+        page_cache = cache.get_cache()
+        tags = (etag + '-gz', etag) if use_gzip else (etag,)
+        matched = next((tag for tag in tags if request.if_none_match.contains(tag)), None)
+        if matched is not None:
+            page_cache.count('not_modified')
+            response = make_response('', 304)
+            etag = matched
+        else:
+            body = _cached(page_cache, key + ':gz') if use_gzip else None
+            gzipped = body is not None
+            if body is None:
+                body = _cached(page_cache, key)
+                if body is None:
+                    page_cache.count('misses')
+                    payload = build(tournament_id, int(version))
+                    body = dumps(payload).encode()
+                    _store(page_cache, key, body)
+                else:
+                    page_cache.count('hits')
+                if use_gzip and len(body) >= GZIP_MIN_BYTES:
+                    body = gzip.compress(body, compresslevel=5)
+                    gzipped = True
+                    _store(page_cache, key + ':gz', body)
+            else:
+                page_cache.count('hits')
+
+            response = make_response(body)
+            response.mimetype = 'application/json'
+            if gzipped:
+                response.headers['Content-Encoding'] = 'gzip'
+                etag += '-gz'
+
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        if last_modified is not None:
+            response.last_modified = last_modified
+        response.cache_control.no_cache = True
+        return response
+
+    view.__name__ = name
+    return view
+
+
+def _tournament_payload(tournament_id, version):
+    tournament = db.session.execute(
+        select(Tournament.id, Tournament.name, Tournament.start_date, Tournament.end_date,
+               Tournament.status).where(Tournament.id == tournament_id)
+    ).one()
+    payload = dict(tournament._mapping)
+    payload['version'] = version
+    payload['groups'] = _table(GROUP_COLUMNS, select(*GROUP_COLUMNS)
+                               .where(Group.tournament_id == tournament_id)
+                               .order_by(Group.id))
+    payload['teams'] = _table(TEAM_COLUMNS, select(*TEAM_COLUMNS)
+                              .join(Group, Group.id == Team.group_id)
+                              .where(Group.tournament_id == tournament_id)
+                              .order_by(Team.group_id, Team.id))
+    return payload
+
+
+def standings_table(tournament_id, team_ids=None):
+    """Return the standings table in ranking order, limited to the groups of ``team_ids`` if given."""
+    tables = ranking.tournament_tables(tournament_id)
+    if team_ids is not None:
+        team_ids = set(team_ids)
+        tables = [table for table in tables if any(row['team_id'] in team_ids for row in table.rows)]
+    return {
+        'columns': list(STANDING_FIELDS),
+        'rows': [[row['group_id'], row['team_id'], row['name']] + [row[field] for field in STANDING_FIELDS[3:]]
+                 for table in tables for row in table.rows],
+    }
+
+
+def matches_table(tournament_id, since=0):
+    """Return the matches table, limited to matches changed after version ``since``."""
+    statement = select(*MATCH_COLUMNS).where(Match.tournament_id == tournament_id)
+    if since:
+        statement = statement.where(Match.updated_version > since)
+    return _table(MATCH_COLUMNS, statement.order_by(Match.match_date, Match.match_time, Match.id))
+
+
+def _standings_payload(tournament_id, version):
+    payload = {'version': version}
+    payload.update(standings_table(tournament_id))
+    return payload
+
+
+def _matches_payload(tournament_id, version):
+    since = request.args.get('since', 0, type=int)
+    payload = {'version': version, 'since': since}
+    payload.update(matches_table(tournament_id, since))
+    return payload
+
+
+bp.add_url_rule('/tournaments/<int:tournament_id>',
+                view_func=versioned_json('tournament', _tournament_payload))
+bp.add_url_rule('/tournaments/<int:tournament_id>/standings',
+                view_func=versioned_json('standings', _standings_payload))
+bp.add_url_rule('/tournaments/<int:tournament_id>/matches',
+                view_func=versioned_json('matches', _matches_payload))
+
+
+@bp.route('/tournaments')
+def tournament_list():
+    """One page of tournaments, newest first; pass ``next`` back as ``after`` for the following page."""
+    try:
+        page = queries.tournament_page(**queries.listing_filters(request.args))
+    except ValueError:
+        return jsonify({'error': 'Invalid filter or cursor'}), 400
+    rows = [[summary.tournament.id, summary.tournament.name, summary.tournament.start_date,
+             summary.tournament.end_date, summary.tournament.status, summary.tournament.created_at,
+             summary.group_count, summary.team_count, summary.match_count] for summary in page.items]
+    response = make_response(dumps({'columns': list(LISTING_FIELDS), 'rows': rows, 'next': page.next_cursor}))
+    response.mimetype = 'application/json'
+    return response
@@ -0,0 +1,118 @@
+"""
+Shared setup for the benchmarks.
+
+Importing this module puts the project root on sys.path. Every benchmark
+runs against a throwaway SQLite database and job table in a new temporary
+directory, with jobs run in the request (so the work itself is timed, not
+the handoff to a job thread) and the page cache disabled (so every request
+does its full work). A benchmark that needs something else passes it as an
+override, which keeps its differences visible at the top of the file.
+
+  load_app()     applies the settings to this process and returns wsgi.app
+  environment()  returns them as an environment for a fresh interpreter
+
+It also holds the timers and the tournament seeding the benchmarks share.
+The seeding helpers use wsgi.app as configured, so call them after
+load_app() (or in a process started with environment()).
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+START, END = date(2024, 6, 1), date(2024, 6, 30)
+KICKOFFS_PER_DAY = 6
+
+
+def environment(**overrides):
+    """Return os.environ plus the benchmark settings and ``overrides``, on a new temporary directory."""
+    tmpdir = tempfile.mkdtemp()
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tmpdir, 'bench.db'),
+               JOBS_PATH=os.path.join(tmpdir, 'jobs.db'), JOB_BACKEND='inline', PAGE_CACHE='none')
+    env.update(overrides)
+    return env
+
+
+def load_app(**overrides):
+    """Configure this process with environment() and return the app; only the first call configures."""
+    if 'wsgi' not in sys.modules:
+        os.environ.update(environment(**overrides))
+    from wsgi import app
+    return app
+
+
+def timed(func, *args):
+    """Return the seconds one call of ``func(*args)`` takes."""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def median_ms(func, runs=5, setup=None):
+    """Return the median ms of ``runs`` calls of ``func()``; ``setup()`` runs untimed before each."""
+    timings = []
+    for _ in range(runs):
+        if setup is not None:
+            setup()
+        timings.append(timed(func))
+    return statistics.median(timings) * 1000
+
+
+def team_names(count, prefix='Team'):
+    return [f'{prefix} {i}' for i in range(count)]
+
+
+def venues_needed(groups, per_group):
+    """Pitches needed to fit the whole group stage into START..END."""
+    matches = groups * per_group * (per_group - 1) // 2
+    slots = ((END - START).days + 1) * KICKOFFS_PER_DAY
+    # Each team plays per_group - 1 times; leave room for the rounds to interleave
+    return max(1, -(-matches * 2 // slots))
+
+
+def create_tournament(teams, groups, name='Bench', start=START, end=END):
+    """Create a tournament of ``teams`` teams split into ``groups`` groups with bulk.py; returns its ID."""
+    from wsgi import app
+    import bulk
+    from models import db
+
+    with app.app_context():
+        created = bulk.create_tournament(name, start, end, team_names(teams), groups)
+        db.session.commit()
+    return created['tournament_id']
+
+
+def seed(groups, per_group, schedule=True, results=True):
+    """Create a tournament, by default with its round-robin schedule and a random result for every match; returns its ID."""
+    from wsgi import app
+    from sqlalchemy import bindparam, update
+    import scheduling
+    import standings
+    from models import db, Match, Tournament
+
+    tournament_id = create_tournament(groups * per_group, groups, name=f'Bench {groups}x{per_group}')
+    with app.app_context():
+        if schedule:
+            tournament = db.session.get(Tournament, tournament_id)
+            scheduling.generate_round_robin_schedule(tournament, venues=venues_needed(groups, per_group))
+        if results:
+            rng = random.Random(tournament_id)
+            match_ids = db.session.execute(
+                db.select(Match.id).where(Match.tournament_id == tournament_id)).scalars().all()
+            table = Match.__table__
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('b_id'))
+                .values(home_score=bindparam('h'), away_score=bindparam('a'), status='completed'),
+                [{'b_id': match_id, 'h': rng.randint(0, 4), 'a': rng.randint(0, 4)} for match_id in match_ids],
+            )
+            standings.rebuild_standings(db.session.get(Tournament, tournament_id))
+        db.session.commit()
+    return tournament_id
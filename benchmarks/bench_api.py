@@ -0,0 +1,63 @@
+"""
+Benchmark: JSON API versus the rendered tournament page.
+
+Usage: python benchmarks/bench_api.py [teams] [groups] [requests]
+Creates and schedules a tournament (default 256 teams in 32 groups), then
+issues ``requests`` GETs (default 200) per case from a test client and
+reports requests per second and response size for: the HTML tournament
+page, the full /matches and /standings payloads (plain and gzip), a delta
+query after one score update, and a 304 revalidation.
+"""
+
+import sys
+import time
+
+from _harness import create_tournament, load_app
+
+app = load_app(PAGE_CACHE='memory')  # The cached and gzipped bodies are part of what is measured
+
+import migrations  # noqa: E402
+
+
+def measure(client, url, count, headers=None):
+    sizes = []
+    start = time.perf_counter()
+    for _ in range(count):
+        response = client.get(url, headers=headers or {})
+        sizes.append(len(response.data))
+    elapsed = time.perf_counter() - start
+    return count / elapsed, sizes[-1], response.status_code
+
+
+def main(teams=256, groups=32, count=200):
+    with app.app_context():
+        migrations.upgrade()
+    tournament_id = create_tournament(teams, groups)
+    client = app.test_client(use_cookies=False)
+    client.post(f'/tournament/{tournament_id}/schedule', data={'venues': 8})
+
+    api = f'/api/v1/tournaments/{tournament_id}'
+    matches = client.get(f'{api}/matches').get_json()
+    version = matches['version']
+    client.post(f'/match/{matches["rows"][0][0]}/update', data={'home_score': 1, 'away_score': 0})
+    etag = client.get(f'{api}/matches').headers['ETag']
+    gzip = {'Accept-Encoding': 'gzip'}
+
+    cases = [
+        ('HTML tournament page', f'/tournament/{tournament_id}', None),
+        ('matches (full)', f'{api}/matches', None),
+        ('matches (full, gzip)', f'{api}/matches', gzip),
+        ('standings', f'{api}/standings', None),
+        ('standings (gzip)', f'{api}/standings', gzip),
+        ('matches since previous version', f'{api}/matches?since={version}', None),
+        ('matches, If-None-Match', f'{api}/matches', {'If-None-Match': etag}),
+    ]
+    print(f'{len(matches["rows"])} matches, {count} requests per case')
+    print(f'{"case":<34} {"req/s":>9} {"bytes":>9} {"status":>7}')
+    for label, url, headers in cases:
+        rate, size, status = measure(client, url, count, headers)
+        print(f'{label:<34} {rate:>9.0f} {size:>9} {status:>7}')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
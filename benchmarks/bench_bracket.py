@@ -0,0 +1,51 @@
+"""
+Benchmark: knockout bracket creation and winner propagation.
+
+Usage: python benchmarks/bench_bracket.py [qualifiers]
+Creates a tournament whose groups send exactly ``qualifiers`` teams (default
+512) to the knockout stage, advances it, then posts every knockout result
+through update_match and reports the time per result by round.
+"""
+
+import sys
+import time
+
+from _harness import create_tournament, load_app
+
+app = load_app()
+
+import migrations  # noqa: E402
+from models import db, Match  # noqa: E402
+
+
+def main(qualifiers=512):
+    with app.app_context():
+        migrations.upgrade()
+    tournament_id = create_tournament(qualifiers * 2, qualifiers // 2)
+    client = app.test_client(use_cookies=False)
+
+    start = time.perf_counter()
+    client.post(f'/tournament/{tournament_id}/advance', data={'qualifiers': 2})
+    print(f'advance ({qualifiers} teams): {time.perf_counter() - start:.3f}s')
+
+    with app.app_context():
+        slots = db.session.execute(
+            db.select(Match.id, Match.bracket_slot).where(Match.tournament_id == tournament_id,
+                                                         Match.bracket_slot.isnot(None))
+        ).all()
+
+    # Play the deepest round first so every match has both teams when reached
+    by_round = {}
+    for match_id, slot in slots:
+        by_round.setdefault(slot.bit_length(), []).append(match_id)
+    for depth in sorted(by_round, reverse=True):
+        start = time.perf_counter()
+        for match_id in by_round[depth]:
+            client.post(f'/match/{match_id}/update', data={'home_score': 2, 'away_score': 1})
+        elapsed = time.perf_counter() - start
+        count = len(by_round[depth])
+        print(f'round with {count:>3} matches: {elapsed / count * 1000:.2f} ms per result')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,50 @@
+"""
+Benchmark: ORM-per-row tournament creation vs. the batched path in bulk.py.
+
+Usage: python benchmarks/bench_bulk_create.py [team counts...]
+"""
+
+import sys
+
+from _harness import END, START, load_app, timed
+
+app = load_app()
+
+import migrations  # noqa: E402
+from models import db, Tournament, Group, Team  # noqa: E402
+import bulk  # noqa: E402
+import standings  # noqa: E402
+
+def orm_create(team_names, num_groups):
+    """The previous create_tournament path: one ORM object per group and team."""
+    tournament = Tournament(name='ORM', start_date=START, end_date=END, status='group')
+    db.session.add(tournament)
+    for i, names in enumerate(bulk.split_into_groups(team_names, num_groups)):
+        group = Group(name=f'Group {bulk.group_label(i)}', tournament=tournament)
+        db.session.add(group)
+        for name in names:
+            db.session.add(Team(name=name, group=group))
+    db.session.flush()
+    standings.rebuild_standings(tournament)
+    db.session.commit()
+
+
+def bulk_create(team_names, num_groups):
+    bulk.create_tournament('Bulk', START, END, team_names, num_groups)
+    db.session.commit()
+
+
+def main(sizes):
+    print(f"{'teams':>8} {'orm (s)':>10} {'bulk (s)':>10} {'speedup':>8}")
+    with app.app_context():
+        migrations.upgrade()
+        for size in sizes:
+            team_names = [f'Team {i}' for i in range(size)]
+            num_groups = max(1, size // 16)
+            orm = timed(orm_create, team_names, num_groups)
+            fast = timed(bulk_create, team_names, num_groups)
+            print(f'{size:>8} {orm:>10.3f} {fast:>10.3f} {orm / fast:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000])
@@ -0,0 +1,107 @@
+"""
+Stress test: read throughput while scores are being written.
+
+Usage: python benchmarks/bench_concurrency.py [readers] [writers] [seconds]
+Seeds a scheduled 256-team tournament, then runs
+``readers`` processes (default 4) fetching the standings API and
+``writers`` processes (default 2) posting random results through
+update_match for ``seconds`` (default 10), the way separate gunicorn
+workers would. The page cache is disabled so every read hits the database.
+
+Each run is repeated with the SQLite settings from database.py and with
+SQLite's defaults (rollback journal, full sync, no busy timeout, no mmap)
+to show the effect of the tuning. Reports requests per second and failed
+requests (e.g. "database is locked") for reads and writes.
+"""
+
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+
+import _harness
+
+PROFILES = {
+    'tuned': {},
+    'sqlite defaults': {'SQLITE_JOURNAL_MODE': 'delete', 'SQLITE_BUSY_TIMEOUT': '0',
+                        'SQLITE_SYNCHRONOUS': 'full', 'SQLITE_MMAP_SIZE': '0'},
+}
+
+
+def worker(kind, tournament_id, match_ids, seconds, results):
+    from wsgi import app
+    from models import db
+
+    with app.app_context():
+        db.engine.dispose()  # don't share the parent's connections
+    client = app.test_client(use_cookies=False)
+    rng = random.Random(os.getpid())
+    ok = failed = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        if kind == 'read':
+            response = client.get(f'/api/v1/tournaments/{tournament_id}/standings')
+            success = response.status_code == 200
+        else:
+            response = client.post(f'/match/{rng.choice(match_ids)}/update',
+                                   data={'home_score': rng.randint(0, 4), 'away_score': rng.randint(0, 4)})
+            success = response.status_code == 302
+        if success:
+            ok += 1
+        else:
+            failed += 1
+    results.put((kind, ok, failed))
+
+
+def run(readers, writers, seconds):
+    """Run one profile in this process; the environment holds the settings."""
+    from wsgi import app
+    import migrations
+    from models import db, Match
+
+    with app.app_context():
+        migrations.upgrade()
+    tournament_id = _harness.create_tournament(256, 32)
+    app.test_client(use_cookies=False).post(f'/tournament/{tournament_id}/schedule', data={'venues': 8})
+    with app.app_context():
+        match_ids = db.session.execute(
+            db.select(Match.id).where(Match.tournament_id == tournament_id)).scalars().all()
+        db.engine.dispose()
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(kind, tournament_id, match_ids, seconds, results))
+                 for kind in ['read'] * readers + ['write'] * writers]
+    for process in processes:
+        process.start()
+    totals = {'read': [0, 0], 'write': [0, 0]}
+    for _ in processes:
+        kind, ok, failed = results.get()
+        totals[kind][0] += ok
+        totals[kind][1] += failed
+    for process in processes:
+        process.join()
+
+    for kind, (ok, failed) in totals.items():
+        print(f'  {kind:<5} {ok / seconds:>8.1f} req/s  {failed:>5} failed')
+
+
+def main(readers=4, writers=2, seconds=10):
+    for name, overrides in PROFILES.items():
+        env = _harness.environment(**overrides)
+        print(f'{name}: {readers} readers, {writers} writers, {seconds}s')
+        sys.stdout.flush()
+        subprocess.run([sys.executable, __file__, '--run', str(readers), str(writers), str(seconds)],
+                       env=env, check=True)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--run']:
+        # Keep per-request error logs out of the report
+        import logging
+        logging.disable(logging.ERROR)
+        run(*[int(arg) for arg in sys.argv[2:]])
+    else:
+        main(*[int(arg) for arg in sys.argv[1:]])
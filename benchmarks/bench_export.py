@@ -0,0 +1,92 @@
+"""
+Benchmark: streamed fixture exports.
+
+Usage: python benchmarks/bench_export.py [matches]
+Inserts a tournament with ``matches`` fixtures (default 50000), then
+exports them as CSV and iCalendar and a single team's calendar through the
+test client. Reports the time to the first chunk, the total time, the size
+of the export and the peak Python memory allocated while producing it
+(tracemalloc, in a separate run), which stays flat as the season grows.
+"""
+
+import sys
+import time
+import tracemalloc
+from datetime import date, time as clock, timedelta
+
+from _harness import create_tournament, load_app
+
+app = load_app()
+
+from sqlalchemy import insert, select  # noqa: E402
+
+import migrations  # noqa: E402
+from models import db, Match, Team  # noqa: E402
+
+TEAMS = 512
+GROUPS = 64
+
+
+def season(matches):
+    """Create a tournament with ``matches`` group fixtures spread over the season."""
+    tournament_id = create_tournament(TEAMS, GROUPS, start=date(2024, 1, 1), end=date(2024, 12, 31))
+    with app.app_context():
+        teams = db.session.execute(select(Team.id, Team.name, Team.group_id).order_by(Team.id)).all()
+        per_group = TEAMS // GROUPS
+        rows = []
+        for i in range(matches):
+            group = i % GROUPS
+            home = teams[group * per_group + i // GROUPS % per_group]
+            away = teams[group * per_group + (i // GROUPS + 1) % per_group]
+            rows.append({
+                'tournament_id': tournament_id, 'stage': 'group', 'group_name': f'Group {group}',
+                'home_team_id': home.id, 'home_team_name': home.name,
+                'away_team_id': away.id, 'away_team_name': away.name,
+                'match_date': date(2024, 1, 1) + timedelta(days=i * 365 // matches),
+                'match_time': clock(10 + i % 8), 'venue': f'Pitch {i % 8 + 1}', 'status': 'scheduled',
+            })
+        db.session.execute(insert(Match), rows)
+        db.session.commit()
+    return tournament_id, teams[0].id
+
+
+def consume(client, url):
+    """GET ``url`` and read the streamed body; returns (seconds to first chunk, bytes)."""
+    start = time.perf_counter()
+    response = client.get(url)
+    chunks = iter(response.response)
+    size = len(next(chunks))
+    first = time.perf_counter() - start
+    for chunk in chunks:
+        size += len(chunk)
+    response.close()
+    return first, size
+
+
+def export(client, url):
+    start = time.perf_counter()
+    first, size = consume(client, url)
+    total = time.perf_counter() - start
+    # Memory in a separate run, since tracemalloc slows everything down
+    tracemalloc.start()
+    consume(client, url)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f'{url:<52} first chunk {first * 1000:>7.1f} ms  total {total:>6.2f} s  '
+          f'{size / 1e6:>6.1f} MB  peak {peak / 1e6:>5.1f} MB')
+
+
+def main(matches=50000):
+    with app.app_context():
+        migrations.upgrade()
+    tournament_id, team_id = season(matches)
+    client = app.test_client(use_cookies=False)
+    print(f'{matches} matches')
+    for url in (f'/tournament/{tournament_id}/export/fixtures.csv',
+                f'/tournament/{tournament_id}/export/fixtures.ics',
+                f'/tournament/{tournament_id}/team/{team_id}/calendar.ics'):
+        export(client, url)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,83 @@
+"""
+Benchmark: Monte Carlo qualification forecasts, simulations per second.
+
+Usage: python benchmarks/bench_forecast.py [sizes] [iterations] [processes]
+For each GROUPSxTEAMS size (default 8x4,16x8,64x16) seeds a scheduled
+tournament with the first half of its matches played, then simulates the
+rest ``iterations`` times (default 20000) with NumPy, if installed, and
+with the pure-Python fallback (a tenth as many runs, it is much slower).
+Each runs in this process and on a pool of ``processes`` workers (default:
+one per core), and reports simulated group stages per second and per core.
+The first pool run also pays for starting the workers, so it is run once
+before timing.
+"""
+
+import os
+import sys
+import time
+
+from _harness import load_app, seed
+
+app = load_app()
+
+from sqlalchemy import bindparam, update  # noqa: E402
+
+import forecast  # noqa: E402
+import ranking  # noqa: E402
+import migrations  # noqa: E402
+from models import db, Match  # noqa: E402
+
+
+def half_played(groups, per_group):
+    """Seed a tournament and complete the first half of its matches; returns its ID."""
+    tournament_id = seed(groups, per_group, results=False)
+    with app.app_context():
+        match_ids = db.session.execute(
+            db.select(Match.id).where(Match.tournament_id == tournament_id)
+            .order_by(Match.match_date, Match.match_time, Match.id)).scalars().all()
+        played = match_ids[:len(match_ids) // 2]
+        table = Match.__table__
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('b_id'))
+            .values(home_score=bindparam('h'), away_score=bindparam('a'), status='completed'),
+            [{'b_id': match_id, 'h': i % 4, 'a': i % 3} for i, match_id in enumerate(played)],
+        )
+        db.session.commit()
+    return tournament_id
+
+
+def main(sizes='8x4,16x8,64x16', iterations=20000, processes=None):
+    iterations = int(iterations)
+    processes = int(processes or os.cpu_count() or 1)
+    with app.app_context():
+        migrations.upgrade()
+    forecast.POOL_MIN_CELLS = 0  # Use the pool at every size, to show where it pays off
+    numpy = ranking.get_numpy()
+    backends = (['numpy'] if numpy is not None else []) + ['python']
+    print(f'{"size":<8} {"remaining":>9} {"backend":<7} {"procs":>5} {"runs":>7} {"seconds":>8} '
+          f'{"runs/s":>9} {"runs/s/core":>11}')
+    for groups, per_group in (tuple(int(n) for n in size.split('x')) for size in sizes.split(',')):
+        tournament_id = half_played(groups, per_group)
+        with app.app_context():
+            data = forecast.inputs(tournament_id, app.config['KNOCKOUT_QUALIFIERS'])
+        for backend in backends:
+            # The pool's workers import forecast themselves, so only this process can fall back
+            if backend == 'python' and numpy is not None:
+                pools = (1,)
+            else:
+                pools = (1, processes) if processes > 1 else (1,)
+            ranking._numpy = numpy if backend == 'numpy' else False  # False: get_numpy() reports it missing
+            runs = iterations if backend == 'numpy' else max(1, iterations // 10)
+            for count in pools:
+                if count > 1:
+                    forecast.simulate(data, runs, processes=count)
+                start = time.perf_counter()
+                forecast.simulate(data, runs, processes=count)
+                elapsed = time.perf_counter() - start
+                print(f'{f"{groups}x{per_group}":<8} {len(data.home):>9} {backend:<7} {count:>5} {runs:>7} '
+                      f'{elapsed:>8.2f} {runs / elapsed:>9.0f} {runs / elapsed / count:>11.0f}')
+        ranking._numpy = numpy
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,72 @@
+"""
+Benchmark: home page and tournament listing as the history grows.
+
+Usage: python benchmarks/bench_home.py [sizes]
+Grows the tournaments table to each size in ``sizes`` (default
+1000,10000,100000) and times the first page of the home page and of
+/api/v1/tournaments, a page 25 cursors deep, a status filter and a name
+search (median of 20). Keyset pages should cost the same at
+every size; the home page also counts the totals for its stat cards, which
+the page cache normally keeps between writes.
+"""
+
+import json
+import sys
+from datetime import date, datetime, timedelta
+
+from _harness import load_app, median_ms
+
+app = load_app()
+
+from sqlalchemy import insert  # noqa: E402
+
+import migrations  # noqa: E402
+from models import db, Tournament  # noqa: E402
+
+WORDS = ['Spring', 'Summer', 'Autumn', 'Winter', 'Cup', 'League', 'Open', 'Junior', 'Senior', 'Classic']
+STATUSES = ['group', 'knockout', 'completed']
+
+
+def grow(start, stop):
+    base = datetime(2010, 1, 1)
+    rows = [{'name': f'{WORDS[i % 10]} {WORDS[i // 10 % 10]} {i // 100}',
+             'start_date': date(2010, 1, 1) + timedelta(days=i % 5000),
+             'end_date': date(2010, 1, 3) + timedelta(days=i % 5000),
+             'status': STATUSES[i % 3], 'created_at': base + timedelta(minutes=i),
+             'updated_at': base + timedelta(minutes=i)} for i in range(start, stop)]
+    with app.app_context():
+        db.session.execute(insert(Tournament), rows)
+        db.session.commit()
+
+
+def get_ms(client, url):
+    """Median ms of a GET of ``url``, after one untimed warm-up request."""
+    assert client.get(url).status_code == 200, url
+    return median_ms(lambda: client.get(url), runs=20)
+
+
+def deep_cursor(client, pages):
+    url = '/api/v1/tournaments'
+    for _ in range(pages):
+        cursor = json.loads(client.get(url).data)['next']
+        url = f'/api/v1/tournaments?after={cursor}'
+    return url
+
+
+def main(sizes='1000,10000,100000'):
+    with app.app_context():
+        migrations.upgrade()
+    client = app.test_client(use_cookies=False)
+    print(f'{"tournaments":>12} {"home":>8} {"api":>8} {"page 25":>8} {"status":>8} {"search":>8}  (ms)')
+    current = 0
+    for size in (int(n) for n in sizes.split(',')):
+        grow(current, size)
+        current = size
+        results = [get_ms(client, url) for url in (
+            '/', '/api/v1/tournaments', deep_cursor(client, 25),
+            '/api/v1/tournaments?status=completed', '/api/v1/tournaments?q=winter%20cup')]
+        print(f'{size:>12} ' + ' '.join(f'{ms:>8.2f}' for ms in results))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
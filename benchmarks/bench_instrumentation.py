@@ -0,0 +1,48 @@
+"""
+Benchmark: cost of request instrumentation.
+
+Usage: python benchmarks/bench_instrumentation.py [requests]
+Times ``requests`` GETs (default 500) of the tournament page and the
+standings API with the page cache off, once with INSTRUMENTATION disabled
+and once enabled (without profiling), each in a fresh process.
+"""
+
+import subprocess
+import sys
+import time
+
+import _harness
+
+
+def run(count):
+    from wsgi import app
+    import migrations
+
+    with app.app_context():
+        migrations.upgrade()
+    tournament_id = _harness.create_tournament(64, 8)
+    client = app.test_client(use_cookies=False)
+    client.post(f'/tournament/{tournament_id}/schedule', data={'venues': 4})
+
+    for url in (f'/tournament/{tournament_id}', f'/api/v1/tournaments/{tournament_id}/standings'):
+        client.get(url)
+        start = time.perf_counter()
+        for _ in range(count):
+            client.get(url)
+        elapsed = time.perf_counter() - start
+        print(f'  {url:<40} {elapsed / count * 1000:.3f} ms per request')
+
+
+def main(count=500):
+    for label, value in (('disabled', ''), ('enabled', '1')):
+        env = _harness.environment(INSTRUMENTATION=value, PROFILE_SAMPLE_RATE='0')
+        print(f'instrumentation {label}:')
+        sys.stdout.flush()
+        subprocess.run([sys.executable, __file__, '--run', str(count)], env=env, check=True)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--run']:
+        run(int(sys.argv[2]))
+    else:
+        main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,70 @@
+"""
+Benchmark: request latency of heavy operations run inline versus as jobs.
+
+Usage: python benchmarks/bench_jobs.py [sizes]
+For each GROUPSxTEAMS size (default 16x8,64x16) imports a roster and
+generates its schedule with jobs run in the request (JOB_BACKEND=inline)
+and then handed to the job threads, and reports:
+
+  request   ms until the POST returns
+  done      ms until the job has finished (polling its status URL)
+"""
+
+import sys
+import time
+
+from _harness import load_app
+
+app = load_app()
+
+import migrations  # noqa: E402
+
+
+def wait(client, job_id):
+    while True:
+        job = client.get(f'/jobs/{job_id}').get_json()
+        if job['status'] in ('succeeded', 'failed'):
+            assert job['status'] == 'succeeded', job['error']
+            return job
+        time.sleep(0.005)
+
+
+def last_job(client, tournament_id):
+    return client.get(f'/tournament/{tournament_id}/jobs').get_json()[0]['id']
+
+
+def until_done(client, post, job_id):
+    """Return (ms until ``post`` returns, ms until the job named by ``job_id(response)`` is done)."""
+    start = time.perf_counter()
+    response = post()
+    returned = time.perf_counter()
+    job = wait(client, job_id(response))
+    return (returned - start) * 1000, (time.perf_counter() - start) * 1000, job
+
+
+def main(sizes='16x8,64x16'):
+    with app.app_context():
+        migrations.upgrade()
+    queue = app.extensions['jobs']
+    client = app.test_client(use_cookies=False)
+    print(f'{"size":<8} {"backend":<8} {"import ms":>10} {"done ms":>9} {"schedule ms":>12} {"done ms":>9}')
+    for groups, per_group in (tuple(int(n) for n in size.split('x')) for size in sizes.split(',')):
+        for backend in ('inline', 'thread'):
+            queue.inline = backend == 'inline'
+            queue.start()
+            roster = {'name': f'Bench {groups}x{per_group}', 'start_date': '2024-06-01', 'end_date': '2024-09-30',
+                      'num_groups': groups, 'teams': [f'{backend} team {i}' for i in range(groups * per_group)]}
+            import_ms, import_done, job = until_done(
+                client, lambda: client.post('/tournament/import', json=roster),
+                lambda response: response.get_json()['job_id'])
+            tournament_id = job['result']['tournament_id']
+
+            schedule_ms, schedule_done, _ = until_done(
+                client, lambda: client.post(f'/tournament/{tournament_id}/schedule', data={'venues': 16}),
+                lambda response: last_job(client, tournament_id))
+            print(f'{f"{groups}x{per_group}":<8} {backend:<8} {import_ms:>10.1f} {import_done:>9.1f} '
+                  f'{schedule_ms:>12.1f} {schedule_done:>9.1f}')
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
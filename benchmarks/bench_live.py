@@ -0,0 +1,66 @@
+"""
+Benchmark: live event fan-out.
+
+Usage: python benchmarks/bench_live.py [subscribers] [events]
+Starts ``subscribers`` threads (default 500) waiting on one tournament's
+channel of an in-process broker, publishes ``events`` score events (default
+50) and reports publish cost and delivery latency to the last subscriber.
+"""
+
+import sys
+import threading
+import time
+
+import _harness  # noqa: F401  (puts the project on sys.path)
+
+import live
+
+
+def main(subscribers=500, events=50):
+    broker = live.Broker()
+    data = '{"version":0,"matches":{"columns":[],"rows":[]}}' * 20
+    received = []
+    lock = threading.Lock()
+    ready = threading.Barrier(subscribers + 1)
+
+    def subscriber():
+        cursor = 1
+        ready.wait()
+        while cursor < events + 1:
+            cursor, frames = broker.wait(1, cursor, 5)
+            with lock:
+                received.append((time.perf_counter(), len(frames)))
+
+    threads = [threading.Thread(target=subscriber, daemon=True) for _ in range(subscribers)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    time.sleep(0.2)
+
+    publish_time = 0.0
+    latencies = []
+    for version in range(2, events + 2):
+        received.clear()
+        start = time.perf_counter()
+        broker.publish(1, version - 1, version, 'score', data)
+        publish_time += time.perf_counter() - start
+        while True:
+            with lock:
+                delivered = sum(count for _, count in received)
+                last = max((at for at, _ in received), default=start)
+            if delivered >= subscribers:
+                break
+            time.sleep(0.001)
+        latencies.append(last - start)
+
+    for thread in threads:
+        thread.join(5)
+    latencies.sort()
+    print(f'{subscribers} subscribers, {events} events')
+    print(f'publish: {publish_time / events * 1e6:.0f} us per event')
+    print(f'delivery to all subscribers: median {latencies[len(latencies) // 2] * 1000:.1f} ms, '
+          f'max {latencies[-1] * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
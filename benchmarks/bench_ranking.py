@@ -0,0 +1,52 @@
+"""
+Benchmark: group tables with tie-breakers.
+
+Usage: python benchmarks/bench_ranking.py [teams] [group_size]
+Generates a league of ``teams`` teams (default 10500) in groups of
+``group_size`` (default 21, a full round robin gives 210 matches per group
+and 105000 matches in total) with random low scores, so ties are common,
+and times ranking.compute() under each rule set. Reports whether NumPy or
+the array-module fallback was used.
+"""
+
+import random
+import sys
+import time
+from array import array
+
+import _harness  # noqa: F401  (puts the project on sys.path)
+
+import ranking
+
+
+def league(teams, group_size, seed=1):
+    rng = random.Random(seed)
+    group_of = array('l', (team // group_size for team in range(teams)))
+    home, away, home_goals, away_goals = array('l'), array('l'), array('l'), array('l')
+    for first in range(0, teams, group_size):
+        members = range(first, min(first + group_size, teams))
+        for i in members:
+            for j in members:
+                if i < j:
+                    home.append(i)
+                    away.append(j)
+                    home_goals.append(rng.randint(0, 3))
+                    away_goals.append(rng.randint(0, 3))
+    return group_of, home, away, home_goals, away_goals
+
+
+def main(teams=10500, group_size=21):
+    columns = league(teams, group_size)
+    print(f'{teams} teams, {len(columns[1])} matches, '
+          f'{"NumPy" if ranking.get_numpy() is not None else "array module"} backend')
+    for rules in ranking.RULES:
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            ranking.compute(*columns, rules=rules)
+            timings.append(time.perf_counter() - start)
+        print(f'{rules}: best of 3 {min(timings) * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,60 @@
+"""
+Benchmark: batch result entry versus one update_match POST per result.
+
+Usage: python benchmarks/bench_results.py [results]
+Creates two identical scheduled tournaments with at least ``results``
+group matches (default 500), enters that many results into the first one
+match by match through update_match and into the second with a single
+POST to the batch endpoint, and reports end-to-end time for each.
+"""
+
+import sys
+import time
+
+from _harness import create_tournament, load_app
+
+app = load_app()
+
+import migrations  # noqa: E402
+from models import db, Match  # noqa: E402
+
+
+def scheduled_tournament(client, results):
+    # Groups of 8 play 28 matches each
+    groups = -(-results // 28)
+    tournament_id = create_tournament(groups * 8, groups)
+    client.post(f'/tournament/{tournament_id}/schedule', data={'venues': 8})
+    with app.app_context():
+        match_ids = db.session.execute(
+            db.select(Match.id).where(Match.tournament_id == tournament_id).order_by(Match.id).limit(results)
+        ).scalars().all()
+    return tournament_id, match_ids
+
+
+def main(results=500):
+    with app.app_context():
+        migrations.upgrade()
+    client = app.test_client(use_cookies=False)
+
+    _, match_ids = scheduled_tournament(client, results)
+    start = time.perf_counter()
+    for i, match_id in enumerate(match_ids):
+        client.post(f'/match/{match_id}/update', data={'home_score': i % 4, 'away_score': i % 3})
+    single = time.perf_counter() - start
+
+    tournament_id, match_ids = scheduled_tournament(client, results)
+    rows = [{'match_id': match_id, 'home_score': i % 4, 'away_score': i % 3}
+            for i, match_id in enumerate(match_ids)]
+    start = time.perf_counter()
+    response = client.post(f'/tournament/{tournament_id}/results', json={'results': rows})
+    batch = time.perf_counter() - start
+    assert response.get_json()['applied'] == len(rows), response.get_json()
+
+    print(f'{len(match_ids)} results')
+    print(f'update_match, one POST each: {single:.3f}s ({single / len(match_ids) * 1000:.2f} ms per result)')
+    print(f'batch endpoint, one POST:    {batch:.3f}s ({batch / len(match_ids) * 1000:.3f} ms per result)')
+    print(f'speedup: {single / batch:.0f}x')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
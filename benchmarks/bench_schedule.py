@@ -0,0 +1,60 @@
+"""
+Benchmark: the original nested-loop ORM scheduler vs. scheduling.py.
+
+Usage: python benchmarks/bench_schedule.py [groups] [teams per group] [venues]
+"""
+
+import sys
+from datetime import datetime, timedelta
+from datetime import time as dtime
+
+from _harness import START, create_tournament, load_app, timed
+
+app = load_app()
+
+import migrations  # noqa: E402
+from models import db, Tournament, Match  # noqa: E402
+import scheduling  # noqa: E402
+
+def nested_loop_schedule(tournament_id):
+    """The previous generate_round_robin_schedule: O(n^2) pairs, one ORM Match each, serial timeline."""
+    tournament = db.session.get(Tournament, tournament_id)
+    current_date = tournament.start_date
+    match_time = dtime(10, 0)
+    for group in tournament.groups:
+        teams = group.teams
+        for i in range(len(teams)):
+            for j in range(i + 1, len(teams)):
+                db.session.add(Match(
+                    tournament_id=tournament.id,
+                    home_team_id=teams[i].id, away_team_id=teams[j].id,
+                    home_team_name=teams[i].name, away_team_name=teams[j].name,
+                    match_date=current_date, match_time=match_time,
+                    stage='group', group_name=group.name, status='scheduled'))
+                match_time = (datetime.combine(current_date, match_time) + timedelta(minutes=90)).time()
+                if match_time.hour >= 20:
+                    current_date += timedelta(days=1)
+                    match_time = dtime(10, 0)
+    db.session.commit()
+
+
+def circle_schedule(tournament_id, venues):
+    scheduling.generate_round_robin_schedule(db.session.get(Tournament, tournament_id), venues=venues)
+    db.session.commit()
+
+
+def main(num_groups=64, per_group=8, venues=16):
+    with app.app_context():
+        migrations.upgrade()
+        old = timed(nested_loop_schedule, create_tournament(num_groups * per_group, num_groups))
+        tournament_id = create_tournament(num_groups * per_group, num_groups)
+        new = timed(circle_schedule, tournament_id, venues)
+        last_day = db.session.query(db.func.max(Match.match_date)).filter_by(tournament_id=tournament_id).scalar()
+    matches = num_groups * per_group * (per_group - 1) // 2
+    print(f'{num_groups} groups x {per_group} teams = {matches} matches, {venues} venues')
+    print(f'nested loop: {old:.3f}s  circle + bulk insert: {new:.3f}s  ({old / new:.1f}x)')
+    print(f'schedule ends {last_day} ({(last_day - START).days + 1} days)')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,54 @@
+"""
+Benchmark: delete-and-recreate shuffle vs. the in-place draw in draw.py.
+
+Usage: python benchmarks/bench_shuffle.py [team counts...]
+"""
+
+import random
+import sys
+
+from _harness import create_tournament, load_app, timed
+
+app = load_app()
+
+import migrations  # noqa: E402
+from models import db, Tournament, Team  # noqa: E402
+import bulk  # noqa: E402
+import draw  # noqa: E402
+
+def recreate_shuffle(tournament_id):
+    """The previous shuffle_groups path: new Team rows, then delete the old ones."""
+    tournament = db.session.get(Tournament, tournament_id)
+    team_data = [(team.id, team.name) for group in tournament.groups for team in group.teams]
+    shuffle_data = list(team_data)
+    random.Random(0).shuffle(shuffle_data)
+    groups = list(tournament.groups)
+    for group, members in zip(groups, bulk.split_into_groups(shuffle_data, len(groups))):
+        for _, name in members:
+            db.session.add(Team(name=name, group_id=group.id))
+    for team_id, _ in team_data:
+        old_team = Team.query.get(team_id)
+        if old_team:
+            db.session.delete(old_team)
+    db.session.commit()
+
+
+def in_place_shuffle(tournament_id, mode):
+    draw.shuffle_teams(db.session.get(Tournament, tournament_id), mode=mode, seed=0)
+    db.session.commit()
+
+
+def main(sizes):
+    print(f"{'teams':>8} {'recreate (s)':>13} {'random (s)':>11} {'pots (s)':>9}")
+    with app.app_context():
+        migrations.upgrade()
+        for size in sizes:
+            old = timed(recreate_shuffle, create_tournament(size, max(1, size // 16)))
+            tournament_id = create_tournament(size, max(1, size // 16))
+            fast = timed(in_place_shuffle, tournament_id, 'random')
+            pots = timed(in_place_shuffle, tournament_id, 'pots')
+            print(f'{size:>8} {old:>13.3f} {fast:>11.3f} {pots:>9.3f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 5000, 10000])
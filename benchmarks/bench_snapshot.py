@@ -0,0 +1,92 @@
+"""
+Benchmark: tournament page data from the ORM versus the stored snapshot.
+
+Usage: python benchmarks/bench_snapshot.py [sizes]
+For each GROUPSxTEAMS size (default 16x8,64x16) seeds a scheduled
+tournament with results, then compares the previous view_tournament data
+path (eager-loaded ORM graph, fixtures grouped by date and group in Python,
+tables computed) with snapshot.load(), and reports:
+
+  build     ms to assemble the page data (median of 5)
+  memory    KB allocated for the page data while it is held (tracemalloc)
+  blob      size of the stored snapshot
+  store     ms a write spends rebuilding and storing it after its commit
+
+and the median time of a full GET of the page with the page cache off.
+"""
+
+import pickle
+import sys
+import tracemalloc
+
+from _harness import load_app, median_ms, seed
+
+app = load_app()
+
+from sqlalchemy.orm import selectinload  # noqa: E402
+
+from models import db, Tournament, Group  # noqa: E402
+import migrations  # noqa: E402
+import ranking  # noqa: E402
+import snapshot  # noqa: E402
+
+
+def orm_page(tournament_id):
+    """The page data as view_tournament assembled it before snapshots."""
+    tournament = (Tournament.query
+                  .options(selectinload(Tournament.groups).selectinload(Group.teams),
+                           selectinload(Tournament.matches))
+                  .get_or_404(tournament_id))
+    matches_by_date, matches_by_group = {}, {}
+    for match in tournament.matches:
+        matches_by_date.setdefault(match.match_date.strftime('%Y-%m-%d'), []).append(match)
+        if match.stage == 'group':
+            matches_by_group.setdefault(match.group_name, []).append(match)
+    return tournament, dict(sorted(matches_by_date.items())), matches_by_group, {
+        table.name: table.rows for table in ranking.tournament_tables(tournament_id)}
+
+
+def held_memory(func):
+    db.session.expunge_all()
+    tracemalloc.start()
+    data = func()  # noqa: F841 - held until the measurement
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / 1024
+
+
+def store_once(tournament_id):
+    """Rebuild and store the snapshot as a write's commit does, then roll it back."""
+    with db.engine.connect() as connection:
+        transaction = connection.begin()
+        snapshot.store(tournament_id, snapshot.load(tournament_id).version + 1, connection)
+        transaction.rollback()
+
+
+def main(sizes='16x8,64x16'):
+    with app.app_context():
+        migrations.upgrade()
+    client = app.test_client(use_cookies=False)
+    print(f'{"size":<8} {"path":<9} {"build ms":>9} {"memory KB":>10} {"blob KB":>8} {"store ms":>9} {"GET ms":>8}')
+    for groups, per_group in (tuple(int(n) for n in size.split('x')) for size in sizes.split(',')):
+        tournament_id = seed(groups, per_group)
+        label = f'{groups}x{per_group}'
+        with app.app_context():
+            snapshot.load(tournament_id)
+            blob = len(pickle.dumps(snapshot.load(tournament_id), protocol=pickle.HIGHEST_PROTOCOL))
+            store = median_ms(lambda: store_once(tournament_id), setup=db.session.expunge_all)
+            rows = [('orm', lambda: orm_page(tournament_id), '', ''),
+                    ('snapshot', lambda: snapshot.load(tournament_id), f'{blob / 1024:.1f}', f'{store:.1f}')]
+            results = [(name, median_ms(func, setup=db.session.expunge_all), held_memory(func), blob_kb, store_ms)
+                       for name, func, blob_kb, store_ms in rows]
+
+        url = f'/tournament/{tournament_id}'
+        assert client.get(url).status_code == 200
+        get_ms = median_ms(lambda: client.get(url))
+        for name, build_ms, memory_kb, blob_kb, store_ms in results:
+            page_ms = f'{get_ms:.1f}' if name == 'snapshot' else ''
+            print(f'{label:<8} {name:<9} {build_ms:>9.1f} {memory_kb:>10.1f} {blob_kb:>8} {store_ms:>9} {page_ms:>8}')
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
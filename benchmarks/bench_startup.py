@@ -0,0 +1,155 @@
+"""
+Benchmark: worker startup, cold versus forked from a preloaded master.
+
+Usage: python benchmarks/bench_startup.py [workers] [runs]
+Seeds an 8x4 tournament, then starts ``workers`` worker processes (default
+2) the two ways gunicorn can, ``runs`` times each (default 3):
+
+  cold      the master forks first and every worker imports the app and
+            calls create_app() itself (GUNICORN_PRELOAD=false)
+  preload   the master imports the app, calls create_app() and warm_up()
+            and freezes the garbage collector, then forks (the default)
+
+Each worker then fetches the home page, the tournament page and the
+standings API twice, and reports per worker:
+
+  import ms   importing app.py
+  app ms      create_app()
+  first ms    the first round of requests (lazy imports, templates, mappers)
+  warm ms     the second round
+  ready ms    from the fork until the first round has been answered
+  private MB  memory not shared with the master after both rounds (Linux)
+
+The master's own import, create_app() and warm_up() times are printed
+before the preload rows. Needs os.fork(), like gunicorn.
+"""
+
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import _harness
+
+COLUMNS = {'import_ms': 'import ms', 'app_ms': 'app ms', 'first_ms': 'first ms', 'warm_ms': 'warm ms',
+           'ready_ms': 'ready ms', 'private_mb': 'private MB'}
+
+
+def seed():
+    """Migrate the database and seed a tournament; prints its ID."""
+    from wsgi import app
+    import migrations
+
+    with app.app_context():
+        migrations.upgrade()
+    print(_harness.seed(8, 4))
+
+
+def build():
+    """Import the app and create it; returns (app, import ms, create_app ms)."""
+    start = time.perf_counter()
+    import app as application
+    imported = time.perf_counter()
+    app = application.create_app()
+    return app, (imported - start) * 1000, (time.perf_counter() - imported) * 1000
+
+
+def private_mb():
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = dict(line.split(':', 1) for line in f if line.startswith('Private_'))
+    except OSError:
+        return None
+    return sum(int(value.split()[0]) for value in fields.values()) / 1024
+
+
+def serve(app, urls, forked_at, timings, output):
+    """The worker: answer two rounds of ``urls`` and write its timings to ``output``."""
+    if app is None:
+        app, timings['import_ms'], timings['app_ms'] = build()
+    client = app.test_client(use_cookies=False)
+    rounds = []
+    for _ in range(2):
+        start = time.perf_counter()
+        for url in urls:
+            response = client.get(url)
+            assert response.status_code == 200, (url, response.status_code)
+        rounds.append(time.perf_counter() - start)
+        if len(rounds) == 1:
+            timings['ready_ms'] = (time.perf_counter() - forked_at) * 1000
+    timings.update(first_ms=rounds[0] * 1000, warm_ms=rounds[1] * 1000, private_mb=private_mb())
+    os.write(output, (json.dumps(timings) + '\n').encode())
+
+
+def fork_workers(mode, workers, tournament_id):
+    """Start ``workers`` workers the given way; prints the master's and then each worker's timings as JSON."""
+    urls = ['/', f'/tournament/{tournament_id}', f'/api/v1/tournaments/{tournament_id}/standings']
+    app = None
+    if mode == 'preload':
+        app, import_ms, app_ms = build()
+        import app as application
+        start = time.perf_counter()
+        application.warm_up(app)
+        gc.freeze()
+        print(json.dumps({'import_ms': import_ms, 'app_ms': app_ms,
+                          'warm_up_ms': (time.perf_counter() - start) * 1000}), flush=True)
+    else:
+        print(json.dumps({}), flush=True)
+
+    read, write = os.pipe()
+    children = []
+    for _ in range(workers):
+        forked_at = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read)
+            try:
+                serve(app, urls, forked_at, {'import_ms': 0.0, 'app_ms': 0.0}, write)
+            finally:
+                os._exit(0)
+        children.append(pid)
+    os.close(write)
+    for pid in children:
+        os.waitpid(pid, 0)
+    with os.fdopen(read) as results:
+        sys.stdout.write(results.read())
+
+
+def run(env, *args):
+    """Run this script in a fresh interpreter; returns the JSON lines it printed."""
+    output = subprocess.run([sys.executable, __file__, *map(str, args)], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return [json.loads(line) for line in output.splitlines()]
+
+
+def main(workers=2, runs=3):
+    workers, runs = int(workers), int(runs)
+    env = _harness.environment()
+    tournament_id = run(env, 'seed')[0]
+    print(f'{workers} workers, median of {runs} runs')
+    print(f'{"mode":<8} {"worker":>6} ' + ' '.join(f'{label:>10}' for label in COLUMNS.values()))
+    for mode in ('cold', 'preload'):
+        results = [run(env, 'fork', mode, workers, tournament_id) for _ in range(runs)]
+        masters = [result[0] for result in results]
+        if masters[0]:
+            print(f'{mode} master: ' + ', '.join(
+                f'{name.replace("_", " ")} {statistics.median(m[name] for m in masters):.1f}' for name in masters[0]))
+        for worker in range(workers):
+            rows = [result[1 + worker] for result in results]
+            cells = []
+            for name in COLUMNS:
+                values = [row[name] for row in rows if row[name] is not None]
+                cells.append(f'{statistics.median(values):>10.1f}' if values else f'{"-":>10}')
+            print(f'{mode:<8} {worker + 1:>6} ' + ' '.join(cells))
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['seed']:
+        seed()
+    elif sys.argv[1:2] == ['fork']:
+        fork_workers(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+    else:
+        main(*sys.argv[1:])
@@ -0,0 +1,197 @@
+"""
+Benchmark suite: every main route at realistic tournament sizes.
+
+Usage:
+  python benchmarks/bench_suite.py [--sizes 4x4,16x8,32x16,64x16,128x32] [--repeat 5]
+                                   [--output results.json] [--compare baseline.json]
+                                   [--threshold 0.25]
+
+For each size (groups x teams per group) a tournament is seeded with its
+full round-robin schedule and every group result filled in, then home,
+view_tournament, view_groups, shuffle_groups, create_tournament,
+update_match and generate_round_robin_schedule are exercised through the
+Flask test client. Each operation reports its median and best wall time
+over ``--repeat`` runs, the number of SQL statements it executed and its
+peak Python memory allocation (tracemalloc, measured in a separate run so
+it doesn't slow the timed ones).
+
+Results are printed as a table and, with --output, written as JSON.
+--compare checks them against an earlier JSON file and exits with status 1
+if any operation got slower by more than --threshold (default 25%) or
+runs more queries than before.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from _harness import END, START, load_app, seed, team_names, venues_needed
+
+app = load_app()
+
+from sqlalchemy import event  # noqa: E402
+import migrations  # noqa: E402
+from models import db, Match  # noqa: E402
+
+DEFAULT_SIZES = '4x4,16x8,32x16,64x16,128x32'
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self.increment)
+
+    def increment(self, *args):
+        self.count += 1
+
+
+def operations(client, groups, per_group):
+    """Return {name: (setup, call)}; setup() runs untimed before each call(state)."""
+    tournament_id = seed(groups, per_group)
+    with app.app_context():
+        match_ids = db.session.execute(
+            db.select(Match.id).where(Match.tournament_id == tournament_id)).scalars().all()
+    roster = '\n'.join(team_names(groups * per_group, prefix='New'))
+    venues = venues_needed(groups, per_group)
+    match_cycle = iter(match_ids * 100)
+    seeds = iter(range(10 ** 6))
+
+    def next_shuffle_seed():
+        # A different draw each run, but the same sequence every time the suite runs
+        app.config['SHUFFLE_SEED'] = f'bench-{next(seeds)}'
+
+    def no_setup():
+        return None
+
+    def expect(response, status):
+        assert response.status_code == status, (response.status_code, response.data[:200])
+
+    return {
+        'home': (no_setup, lambda _: expect(client.get('/'), 200)),
+        'view_tournament': (no_setup, lambda _: expect(client.get(f'/tournament/{tournament_id}'), 200)),
+        'view_groups': (no_setup, lambda _: expect(client.get(f'/tournament/{tournament_id}/groups'), 200)),
+        'shuffle_groups': (next_shuffle_seed, lambda _: expect(client.get(f'/tournament/{tournament_id}/shuffle'), 302)),
+        'create_tournament': (no_setup, lambda _: expect(client.post('/tournament/create', data={
+            'name': 'Created', 'start_date': START.isoformat(), 'end_date': END.isoformat(),
+            'all_teams': roster, 'num_groups': groups}), 302)),
+        'update_match': (lambda: next(match_cycle), lambda match_id: expect(client.post(
+            f'/match/{match_id}/update', data={'home_score': 2, 'away_score': 1}), 302)),
+        'generate_round_robin_schedule': (
+            lambda: seed(groups, per_group, schedule=False, results=False),
+            lambda new_id: expect(client.post(f'/tournament/{new_id}/schedule', data={'venues': venues}), 302)),
+    }
+
+
+def measure(setup, call, repeat, counter):
+    # Warm-up run, which also compiles templates and fills the statement cache
+    call(setup())
+
+    state = setup()
+    counter.count = 0
+    tracemalloc.start()
+    call(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    queries = counter.count
+
+    timings = []
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        call(state)
+        timings.append(time.perf_counter() - start)
+    return {
+        'median_ms': round(statistics.median(timings) * 1000, 3),
+        'min_ms': round(min(timings) * 1000, 3),
+        'queries': queries,
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run(sizes, repeat):
+    with app.app_context():
+        migrations.upgrade()
+        counter = QueryCounter(db.engine)
+    client = app.test_client(use_cookies=False)
+
+    results = {}
+    for groups, per_group in sizes:
+        label = f'{groups}x{per_group}'
+        print(f'seeding {label} ({groups * per_group} teams)...', file=sys.stderr)
+        results[label] = {}
+        for name, (setup, call) in operations(client, groups, per_group).items():
+            results[label][name] = measure(setup, call, repeat, counter)
+    return results
+
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {'commit': commit or None, 'python': platform.python_version(),
+            'platform': platform.platform(), 'recorded_at': datetime.utcnow().isoformat(timespec='seconds')}
+
+
+def print_table(results):
+    print(f'{"size":<8} {"operation":<31} {"median ms":>10} {"min ms":>10} {"queries":>8} {"peak KB":>10}')
+    for label, operations_ in results.items():
+        for name, row in operations_.items():
+            print(f'{label:<8} {name:<31} {row["median_ms"]:>10.2f} {row["min_ms"]:>10.2f} '
+                  f'{row["queries"]:>8} {row["peak_kb"]:>10.1f}')
+
+
+def compare(results, baseline, threshold):
+    """Return a list of regression messages against a baseline result set."""
+    regressions = []
+    for label, operations_ in results.items():
+        for name, row in operations_.items():
+            before = baseline.get(label, {}).get(name)
+            if before is None:
+                continue
+            if row['median_ms'] > before['median_ms'] * (1 + threshold):
+                regressions.append(f'{label} {name}: {before["median_ms"]:.2f} ms -> {row["median_ms"]:.2f} ms')
+            if row['queries'] > before['queries']:
+                regressions.append(f'{label} {name}: {before["queries"]} -> {row["queries"]} queries')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the main routes at several tournament sizes.')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='Comma-separated GROUPSxTEAMS sizes.')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per operation.')
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    parser.add_argument('--compare', help='Baseline JSON file to check for regressions.')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slowdown against the baseline, as a fraction (default 0.25).')
+    args = parser.parse_args()
+
+    sizes = [tuple(int(n) for n in size.split('x')) for size in args.sizes.split(',')]
+    results = run(sizes, args.repeat)
+    print_table(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': metadata(), 'results': results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for message in regressions:
+            print(f'REGRESSION {message}')
+        if regressions:
+            sys.exit(1)
+        print(f'No regressions against {args.compare} (threshold {args.threshold:.0%}).')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Benchmark: timetable.plan() on large synthetic round robins.
+
+Usage: python benchmarks/bench_timetable.py
+Pure Python, no database. Prints solve time and utilisation metrics.
+"""
+
+import sys
+import time
+from datetime import date
+
+import _harness  # noqa: F401  (puts the project on sys.path)
+
+import scheduling
+import timetable
+
+START, END = date(2024, 6, 1), date(2024, 6, 30)
+BLACKOUTS = [timetable.parse_blackout('2024-06-09'), timetable.parse_blackout('2024-06-16')]
+
+# (groups, teams per group, venues, rest minutes)
+CASES = [(16, 8, 8, 120), (64, 8, 16, 120), (128, 8, 24, 90), (64, 16, 48, 90)]
+
+
+def main():
+    print(f"{'fixtures':>8} {'venues':>6} {'improve':>7} {'time (s)':>8} {'days':>4} {'util':>6} {'unplaced':>8}")
+    for num_groups, per_group, venues, rest in CASES:
+        fixtures = scheduling.round_order({
+            f'Group {g}': scheduling.circle_rounds([(g * 1000 + i, f'Team {i}') for i in range(per_group)])
+            for g in range(num_groups)
+        })
+        for improve in (False, True):
+            start = time.perf_counter()
+            result = timetable.plan(fixtures, START, END, venues=venues, rest_minutes=rest,
+                                    blackouts=BLACKOUTS, improve=improve)
+            elapsed = time.perf_counter() - start
+            m = result.metrics
+            print(f"{len(fixtures):>8} {venues:>6} {str(improve):>7} {elapsed:>8.3f} "
+                  f"{m.get('days_used', 0):>4} {m.get('pitch_utilisation', 0):>6.1%} {m['unscheduled']:>8}")
+
+
+if __name__ == '__main__':
+    main()
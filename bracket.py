@@ -0,0 +1,195 @@
+"""
+Knockout bracket generation for the Tournament Manager application.
+
+The bracket is stored as a binary heap in Match.bracket_slot: the final is
+slot 1, the semifinals slots 2 and 3, the quarterfinals 4-7 and so on. The
+winner of slot s plays in slot s // 2, as the home side when s is even.
+That makes winner propagation a single indexed lookup per result, with no
+need to reload the rest of the bracket.
+"""
+
+from datetime import timedelta
+
+from sqlalchemy import func, insert, select
+
+from models import db, Group, Match
+import ranking
+import timetable
+
+STAGE_NAMES = {1: 'final', 2: 'semifinal', 4: 'quarterfinal'}
+
+
+def stage_name(slot):
+    """Return the stage of a bracket slot: final, semifinal, quarterfinal, round_of_16, ..."""
+    matches_in_round = 1 << (slot.bit_length() - 1)
+    return STAGE_NAMES.get(matches_in_round, f'round_of_{matches_in_round * 2}')
+
+
+def bracket_order(size):
+    """Return seed numbers in bracket order for a power-of-two field.
+
+    Adjacent entries meet in the first round, and seeds 1 and 2 can only
+    meet in the final: [1, 4, 2, 3] for 4, [1, 8, 4, 5, 2, 7, 3, 6] for 8.
+    """
+    order = [1]
+    while len(order) < size:
+        total = len(order) * 2 + 1
+        order = [seed for s in order for seed in (s, total - s)]
+    return order
+
+
+def qualifiers(tournament, per_group):
+    """Return the qualified teams as (team_id, team_name, group_id), in seed order.
+
+    All group winners are seeded first, then all runners-up, and so on.
+    Group positions include tie-breakers; within a tier, teams from
+    different groups are ordered by points, goal difference and goals.
+    """
+    tables = ranking.tournament_tables(tournament.id)
+
+    seeded = []
+    for position in range(per_group):
+        tier = [table.rows[position] for table in tables if position < len(table.rows)]
+        tier.sort(key=lambda row: (-row['points'], -(row['goals_for'] - row['goals_against']), -row['goals_for']))
+        seeded.extend((row['team_id'], row['name'], row['group_id']) for row in tier)
+    return seeded
+
+
+def _avoid_group_rematches(entries, size):
+    """Swap entries so that no first-round match is between teams of the same group.
+
+    ``entries`` is the bracket-ordered list of qualifier tuples (or None for
+    a bye). The lower-seeded side of a clashing pair is swapped with the
+    lower-seeded side of the nearest pair where the swap removes the clash
+    without creating a new one.
+    """
+    def clash(a, b):
+        return a is not None and b is not None and a[2] == b[2]
+
+    for i in range(0, size, 2):
+        if not clash(entries[i], entries[i + 1]):
+            continue
+        for distance in range(2, size, 2):
+            for j in (i + distance, i - distance):
+                if 0 <= j < size and entries[j + 1] is not None:
+                    if not clash(entries[i], entries[j + 1]) and not clash(entries[j], entries[i + 1]):
+                        entries[i + 1], entries[j + 1] = entries[j + 1], entries[i + 1]
+                        break
+            else:
+                continue
+            break
+    return entries
+
+
+def build_bracket(seeded):
+    """Return {slot: (home, away)} for every match in the bracket.
+
+    ``home``/``away`` are qualifier tuples, or None when the side is decided
+    by an earlier match. Top seeds get byes when the field isn't a power of
+    two; a bye puts the team straight into its second-round slot.
+    """
+    if len(seeded) < 2:
+        raise ValueError('At least two qualified teams are needed for a knockout stage')
+
+    size = 1
+    while size < len(seeded):
+        size *= 2
+
+    entries = [seeded[seed - 1] if seed <= len(seeded) else None for seed in bracket_order(size)]
+    entries = _avoid_group_rematches(entries, size)
+
+    slots = {slot: [None, None] for slot in range(1, size)}
+    first_round = size // 2
+    for i in range(0, size, 2):
+        slot = first_round + i // 2
+        home, away = entries[i], entries[i + 1]
+        if home is not None and away is not None:
+            slots[slot] = [home, away]
+        else:
+            # Bye: the team goes straight through to the next round
+            del slots[slot]
+            advancing = home or away
+            if slot > 1:
+                slots[slot // 2][slot % 2] = advancing
+    return {slot: tuple(sides) for slot, sides in slots.items()}
+
+
+def create_knockout_matches(tournament, per_group=2, venues=1):
+    """Seed the bracket from the group standings and insert all its matches.
+
+    Rounds are played on consecutive days after the last group match, using
+    ``venues`` pitches in parallel. Returns the number of matches created.
+    The caller is responsible for committing.
+    """
+    existing = db.session.execute(
+        select(Match.id).where(Match.tournament_id == tournament.id, Match.bracket_slot.isnot(None)).limit(1)
+    ).first()
+    if existing is not None:
+        raise ValueError('The knockout bracket has already been created')
+
+    group_count = db.session.execute(
+        select(func.count(Group.id)).where(Group.tournament_id == tournament.id)
+    ).scalar()
+    if group_count * per_group < 2:
+        raise ValueError('At least two qualified teams are needed for a knockout stage')
+
+    slots = build_bracket(qualifiers(tournament, per_group))
+
+    last_group_day = db.session.execute(
+        select(func.max(Match.match_date)).where(Match.tournament_id == tournament.id)
+    ).scalar()
+    day = (last_group_day or tournament.start_date - timedelta(days=1)) + timedelta(days=1)
+
+    rows = []
+    for round_start in sorted({1 << (slot.bit_length() - 1) for slot in slots}, reverse=True):
+        round_slots = [slot for slot in range(round_start, round_start * 2) if slot in slots]
+        kickoffs = timetable.kickoff_times(day, day + timedelta(days=len(round_slots)))
+        for i, slot in enumerate(round_slots):
+            home, away = slots[slot]
+            kickoff = kickoffs[i // venues]
+            rows.append({
+                'tournament_id': tournament.id,
+                'home_team_id': home[0] if home else None,
+                'away_team_id': away[0] if away else None,
+                'home_team_name': home[1] if home else None,
+                'away_team_name': away[1] if away else None,
+                'match_date': kickoff.date(),
+                'match_time': kickoff.time(),
+                'venue': f'Pitch {i % venues + 1}',
+                'stage': stage_name(slot),
+                'bracket_slot': slot,
+                'status': 'scheduled',
+            })
+        day = rows[-1]['match_date'] + timedelta(days=1)
+
+    db.session.execute(insert(Match), rows)
+    return len(rows)
+
+
+def advance_winner(match):
+    """Put the winner of a completed knockout match into its next-round slot.
+
+    Returns True when the match was the final. Raises ValueError for a draw
+    or when the next-round match has already been played. The caller is
+    responsible for committing.
+    """
+    if match.home_score == match.away_score:
+        raise ValueError('Knockout matches need a winner')
+    if match.bracket_slot == 1:
+        return True
+
+    if match.home_score > match.away_score:
+        winner = (match.home_team_id, match.home_team_name)
+    else:
+        winner = (match.away_team_id, match.away_team_name)
+
+    parent = Match.query.filter_by(tournament_id=match.tournament_id,
+                                   bracket_slot=match.bracket_slot // 2).one()
+    if parent.status == 'completed':
+        raise ValueError('The next round match has already been played')
+
+    if match.bracket_slot % 2 == 0:
+        parent.home_team_id, parent.home_team_name = winner
+    else:
+        parent.away_team_id, parent.away_team_name = winner
+    return False
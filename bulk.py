@@ -0,0 +1,102 @@
+"""
+Bulk tournament creation for the Tournament Manager application.
+
+Large rosters (open leagues with thousands of teams) are inserted with a
+handful of set-based statements instead of one ORM object per team: groups
+and teams go in as executemany inserts and the standings rows are filled
+with a single INSERT ... SELECT.
+"""
+
+import csv
+import io
+
+from sqlalchemy import insert, literal, select
+
+from models import db, Tournament, Group, Team, Standing
+
+
+def group_label(index):
+    """Return the letter(s) for the group at ``index``: A..Z, then AA, AB, ..."""
+    label = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        label = chr(65 + remainder) + label
+    return label
+
+
+def split_into_groups(items, num_groups):
+    """Distribute ``items`` evenly over ``num_groups`` consecutive slices.
+
+    Earlier groups get an extra item when the count doesn't divide evenly.
+    """
+    per_group, remainder = divmod(len(items), num_groups)
+    slices = []
+    start = 0
+    for i in range(num_groups):
+        end = start + per_group + (1 if i < remainder else 0)
+        slices.append(items[start:end])
+        start = end
+    return slices
+
+
+def parse_team_csv(text):
+    """Return the team names from CSV text, one team per row.
+
+    The first column is used. A header row whose first cell is ``name`` or
+    ``team`` is skipped.
+    """
+    names = []
+    for i, row in enumerate(csv.reader(io.StringIO(text))):
+        if not row or not row[0].strip():
+            continue
+        if i == 0 and row[0].strip().lower() in ('name', 'team'):
+            continue
+        names.append(row[0].strip())
+    return names
+
+
+def create_tournament(name, start_date, end_date, team_names, num_groups):
+    """Create a tournament with its groups, teams and standings rows.
+
+    Returns a dict with the new ``tournament_id`` and the ``group_ids`` and
+    ``team_ids`` in creation order. Raises ValueError for invalid input.
+    The caller is responsible for committing.
+    """
+    if num_groups < 1:
+        raise ValueError('A tournament needs at least one group')
+    if len(team_names) < num_groups:
+        raise ValueError('You need at least as many teams as groups')
+
+    tournament = Tournament(name=name, start_date=start_date, end_date=end_date, status='group')
+    db.session.add(tournament)
+    db.session.flush()
+
+    db.session.execute(insert(Group), [
+        {'name': f'Group {group_label(i)}', 'tournament_id': tournament.id}
+        for i in range(num_groups)
+    ])
+    group_ids = db.session.execute(
+        select(Group.id).where(Group.tournament_id == tournament.id).order_by(Group.id)
+    ).scalars().all()
+
+    team_rows = []
+    for group_id, names in zip(group_ids, split_into_groups(team_names, num_groups)):
+        team_rows.extend({'name': team_name, 'group_id': group_id} for team_name in names)
+    db.session.execute(insert(Team), team_rows)
+
+    team_ids = db.session.execute(
+        select(Team.id).join(Group).where(Group.tournament_id == tournament.id).order_by(Team.id)
+    ).scalars().all()
+
+    # One zeroed standings row per team, straight from the teams table
+    zero = literal(0)
+    db.session.execute(insert(Standing).from_select(
+        ['tournament_id', 'group_id', 'team_id', 'team_name', 'played', 'wins', 'draws',
+         'losses', 'goals_for', 'goals_against', 'points'],
+        select(literal(tournament.id), Team.group_id, Team.id, Team.name,
+               zero, zero, zero, zero, zero, zero, zero)
+        .join(Group).where(Group.tournament_id == tournament.id)
+    ))
+
+    return {'tournament_id': tournament.id, 'group_ids': group_ids, 'team_ids': team_ids}
@@ -0,0 +1,288 @@
+"""
+Rendered-page cache for the Tournament Manager application.
+
+Pages are cached under a key that includes a version token: the
+tournament's ``version`` column for tournament pages, and an aggregate over
+all tournaments for the home page. Every write route calls bump() in its
+transaction, so a changed tournament simply gets a new key; stale entries
+are never served and age out of the backend on their own. bump() also
+stamps changed matches with the new version for the API's delta queries.
+
+Responses carry an ETag derived from the key and a Last-Modified header, and
+are marked ``no-cache`` so browsers revalidate and get a 304 when nothing
+changed.
+
+Backends:
+  memory  in-process LRU (default)
+  sqlite  a SQLite file shared by all gunicorn workers on the host
+  none    caching disabled (conditional requests still work)
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from sqlalchemy import event, func, or_, select, update
+from sqlalchemy.orm import Session
+
+import snapshot
+from models import db, Tournament, Match
+
+
+class LRUBackend:
+    """Thread-safe in-process LRU of rendered pages."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """Pages stored in a SQLite file, shared between worker processes.
+
+    Keeps at most ``maxsize`` entries, evicting the least recently stored.
+    """
+
+    def __init__(self, path, maxsize=1024):
+        self.path = path
+        self.maxsize = maxsize
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS page_cache '
+                         '(key TEXT PRIMARY KEY, body BLOB NOT NULL, stored_at REAL NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute('SELECT body FROM page_cache WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value):
+        conn = self._connect()
+        conn.execute('INSERT OR REPLACE INTO page_cache (key, body, stored_at) VALUES (?, ?, ?)',
+                     (key, value, time.time()))
+        conn.execute('DELETE FROM page_cache WHERE key IN (SELECT key FROM page_cache '
+                     'ORDER BY stored_at DESC LIMIT -1 OFFSET ?)', (self.maxsize,))
+
+    def clear(self):
+        self._connect().execute('DELETE FROM page_cache')
+
+
+class PageCache:
+    """Page cache plus hit/miss counters for this process."""
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    def count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def init_app(app):
+    """Create the page cache configured by PAGE_CACHE / PAGE_CACHE_SIZE / PAGE_CACHE_PATH."""
+    kind = app.config.get('PAGE_CACHE', 'memory')
+    size = app.config.get('PAGE_CACHE_SIZE', 256)
+    if kind == 'memory':
+        backend = LRUBackend(size)
+    elif kind == 'sqlite':
+        backend = SQLiteBackend(app.config['PAGE_CACHE_PATH'], size)
+    elif kind == 'none':
+        backend = None
+    else:
+        raise ValueError(f"Unknown PAGE_CACHE backend '{kind}'")
+    app.extensions['page_cache'] = PageCache(backend)
+
+
+def get_cache():
+    return current_app.extensions['page_cache']
+
+
+def bump(tournament_id):
+    """Record a change to a tournament. Call inside the write transaction, after the writes.
+
+    Increments the tournament version, which invalidates its cached pages,
+    and stamps the new version on every match changed in this transaction:
+    Match objects the session has flushed changes for, plus rows inserted in
+    bulk (which have no version yet). Returns the new version; the
+    read-model snapshot is rebuilt once the transaction commits (see
+    snapshot.py).
+    """
+    db.session.flush()
+    touched = db.session.info.pop('touched_matches', set())
+
+    db.session.execute(
+        update(Tournament)
+        .where(Tournament.id == tournament_id)
+        .values(version=Tournament.version + 1, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    version = db.session.execute(
+        select(Tournament.version).where(Tournament.id == tournament_id)
+    ).scalar()
+
+    changed = Match.updated_version.is_(None)
+    if touched:
+        changed = or_(changed, Match.id.in_(touched))
+    db.session.execute(
+        update(Match)
+        .where(Match.tournament_id == tournament_id, changed)
+        .values(updated_version=version)
+        .execution_options(synchronize_session='fetch' if touched else False)
+    )
+    snapshot.refresh_after_commit(tournament_id, version)
+    return version
+
+
+def touch_matches(match_ids):
+    """Mark matches changed by Core UPDATEs, which the flush listener can't see."""
+    db.session.info.setdefault('touched_matches', set()).update(match_ids)
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_touched_matches(session, flush_context, instances):
+    """Remember which matches the ORM writes, for bump() to stamp with the new version."""
+    touched = session.info.setdefault('touched_matches', set())
+    for obj in session.dirty:
+        if isinstance(obj, Match) and session.is_modified(obj):
+            touched.add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _forget_touched_matches(session):
+    session.info.pop('touched_matches', None)
+
+
+def tournament_token(tournament_id):
+    """Return (version token, last modified) for a tournament, or None if it doesn't exist."""
+    row = db.session.execute(
+        select(Tournament.version, Tournament.updated_at).where(Tournament.id == tournament_id)
+    ).first()
+    if row is None:
+        return None
+    return str(row.version), row.updated_at
+
+
+def home_token():
+    """Return (version token, last modified) covering every tournament.
+
+    Every write goes through bump(), which sets updated_at, so the newest
+    updated_at and the highest ID change whenever anything does. Both are
+    index lookups, so the token costs the same however many tournaments
+    there are.
+    """
+    # Separate subqueries, so each MAX() is answered from its index
+    last_id, last_modified = db.session.execute(select(
+        select(func.max(Tournament.id)).scalar_subquery(),
+        select(func.max(Tournament.updated_at)).scalar_subquery(),
+    )).one()
+    return f'{last_id or 0}.{last_modified.isoformat() if last_modified else 0}', last_modified
+
+
+def cached_value(name, token, build):
+    """Return ``build()``, cached as JSON under ``name`` and a version token.
+
+    For figures shared by many cached pages, such as the home page totals,
+    which every filter and page of the listing would otherwise recompute.
+    """
+    page_cache = get_cache()
+    key = f'{name}:{token}'
+    body = page_cache.backend.get(key) if page_cache.backend else None
+    if body is not None:
+        return json.loads(body)
+    value = build()
+    if page_cache.backend:
+        page_cache.backend.set(key, json.dumps(value).encode())
+    return value
+
+
+def cached_page(name, token_func):
+    """Cache a GET view's rendered HTML under ``name`` and the current version token.
+
+    ``token_func`` receives the view arguments and returns (token, last
+    modified), or None to skip caching (e.g. the tournament doesn't exist).
+    Requests with pending flash messages bypass the cache, since those are
+    rendered into the page.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            page_cache = get_cache()
+            token = token_func(**kwargs)
+            if token is None or session.get('_flashes'):
+                return view(**kwargs)
+
+            version, last_modified = token
+            key = ':'.join([name] + [str(kwargs[k]) for k in sorted(kwargs)]
+                           + [request.query_string.decode(), version])
+            etag = hashlib.sha1(key.encode()).hexdigest()
+
+            if request.if_none_match.contains(etag):
+                page_cache.count('not_modified')
+                response = make_response('', 304)
+            else:
+                body = page_cache.backend.get(key) if page_cache.backend else None
+                if body is None:
+                    page_cache.count('misses')
+                    response = make_response(view(**kwargs))
+                    if response.status_code != 200 or session.get('_flashes'):
+                        return response
+                    if page_cache.backend:
+                        page_cache.backend.set(key, response.get_data())
+                else:
+                    page_cache.count('hits')
+                    response = make_response(body)
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
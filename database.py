@@ -0,0 +1,80 @@
+"""
+Database engine configuration for the Tournament Manager application.
+
+Engine options come from the environment so one build can run on SQLite in
+development and on PostgreSQL in production:
+
+  PostgreSQL (and other server databases)
+    DB_POOL_SIZE       connections kept open per worker process (default 5)
+    DB_MAX_OVERFLOW    extra connections allowed under load (default 10)
+    DB_POOL_TIMEOUT    seconds to wait for a free connection (default 30)
+    DB_POOL_RECYCLE    seconds before a connection is replaced (default 1800)
+    DB_POOL_PRE_PING   test connections before use (default on)
+
+  SQLite, applied as PRAGMAs on every new connection
+    SQLITE_JOURNAL_MODE  default WAL, so readers don't block the writer
+    SQLITE_BUSY_TIMEOUT  milliseconds to wait for a lock (default 5000)
+    SQLITE_SYNCHRONOUS   default NORMAL, which is safe with WAL
+    SQLITE_MMAP_SIZE     bytes of the file to memory-map (default 256 MiB)
+"""
+
+import os
+
+from sqlalchemy import event
+
+from models import db
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+def database_uri(environ=os.environ):
+    """Return the configured database URI.
+
+    Hosting platforms often hand out ``postgres://`` URLs, which SQLAlchemy
+    only accepts as ``postgresql://``.
+    """
+    uri = environ.get('DATABASE_URL', 'sqlite:///tournament.db')
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def engine_options(uri, environ=os.environ):
+    """Return SQLALCHEMY_ENGINE_OPTIONS for ``uri``."""
+    if uri.startswith('sqlite'):
+        # pysqlite's own lock timeout, in seconds; the PRAGMA below sets the same
+        return {'connect_args': {'timeout': int(environ.get('SQLITE_BUSY_TIMEOUT', 5000)) / 1000}}
+    return {
+        'pool_size': int(environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': environ.get('DB_POOL_PRE_PING', 'true').lower() in TRUE_VALUES,
+    }
+
+
+def sqlite_pragmas(environ=os.environ):
+    """Return the (name, value) PRAGMAs to run on each new SQLite connection."""
+    return [
+        ('journal_mode', environ.get('SQLITE_JOURNAL_MODE', 'wal')),
+        ('busy_timeout', int(environ.get('SQLITE_BUSY_TIMEOUT', 5000))),
+        ('synchronous', environ.get('SQLITE_SYNCHRONOUS', 'normal')),
+        ('mmap_size', int(environ.get('SQLITE_MMAP_SIZE', 268435456))),
+    ]
+
+
+def init_app(app):
+    """Install the SQLite PRAGMA hook on the app's engine. Call after db.init_app()."""
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite' or engine.url.database in (None, '', ':memory:'):
+        return
+
+    pragmas = app.config.get('SQLITE_PRAGMAS', [])
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
@@ -0,0 +1,92 @@
+"""
+Group draws for the Tournament Manager application.
+
+Teams are moved between groups in place: the draw computes a new group for
+every team and applies it with one executemany UPDATE of teams.group_id,
+so team IDs (and the matches that reference them) survive a reshuffle.
+"""
+
+import random
+
+from sqlalchemy import bindparam, select, update
+
+from models import db, Group, Team, Standing
+from bulk import split_into_groups
+
+DRAW_MODES = ('random', 'pots')
+
+
+def make_rng(seed=None):
+    """Return a private random generator, so draws never reseed the global one."""
+    return random.Random(seed)
+
+
+def random_draw(team_ids, group_ids, rng):
+    """Shuffle all teams and deal them out in even, consecutive slices."""
+    shuffled = list(team_ids)
+    rng.shuffle(shuffled)
+    assignment = {}
+    for group_id, members in zip(group_ids, split_into_groups(shuffled, len(group_ids))):
+        for team_id in members:
+            assignment[team_id] = group_id
+    return assignment
+
+
+def pot_draw(team_ids, group_ids, rng):
+    """Seeded-pot draw: every group gets one team from each pot.
+
+    ``team_ids`` must be in seeding order. Pot 1 holds the top len(group_ids)
+    seeds, pot 2 the next ones, and so on. Each pot is shuffled and dealt one
+    team per group; a short final pot fills the earlier groups.
+    """
+    num_groups = len(group_ids)
+    assignment = {}
+    for start in range(0, len(team_ids), num_groups):
+        pot = list(team_ids[start:start + num_groups])
+        rng.shuffle(pot)
+        for group_id, team_id in zip(group_ids, pot):
+            assignment[team_id] = group_id
+    return assignment
+
+
+def shuffle_teams(tournament, mode='random', seed=None):
+    """Reassign a tournament's teams to its groups in place.
+
+    Teams keep their IDs and match history; only group_id changes. Team
+    entry order (ID order) is used as the seeding for pot draws. Returns the
+    number of teams that changed group. The caller is responsible for
+    committing, so the whole draw is a single transaction.
+    """
+    if mode not in DRAW_MODES:
+        raise ValueError(f"Unknown draw mode '{mode}'")
+
+    group_ids = db.session.execute(
+        select(Group.id).where(Group.tournament_id == tournament.id).order_by(Group.id)
+    ).scalars().all()
+    if not group_ids:
+        return 0
+
+    current = dict(db.session.execute(
+        select(Team.id, Team.group_id).where(Team.group_id.in_(group_ids)).order_by(Team.id)
+    ).all())
+
+    draw = pot_draw if mode == 'pots' else random_draw
+    assignment = draw(list(current), group_ids, make_rng(seed))
+    if len(assignment) != len(current):
+        raise ValueError(f"Team count mismatch: {len(current)} before, {len(assignment)} after")
+
+    moved = [{'b_team_id': team_id, 'new_group_id': group_id}
+             for team_id, group_id in assignment.items() if current[team_id] != group_id]
+    if moved:
+        # One prepared UPDATE per table, executed for all moved teams at once
+        for model, key in ((Team, Team.id), (Standing, Standing.team_id)):
+            db.session.execute(
+                update(model.__table__)
+                .where(key == bindparam('b_team_id'))
+                .values(group_id=bindparam('new_group_id')),
+                moved,
+            )
+
+    # Loaded teams/groups are stale after the bulk UPDATEs
+    db.session.expire_all()
+    return len(moved)
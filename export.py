@@ -0,0 +1,280 @@
+"""
+CSV and iCalendar exports for the Tournament Manager application.
+
+Fixtures are streamed: the SELECT runs with a server-side cursor and
+``yield_per``, and each partition of rows is encoded and sent as one chunk
+of a generator response, so the first bytes leave immediately and a season
+of any size exports in constant memory. Fixture exports accept the filters
+
+  group   group name, e.g. ``Group A``
+  team    team ID (matches where the team plays home or away)
+  from    first date, ``YYYY-MM-DD``
+  to      last date, ``YYYY-MM-DD``
+  stage   ``group``, ``knockout`` or a knockout round such as ``semifinal``
+
+Every export carries an ETag derived from the URL and the tournament's
+version, so calendar apps that poll a team feed get a 304 until a result,
+draw or schedule changes.
+"""
+
+import csv
+import hashlib
+from datetime import datetime, timedelta
+
+from flask import Blueprint, Response, jsonify, make_response, request, stream_with_context
+from sqlalchemy import or_, select
+
+from models import db, Tournament, Group, Team, Match
+import cache
+import ranking
+
+bp = Blueprint('export', __name__)
+
+PARTITION_ROWS = 1000
+
+FIXTURE_COLUMNS = (Match.id, Match.stage, Match.group_name, Match.match_date, Match.match_time,
+                   Match.venue, Match.home_team_name, Match.away_team_name, Match.home_score,
+                   Match.away_score, Match.status, Match.updated_version)
+STANDING_FIELDS = ('played', 'wins', 'draws', 'losses', 'goals_for', 'goals_against', 'points')
+
+
+class _Line:
+    """File-like target that hands back what csv.writer writes to it."""
+
+    def write(self, text):
+        return text
+
+
+def _error(message, status):
+    return jsonify({'error': message}), status
+
+
+def _parse_date(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError('Dates must be YYYY-MM-DD') from None
+
+
+def _team_name(tournament_id, team_id):
+    """Return the name of a team in the tournament, or None if it isn't one of its teams."""
+    return db.session.execute(
+        select(Team.name).join(Group, Group.id == Team.group_id)
+        .where(Team.id == team_id, Group.tournament_id == tournament_id)
+    ).scalar()
+
+
+def fixtures_query(tournament_id, group=None, team_id=None, start=None, end=None, stage=None):
+    """Return the SELECT for a tournament's fixtures in kickoff order, narrowed by the given filters."""
+    statement = select(*FIXTURE_COLUMNS).where(Match.tournament_id == tournament_id)
+    if group:
+        statement = statement.where(Match.group_name == group)
+    if team_id is not None:
+        statement = statement.where(or_(Match.home_team_id == team_id, Match.away_team_id == team_id))
+    if start is not None:
+        statement = statement.where(Match.match_date >= start)
+    if end is not None:
+        statement = statement.where(Match.match_date <= end)
+    if stage == 'knockout':
+        statement = statement.where(Match.stage != 'group')
+    elif stage:
+        statement = statement.where(Match.stage == stage)
+    return statement.order_by(Match.match_date, Match.match_time, Match.id)
+
+
+def _filters(tournament_id, team_id=None):
+    """Read the fixture filters from the query string.
+
+    Raises ValueError for a malformed value and LookupError for a team that
+    doesn't play in the tournament, rather than exporting every fixture.
+    """
+    team = request.args.get('team')
+    if team_id is None and team:
+        try:
+            team_id = int(team)
+        except ValueError:
+            raise ValueError('Team must be a team ID') from None
+        if _team_name(tournament_id, team_id) is None:
+            raise LookupError('Team not found')
+    return {
+        'group': request.args.get('group'),
+        'team_id': team_id,
+        'start': _parse_date('from'),
+        'end': _parse_date('to'),
+        'stage': request.args.get('stage'),
+    }
+
+
+def stream_rows(statement):
+    """Yield lists of rows from a streamed SELECT, PARTITION_ROWS at a time."""
+    result = db.session.execute(statement.execution_options(stream_results=True)).yield_per(PARTITION_ROWS)
+    for partition in result.partitions():
+        yield partition
+
+
+def _exported(name, tournament_id, generate, mimetype, filename):
+    """Return a streamed export response, or a 304 if the client's copy is current.
+
+    ``generate`` is called with the tournament's last-changed time, which
+    moves with the version the ETag is derived from.
+    """
+    token = cache.tournament_token(tournament_id)
+    if token is None:
+        return _error('Tournament not found', 404)
+    version, last_modified = token
+    key = ':'.join(['export', name, request.path, request.query_string.decode(), version])
+    etag = hashlib.sha1(key.encode()).hexdigest()
+
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = Response(stream_with_context(generate(last_modified)), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def fixtures_csv(statement):
+    """Yield a fixtures CSV, one chunk per partition of rows."""
+    writer = csv.writer(_Line())
+    yield writer.writerow([column.key for column in FIXTURE_COLUMNS])
+    for rows in stream_rows(statement):
+        yield ''.join(writer.writerow(row) for row in rows)
+
+
+def _ics_text(value):
+    """Escape a value for an iCalendar TEXT property."""
+    return (str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _ics_line(name, value):
+    """Return a content line, folded at 75 octets as RFC 5545 requires."""
+    text = f'{name}:{value}'
+    if len(text) <= 75 and text.isascii():
+        return text + '\r\n'
+    line = text.encode()
+    chunks = []
+    limit = 75
+    while len(line) > limit:
+        cut = limit
+        # Don't split a multi-byte UTF-8 character across lines
+        while (line[cut] & 0xC0) == 0x80:
+            cut -= 1
+        chunks.append(line[:cut])
+        line = line[cut:]
+        limit = 74  # continuation lines start with a space
+    chunks.append(line)
+    return b'\r\n '.join(chunks).decode() + '\r\n'
+
+
+def _ics_event(row, tournament_id, stamp, duration):
+    start = datetime.combine(row.match_date, row.match_time)
+    summary = f'{row.home_team_name or "TBD"} vs {row.away_team_name or "TBD"}'
+    if row.status == 'completed':
+        summary = f'{row.home_team_name} {row.home_score}-{row.away_score} {row.away_team_name}'
+    description = row.group_name if row.stage == 'group' else row.stage.replace('_', ' ').title()
+    lines = [
+        'BEGIN:VEVENT\r\n',
+        _ics_line('UID', f'match-{row.id}-{tournament_id}@tournament-manager'),
+        _ics_line('DTSTAMP', stamp),
+        _ics_line('DTSTART', start.strftime('%Y%m%dT%H%M%S')),
+        _ics_line('DTEND', (start + duration).strftime('%Y%m%dT%H%M%S')),
+        _ics_line('SEQUENCE', row.updated_version or 0),
+        _ics_line('SUMMARY', _ics_text(summary)),
+        _ics_line('DESCRIPTION', _ics_text(description or '')),
+    ]
+    if row.venue:
+        lines.append(_ics_line('LOCATION', _ics_text(row.venue)))
+    lines.append('END:VEVENT\r\n')
+    return ''.join(lines)
+
+
+def fixtures_ics(statement, tournament_id, calendar_name, changed_at=None):
+    """Yield an iCalendar feed of the fixtures, one chunk per partition of rows.
+
+    Times are floating (local to the venue), which is how they are stored.
+    DTSTAMP is ``changed_at``, the tournament's last change, so a feed is
+    byte for byte the same for as long as its ETag is; SEQUENCE is the
+    match's last-changed version, so calendar apps replace events whose
+    time or score changed.
+    """
+    import timetable  # Lazily imported, see app.LAZY_MODULES
+
+    stamp = (changed_at or datetime(1970, 1, 1)).strftime('%Y%m%dT%H%M%SZ')
+    duration = timedelta(minutes=timetable.DEFAULT_MATCH_MINUTES)
+    yield ''.join([
+        'BEGIN:VCALENDAR\r\n',
+        'VERSION:2.0\r\n',
+        'PRODID:-//Tournament Manager//Fixtures//EN\r\n',
+        'CALSCALE:GREGORIAN\r\n',
+        _ics_line('X-WR-CALNAME', _ics_text(calendar_name)),
+    ])
+    for rows in stream_rows(statement):
+        yield ''.join(_ics_event(row, tournament_id, stamp, duration) for row in rows)
+    yield 'END:VCALENDAR\r\n'
+
+
+def standings_csv(tournament_id):
+    """Yield the group tables in ranking order as CSV."""
+    writer = csv.writer(_Line())
+    yield writer.writerow(('group', 'position', 'team') + STANDING_FIELDS)
+    for table in ranking.tournament_tables(tournament_id):
+        yield ''.join(writer.writerow([table.name, position, row['name']] + [row[field] for field in STANDING_FIELDS])
+                      for position, row in enumerate(table.rows, 1))
+
+
+@bp.route('/tournament/<int:tournament_id>/export/fixtures.csv')
+def export_fixtures_csv(tournament_id):
+    """Fixtures and results as CSV, with optional filters."""
+    try:
+        statement = fixtures_query(tournament_id, **_filters(tournament_id))
+    except LookupError as error:
+        return _error(str(error), 404)
+    except ValueError as error:
+        return _error(str(error), 400)
+    return _exported('fixtures.csv', tournament_id, lambda changed_at: fixtures_csv(statement),
+                     'text/csv', f'tournament-{tournament_id}-fixtures.csv')
+
+
+@bp.route('/tournament/<int:tournament_id>/export/fixtures.ics')
+def export_fixtures_ics(tournament_id):
+    """Fixtures as an iCalendar feed, with optional filters."""
+    try:
+        statement = fixtures_query(tournament_id, **_filters(tournament_id))
+    except LookupError as error:
+        return _error(str(error), 404)
+    except ValueError as error:
+        return _error(str(error), 400)
+    name = db.session.execute(select(Tournament.name).where(Tournament.id == tournament_id)).scalar()
+    return _exported('fixtures.ics', tournament_id,
+                     lambda changed_at: fixtures_ics(statement, tournament_id, name or '', changed_at),
+                     'text/calendar', f'tournament-{tournament_id}.ics')
+
+
+@bp.route('/tournament/<int:tournament_id>/export/standings.csv')
+def export_standings_csv(tournament_id):
+    """Group tables in ranking order as CSV."""
+    return _exported('standings.csv', tournament_id, lambda changed_at: standings_csv(tournament_id),
+                     'text/csv', f'tournament-{tournament_id}-standings.csv')
+
+
+@bp.route('/tournament/<int:tournament_id>/team/<int:team_id>/calendar.ics')
+def team_calendar(tournament_id, team_id):
+    """A team's fixtures as an iCalendar feed to subscribe to; date and stage filters apply."""
+    team_name = _team_name(tournament_id, team_id)
+    if team_name is None:
+        return _error('Team not found', 404)
+    try:
+        statement = fixtures_query(tournament_id, **_filters(tournament_id, team_id))
+    except ValueError as error:
+        return _error(str(error), 400)
+    return _exported('team.ics', tournament_id,
+                     lambda changed_at: fixtures_ics(statement, tournament_id, team_name, changed_at),
+                     'text/calendar', f'team-{team_id}.ics')
@@ -0,0 +1,386 @@
+"""
+Qualification forecasts for the Tournament Manager application.
+
+The rest of the group stage is played out many times (Monte Carlo): every
+scheduled group match gets a random scoreline, the group tables are ranked,
+and each team's chance to qualify (finish in the top KNOCKOUT_QUALIFIERS of
+its group) and to win its group is the share of runs in which it did.
+
+Goals are Poisson-distributed. A team's scoring and conceding rates are its
+averages so far, shrunk towards the tournament average by PRIOR_MATCHES
+matches' worth of it, so early results don't swing the figures too far.
+Simulated tables are ranked on points, goal difference and goals scored,
+then entry order, like the leading FIFA criteria in ranking.py; the
+head-to-head and fair-play tie-breakers are not simulated. A group with
+every match played is not simulated at all: its chances are read off the
+real table from ranking.py, tie-breakers included, so they always agree.
+
+Runs are split into chunks of a fixed size, each with its own seed derived
+from FORECAST_SEED, so the same results always give the same figures
+whether the chunks run in one process or are spread over a pool of
+FORECAST_PROCESSES worker processes. With NumPy installed a chunk is
+simulated as arrays (runs x matches); otherwise a pure-Python fallback
+samples each scoreline from a precomputed table. NumPy is in
+requirements.txt; should it be missing anyway, a warning is logged and
+the default FORECAST_ITERATIONS drops from 20000 to 2000 so that a
+forecast still finishes in about the same time.
+
+Forecasts are stored in the ``tournament_forecasts`` table with the
+tournament version they are current for and a hash of the simulation
+inputs. A forecast stays current through writes that don't change the
+inputs (e.g. moving a kickoff); a changed result is simulated again by the
+forecast job, which is the only writer. current() never writes, so pages
+that show the forecast stay read-only.
+"""
+
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+from bisect import bisect
+from collections import namedtuple
+from itertools import accumulate
+
+from flask import current_app
+from sqlalchemy import delete, insert, select
+
+from models import db, Tournament, Group, Team, Match, TournamentForecast
+import ranking
+from ranking import get_numpy
+
+PRIOR_MATCHES = 3
+DEFAULT_GOALS = 1.3  # Goals per team per match before any results are in
+MAX_GOALS = 10  # Goals a side can score in a simulated match
+CHUNK_CELLS = 2_000_000  # Runs x matches simulated per chunk, bounding its memory
+MAX_CHUNK = 2000
+POOL_MIN_CELLS = 4_000_000  # Smaller forecasts finish sooner than the worker pool can be fed
+DEFAULT_ITERATIONS = 20000
+FALLBACK_ITERATIONS = 2000  # Default without NumPy, where a run costs about ten times as much
+
+# Teams are numbered 0..n-1 in group order, then entry order. points,
+# goal_difference and goals_for are the totals from completed matches;
+# home, away and the rates describe the scheduled matches still to play.
+Inputs = namedtuple('Inputs', 'team_ids group_of points goal_difference goals_for '
+                              'home away home_rate away_rate qualifiers')
+Chance = namedtuple('Chance', 'qualify first')
+Forecast = namedtuple('Forecast', 'version iterations chances')
+
+
+def inputs(tournament_id, qualifiers):
+    """Read what the simulation needs from the database."""
+    teams = db.session.execute(
+        select(Team.id, Team.group_id, Group.name)
+        .join(Group, Group.id == Team.group_id)
+        .where(Group.tournament_id == tournament_id)
+        .order_by(Group.id, Team.id)
+    ).all()
+    group_index = {}
+    team_index = {team_id: i for i, (team_id, _, _) in enumerate(teams)}
+    group_of = [group_index.setdefault(group_id, len(group_index)) for _, group_id, _ in teams]
+    group_names = [name for _, _, name in teams]
+
+    count = len(teams)
+    points, goals_for, goals_against, played = [0] * count, [0] * count, [0] * count, [0] * count
+    home, away = [], []
+    for home_id, away_id, home_score, away_score, status, group_name in db.session.execute(
+            select(Match.home_team_id, Match.away_team_id, Match.home_score, Match.away_score,
+                   Match.status, Match.group_name)
+            .where(Match.tournament_id == tournament_id, Match.stage == 'group')
+            .order_by(Match.id)):
+        h, a = team_index.get(home_id), team_index.get(away_id)
+        # Only matches ranking.tournament_tables() would count
+        if h is None or a is None or group_of[h] != group_of[a] or group_names[h] != group_name:
+            continue
+        if status == 'completed' and home_score is not None and away_score is not None:
+            played[h] += 1
+            played[a] += 1
+            goals_for[h] += home_score
+            goals_against[h] += away_score
+            goals_for[a] += away_score
+            goals_against[a] += home_score
+            points[h] += 3 if home_score > away_score else home_score == away_score
+            points[a] += 3 if away_score > home_score else home_score == away_score
+        elif status == 'scheduled':
+            home.append(h)
+            away.append(a)
+
+    games = sum(played)
+    average = sum(goals_for) / games if games else DEFAULT_GOALS
+    attack = [(goals_for[t] + PRIOR_MATCHES * average) / (played[t] + PRIOR_MATCHES) for t in range(count)]
+    defence = [(goals_against[t] + PRIOR_MATCHES * average) / (played[t] + PRIOR_MATCHES) for t in range(count)]
+    return Inputs(
+        team_ids=[team_id for team_id, _, _ in teams],
+        group_of=group_of,
+        points=points,
+        goal_difference=[f - a for f, a in zip(goals_for, goals_against)],
+        goals_for=goals_for,
+        home=home,
+        away=away,
+        home_rate=[attack[h] * defence[a] / average for h, a in zip(home, away)],
+        away_rate=[attack[a] * defence[h] / average for h, a in zip(home, away)],
+        qualifiers=qualifiers,
+    )
+
+
+def _group_starts(group_of):
+    """Index of the first team of each group (teams are numbered in group order)."""
+    starts = {}
+    for team, group in enumerate(group_of):
+        starts.setdefault(group, team)
+    return [starts[group] for group in group_of]
+
+
+def _sample_goals(rng, rates, runs):
+    """Goals per (run, match): one uniform each, inverted through the Poisson CDF up to MAX_GOALS."""
+    np = get_numpy()
+    rates = np.asarray(rates, dtype=float)[:, None]
+    goals = np.arange(MAX_GOALS)
+    factorials = np.cumprod(np.maximum(goals, 1))
+    # Single precision halves the memory traffic, which is what this is bound by
+    cdf = np.cumsum(np.exp(-rates) * rates ** goals / factorials, axis=1).astype(np.float32)
+    uniform = rng.random((runs, len(rates)), dtype=np.float32)
+    sampled = np.zeros((runs, len(rates)), dtype=np.int8)
+    for column in cdf.T:
+        sampled += uniform > column
+    return sampled.astype(np.int64)
+
+
+def _simulate_arrays(data, runs, seed, chunk):
+    np = get_numpy()
+    rng = np.random.default_rng(np.random.SeedSequence([*seed, chunk]))
+    team_count = len(data.team_ids)
+    home, away = np.asarray(data.home, dtype=np.intp), np.asarray(data.away, dtype=np.intp)
+    home_goals = _sample_goals(rng, data.home_rate, runs)
+    away_goals = _sample_goals(rng, data.away_rate, runs)
+
+    # Points, goal difference and goals scored folded into one integer that
+    # orders teams the same way: each weight exceeds the range of what follows
+    remaining = np.bincount(np.concatenate([home, away]), minlength=team_count)
+    bound = int(max(np.abs(data.goal_difference).max(initial=0), max(data.goals_for, default=0))
+                + MAX_GOALS * remaining.max(initial=0)) + 1
+    goal_weight = bound
+    point_weight = (2 * bound + 1) * goal_weight
+    base = (np.asarray(data.points, dtype=np.int64) * point_weight
+            + np.asarray(data.goal_difference, dtype=np.int64) * goal_weight
+            + np.asarray(data.goals_for, dtype=np.int64))
+    home_points = np.where(home_goals > away_goals, 3, home_goals == away_goals)
+    away_points = np.where(away_goals > home_goals, 3, home_goals == away_goals)
+    margin = home_goals - away_goals
+    home_score = home_points * point_weight + margin * goal_weight + home_goals
+    away_score = away_points * point_weight - margin * goal_weight + away_goals
+
+    # One bincount over (run, team) cells sums every run's results at once
+    offsets = (np.arange(runs) * team_count)[:, None]
+    cells = runs * team_count
+    score = base + (np.bincount((offsets + home).ravel(), home_score.ravel(), minlength=cells)
+                    + np.bincount((offsets + away).ravel(), away_score.ravel(), minlength=cells)
+                    ).astype(np.int64).reshape(runs, team_count)
+
+    # Best first within each group; the stable sort keeps level teams in entry order
+    span = int(score.max(initial=0) - score.min(initial=0)) + 1
+    order = np.argsort(np.asarray(data.group_of, dtype=np.int64) * span - score, axis=-1, kind='stable')
+    position = np.empty((runs, team_count), dtype=np.intp)
+    np.put_along_axis(position, order, np.broadcast_to(np.arange(team_count), order.shape), axis=-1)
+    rank = position - np.asarray(_group_starts(data.group_of))
+    return (rank < data.qualifiers).sum(axis=0).tolist(), (rank == 0).sum(axis=0).tolist()
+
+
+def _scorelines(home_rate, away_rate):
+    """Return (scorelines, cumulative weights) of a match, each side's goals capped at MAX_GOALS."""
+    def pmf(rate):
+        return [math.exp(-rate) * rate ** goals / math.factorial(goals) for goals in range(MAX_GOALS + 1)]
+    home, away = pmf(home_rate), pmf(away_rate)
+    outcomes, weights = [], []
+    for hg, p in enumerate(home):
+        for ag, q in enumerate(away):
+            # Points and goal difference each side gains, then goals scored
+            outcomes.append((3 if hg > ag else hg == ag, 3 if ag > hg else hg == ag, hg - ag, hg, ag))
+            weights.append(p * q)
+    return outcomes, list(accumulate(weights))
+
+
+def _simulate_lists(data, runs, seed, chunk):
+    rng = random.Random(repr((*seed, chunk)))
+    fixtures = [(h, a) + _scorelines(hr, ar)
+                for h, a, hr, ar in zip(data.home, data.away, data.home_rate, data.away_rate)]
+    members = {}
+    for team, group in enumerate(data.group_of):
+        members.setdefault(group, []).append(team)
+    team_count = len(data.team_ids)
+    qualify, first = [0] * team_count, [0] * team_count
+    for _ in range(runs):
+        points, goal_difference, goals_for = data.points[:], data.goal_difference[:], data.goals_for[:]
+        for h, a, outcomes, cumulative in fixtures:
+            home_points, away_points, margin, hg, ag = outcomes[bisect(cumulative, rng.random() * cumulative[-1])]
+            points[h] += home_points
+            points[a] += away_points
+            goal_difference[h] += margin
+            goal_difference[a] -= margin
+            goals_for[h] += hg
+            goals_for[a] += ag
+        for teams in members.values():
+            ranked = sorted(teams, key=lambda t: (-points[t], -goal_difference[t], -goals_for[t], t))
+            first[ranked[0]] += 1
+            for team in ranked[:data.qualifiers]:
+                qualify[team] += 1
+    return qualify, first
+
+
+def simulate_chunk(data, runs, seed, chunk):
+    """Simulate ``runs`` group stages; returns per-team (qualified, won group) counts.
+
+    ``seed`` is a tuple of non-negative integers; together with ``chunk`` it
+    determines the outcome.
+    """
+    if get_numpy() is not None:
+        return _simulate_arrays(data, runs, seed, chunk)
+    return _simulate_lists(data, runs, seed, chunk)
+
+
+_pool = None
+_pool_key = None
+_pool_lock = threading.Lock()
+
+
+def _executor(processes):
+    """Return this process's worker pool, started once (also after a fork)."""
+    global _pool, _pool_key
+    with _pool_lock:
+        if _pool_key != (os.getpid(), processes):
+            if _pool is not None and _pool_key[0] == os.getpid():
+                _pool.shutdown(wait=False)
+            import multiprocessing  # Only processes that start a pool pay for importing these
+            from concurrent.futures import ProcessPoolExecutor
+            # spawn, not fork: the web and job threads may hold locks at fork time
+            _pool = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn'))
+            _pool_key = (os.getpid(), processes)
+        return _pool
+
+
+def simulate(data, iterations, seed=(0,), processes=1, progress=None):
+    """Return {team index: Chance} from ``iterations`` simulated group stages.
+
+    Chunks run on a pool of ``processes`` worker processes when there is
+    more than one of each and enough work to be worth it;
+    ``progress(fraction)`` is called as they finish.
+    """
+    size = max(1, min(MAX_CHUNK, CHUNK_CELLS // max(1, len(data.home))))
+    chunks = [(chunk, min(size, iterations - start)) for chunk, start in enumerate(range(0, iterations, size))]
+    if processes > 1 and len(chunks) > 1 and iterations * len(data.home) >= POOL_MIN_CELLS:
+        pool = _executor(processes)
+        results = pool.map(simulate_chunk, *zip(*((data, runs, seed, chunk) for chunk, runs in chunks)))
+    else:
+        results = (simulate_chunk(data, runs, seed, chunk) for chunk, runs in chunks)
+
+    team_count = len(data.team_ids)
+    qualify, first = [0] * team_count, [0] * team_count
+    for done, (chunk_qualify, chunk_first) in enumerate(results, 1):
+        qualify = [total + count for total, count in zip(qualify, chunk_qualify)]
+        first = [total + count for total, count in zip(first, chunk_first)]
+        if progress is not None:
+            progress(done / len(chunks))
+    return {team: Chance(qualify[team] / iterations, first[team] / iterations) for team in range(team_count)}
+
+
+_warned = False
+
+
+def _settings():
+    global _warned
+    config = current_app.config
+    iterations = config.get('FORECAST_ITERATIONS')
+    if get_numpy() is None and not _warned:
+        _warned = True
+        current_app.logger.warning('NumPy is not installed; forecasts use the pure-Python simulation%s',
+                                   '' if iterations else f' with {FALLBACK_ITERATIONS} iterations')
+    if not iterations:
+        iterations = DEFAULT_ITERATIONS if get_numpy() is not None else FALLBACK_ITERATIONS
+    return (iterations, config.get('FORECAST_SEED', 0),
+            config.get('KNOCKOUT_QUALIFIERS', 2))
+
+
+def _fingerprint(data, iterations, seed):
+    return hashlib.sha1(repr((data, iterations, seed)).encode()).hexdigest()
+
+
+def _decode(version, blob):
+    data = json.loads(blob)
+    return Forecast(version, data['iterations'],
+                    {int(team_id): Chance(*chance) for team_id, chance in data['chances'].items()})
+
+
+def current(tournament_id):
+    """Return the tournament's Forecast if it is up to date, else None (see refresh())."""
+    row = db.session.execute(
+        select(Tournament.version, TournamentForecast.version, TournamentForecast.inputs, TournamentForecast.data)
+        .join(TournamentForecast, TournamentForecast.tournament_id == Tournament.id)
+        .where(Tournament.id == tournament_id)
+    ).first()
+    if row is None:
+        return None
+    version, stored_version, stored_inputs, blob = row
+    if stored_version == version:
+        return _decode(version, blob)
+
+    # Most writes (kickoff times, venues, the knockout stage) leave the simulation inputs unchanged
+    iterations, seed, qualifiers = _settings()
+    if _fingerprint(inputs(tournament_id, qualifiers), iterations, seed) != stored_inputs:
+        return None
+    return _decode(version, blob)
+
+
+def has_fixtures(tournament_id):
+    """Whether the tournament has group matches to forecast from."""
+    return db.session.execute(
+        select(Match.id).where(Match.tournament_id == tournament_id, Match.stage == 'group').limit(1)
+    ).first() is not None
+
+
+def finished_groups(tournament_id, data):
+    """Return {team_id: Chance} for the groups with every match played, from their real tables."""
+    playing = {data.group_of[team] for team in data.home + data.away}
+    team_index = {team_id: i for i, team_id in enumerate(data.team_ids)}
+    chances = {}
+    for table in ranking.tournament_tables(tournament_id):
+        if not any(row['played'] for row in table.rows):
+            continue
+        if any(data.group_of[team_index[row['team_id']]] in playing for row in table.rows):
+            continue
+        for position, row in enumerate(table.rows):
+            chances[row['team_id']] = Chance(float(position < data.qualifiers), float(position == 0))
+    return chances
+
+
+def refresh(tournament_id, progress=None):
+    """Simulate the tournament and store its Forecast; returns it. The caller commits."""
+    version = db.session.execute(select(Tournament.version).where(Tournament.id == tournament_id)).scalar()
+    if version is None:
+        raise ValueError(f'Tournament {tournament_id} not found')
+    iterations, seed, qualifiers = _settings()
+    data = inputs(tournament_id, qualifiers)
+    chances = simulate(data, iterations, seed=(seed, tournament_id),
+                       processes=current_app.config.get('FORECAST_PROCESSES', 1), progress=progress)
+    by_team = {data.team_ids[team]: chance for team, chance in chances.items()}
+    by_team.update(finished_groups(tournament_id, data))
+
+    blob = json.dumps({'iterations': iterations, 'chances': {str(team_id): list(chance)
+                                                             for team_id, chance in by_team.items()}})
+    db.session.execute(delete(TournamentForecast).where(TournamentForecast.tournament_id == tournament_id))
+    db.session.execute(insert(TournamentForecast).values(
+        tournament_id=tournament_id, version=version, inputs=_fingerprint(data, iterations, seed), data=blob))
+    return Forecast(version, iterations, by_team)
+
+
+def page_token(tournament_id):
+    """cache.tournament_token() plus the forecast's version, for pages that show the forecast."""
+    row = db.session.execute(
+        select(Tournament.version, Tournament.updated_at, TournamentForecast.version)
+        .outerjoin(TournamentForecast, TournamentForecast.tournament_id == Tournament.id)
+        .where(Tournament.id == tournament_id)
+    ).first()
+    if row is None:
+        return None
+    version, updated_at, forecast_version = row
+    return f'{version}.{forecast_version or 0}', updated_at
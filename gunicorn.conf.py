@@ -0,0 +1,73 @@
+"""
+Gunicorn settings for the Tournament Manager application.
+
+Gunicorn reads this file automatically when started from the project
+directory (``gunicorn wsgi:app``). Every value can be overridden from the
+environment:
+
+  WEB_CONCURRENCY    worker processes (default: 2 per CPU plus 1, or 2 on SQLite)
+  GUNICORN_THREADS   threads per worker for normal requests (default 8)
+  LIVE_MAX_STREAMS   live event streams per worker (default 32), on threads of their own
+  GUNICORN_PRELOAD   build and warm the app once in the master before forking (default on)
+  GUNICORN_TIMEOUT   seconds before a silent worker is restarted (default 60)
+  PORT               port to listen on (default 8000)
+
+SQLite allows one writer at a time however many processes there are, so
+with SQLite a couple of threaded workers give the best throughput; use
+PostgreSQL to scale writes across more workers.
+
+A live event stream holds its thread for as long as it is open, so each
+worker runs GUNICORN_THREADS + LIVE_MAX_STREAMS threads and the app refuses
+streams beyond LIVE_MAX_STREAMS (503, the page retries later): however many
+viewers are watching, GUNICORN_THREADS threads stay free for pages, the API
+and writes. That puts the ceiling at WEB_CONCURRENCY x LIVE_MAX_STREAMS
+viewers streaming at once, 64 with the SQLite defaults; raise
+LIVE_MAX_STREAMS for more, as idle streams cost a thread's stack and
+little else.
+
+With preload, the master also runs app.warm_up() and freezes the objects it
+created out of the garbage collector's reach, so workers start serving
+without importing or compiling anything and share those pages with the
+master instead of copying them. Compare worker startup with and without it
+using benchmarks/bench_startup.py.
+"""
+
+import gc
+import multiprocessing
+import os
+
+_sqlite = os.environ.get('DATABASE_URL', 'sqlite:///').startswith('sqlite')
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2 if _sqlite else multiprocessing.cpu_count() * 2 + 1))
+# The app shares live events between workers through SQLite when there is more than one
+os.environ.setdefault('WEB_CONCURRENCY', str(workers))
+worker_class = 'gthread'
+# Request threads plus one per live stream; the app enforces the stream limit, keeping the rest for requests
+os.environ.setdefault('LIVE_MAX_STREAMS', '32')
+threads = int(os.environ.get('GUNICORN_THREADS', 8)) + int(os.environ['LIVE_MAX_STREAMS'])
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes', 'on')
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+keepalive = 5
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    """Warm the preloaded app in the master, before the workers are forked."""
+    if not server.cfg.preload_app:
+        return
+    from app import warm_up
+
+    warm_up(server.app.wsgi())
+    # Objects the collector never scans stay shared with the workers instead of being copied on write
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Drop any database connections inherited from the master process."""
+    from wsgi import app
+    from models import db
+
+    with app.app_context():
+        db.engine.dispose()
@@ -1,17 +1,20 @@
 """
 Database initialization script for Tournament Manager.
-Run this script to create a fresh database with the required schema.
+Run this script once per deployment (before starting the web workers) to
+create a fresh database or apply any pending schema migrations.
 """
 
-from app import app, db
-from models import Tournament, Group, Team, Match
+from app import create_app
+import migrations
 
 def init_db():
-    """Initialize the database with tables and optionally sample data."""
+    """Create missing tables and apply pending migrations."""
+    app = create_app()
     with app.app_context():
-        # Create all tables
-        db.create_all()
-        print("Database tables created successfully.")
+        version, applied = migrations.upgrade()
+        for description in applied:
+            print(f"Applied: {description}")
+        print(f"Database schema is at version {version}.")
 
 if __name__ == "__main__":
     print("Initializing database...")
@@ -0,0 +1,186 @@
+"""
+Opt-in request instrumentation for the Tournament Manager application.
+
+With INSTRUMENTATION enabled, every request records its wall time, the
+number of SQL statements it ran and their total time (through SQLAlchemy
+cursor events) and the time spent rendering Jinja templates. The figures
+are returned in a Server-Timing header, so they show up in the browser's
+network panel, and aggregated per endpoint for ``GET /metrics`` in the
+Prometheus text format. Metrics are kept per worker process.
+
+PROFILE_SAMPLE_RATE (0 to 1) additionally profiles that fraction of
+requests with cProfile, or pyinstrument when PROFILER=pyinstrument and it is
+installed, writing one file per request to PROFILE_DIR.
+
+When INSTRUMENTATION is off, init_app() installs nothing at all, so there
+is no per-request or per-query cost.
+"""
+
+import cProfile
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, g, has_request_context, request
+from jinja2 import Template
+from sqlalchemy import event
+
+from models import db
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class TimedTemplate(Template):
+    """Jinja template that adds its render time to the current request."""
+
+    def render(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            if has_request_context() and 'timing' in g:
+                g.timing['render_time'] += time.perf_counter() - start
+
+
+class Metrics:
+    """Per-endpoint request, SQL and render totals for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)  # (endpoint, method, status) -> count
+        self.buckets = defaultdict(lambda: [0] * (len(DURATION_BUCKETS) + 1))
+        self.duration = defaultdict(float)
+        self.sql_count = defaultdict(int)
+        self.sql_time = defaultdict(float)
+        self.render_time = defaultdict(float)
+
+    def record(self, endpoint, method, status, timing):
+        elapsed = timing['wall_time']
+        bucket = next((i for i, bound in enumerate(DURATION_BUCKETS) if elapsed <= bound), len(DURATION_BUCKETS))
+        with self._lock:
+            self.requests[(endpoint, method, status)] += 1
+            self.buckets[endpoint][bucket] += 1
+            self.duration[endpoint] += elapsed
+            self.sql_count[endpoint] += timing['sql_count']
+            self.sql_time[endpoint] += timing['sql_time']
+            self.render_time[endpoint] += timing['render_time']
+
+    def render(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            lines += ['# HELP http_requests_total Requests handled, by endpoint, method and status.',
+                      '# TYPE http_requests_total counter']
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+            lines += ['# HELP http_request_duration_seconds Request wall time.',
+                      '# TYPE http_request_duration_seconds histogram']
+            for endpoint, counts in sorted(self.buckets.items()):
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+                lines.append(f'http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {self.duration[endpoint]:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{endpoint="{endpoint}"}} {cumulative}')
+
+            for name, kind, help_text, values in (
+                ('sql_queries_total', 'counter', 'SQL statements executed.', self.sql_count),
+                ('sql_duration_seconds_total', 'counter', 'Time spent in SQL statements.', self.sql_time),
+                ('template_render_seconds_total', 'counter', 'Time spent rendering templates.', self.render_time),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                for endpoint, value in sorted(values.items()):
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {value:.6f}' if isinstance(value, float)
+                                 else f'{name}{{endpoint="{endpoint}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _start_profiler(kind):
+    if kind == 'pyinstrument':
+        import pyinstrument
+        profiler = pyinstrument.Profiler()
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    return profiler
+
+
+def _save_profile(profiler, directory):
+    """Stop a request's profiler and write its report to ``directory``."""
+    name = f'{time.strftime("%Y%m%d-%H%M%S")}-{request.endpoint or "unknown"}-{os.getpid()}-{random.getrandbits(16):04x}'
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        profiler.dump_stats(os.path.join(directory, name + '.prof'))
+    else:
+        profiler.stop()
+        with open(os.path.join(directory, name + '.html'), 'w') as f:
+            f.write(profiler.output_html())
+
+
+def init_app(app):
+    """Install the hooks configured by INSTRUMENTATION / PROFILE_SAMPLE_RATE / PROFILER / PROFILE_DIR."""
+    if not app.config.get('INSTRUMENTATION'):
+        return
+
+    metrics = Metrics()
+    app.extensions['metrics'] = metrics
+    app.jinja_env.template_class = TimedTemplate
+
+    sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 0.0)
+    profile_dir = app.config.get('PROFILE_DIR', 'profiles')
+    profiler_kind = app.config.get('PROFILER', 'cprofile')
+    if profiler_kind == 'pyinstrument':
+        try:
+            import pyinstrument  # noqa: F401
+        except ImportError:
+            app.logger.warning('pyinstrument is not installed; profiling with cProfile instead')
+            profiler_kind = 'cprofile'
+    if sample_rate:
+        os.makedirs(profile_dir, exist_ok=True)
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def end_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        if has_request_context() and 'timing' in g:
+            g.timing['sql_count'] += 1
+            g.timing['sql_time'] += elapsed
+
+    @app.before_request
+    def start_timing():
+        g.timing = {'start': time.perf_counter(), 'sql_count': 0, 'sql_time': 0.0, 'render_time': 0.0}
+        if sample_rate and random.random() < sample_rate:
+            g.profiler = _start_profiler(profiler_kind)
+
+    @app.after_request
+    def finish_timing(response):
+        timing = g.pop('timing', None)
+        if timing is None:
+            return response
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            _save_profile(profiler, profile_dir)
+
+        timing['wall_time'] = time.perf_counter() - timing['start']
+        response.headers['Server-Timing'] = (
+            f'app;dur={timing["wall_time"] * 1000:.1f}, '
+            f'db;dur={timing["sql_time"] * 1000:.1f};desc="{timing["sql_count"]} queries", '
+            f'render;dur={timing["render_time"] * 1000:.1f}'
+        )
+        metrics.record(request.endpoint or 'unknown', request.method, response.status_code, timing)
+        return response
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        """Request, SQL and template metrics for this worker process."""
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,384 @@
+"""
+Background jobs for the Tournament Manager application.
+
+Schedule generation, shuffles, bracket builds and large roster imports can
+take seconds on a big event. Instead of running them in the request, the
+routes submit a job and return at once; the page refreshes through the
+live event stream when the job's changes are committed.
+
+Jobs are rows in a small SQLite file (JOBS_PATH), separate from the main
+database so that recording progress never waits for the write lock the job
+itself holds. Every process that starts a dispatcher claims queued jobs
+from that table and runs them on a pool of JOB_WORKERS threads, each in its
+own app context and transaction. ``flask run-jobs`` runs a dispatcher as a
+standalone process; with JOB_WORKERS=0 the web workers then only enqueue.
+JOB_BACKEND=inline runs each job in the submitting request instead, as
+before.
+
+Submitting is idempotent: a job with the same kind and parameters that is
+still queued or running is returned instead of starting a second one, and a
+client-supplied key (the Idempotency-Key header) returns the job created
+with that key whatever its state. A job that fails with an unexpected error
+(e.g. "database is locked") has rolled back, so it is retried with backoff
+up to JOB_MAX_ATTEMPTS times; invalid input (ValueError) fails at once.
+Work a task does after its commit, such as telling live viewers, goes
+through after_commit(): the queue runs it once the job is recorded as
+succeeded and only logs its errors, so committed changes are never rerun.
+Jobs whose worker died are requeued once their heartbeat goes stale.
+"""
+
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Blueprint, current_app, g, jsonify, request, url_for
+
+from models import db
+
+bp = Blueprint('jobs', __name__)
+
+# Job kind -> function(progress, **params) returning a JSON-serialisable result
+TASKS = {}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, params TEXT NOT NULL,
+    key TEXT NOT NULL, client_key TEXT, tournament_id INTEGER,
+    status TEXT NOT NULL DEFAULT 'queued', progress REAL NOT NULL DEFAULT 0, message TEXT,
+    result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, not_before REAL,
+    created_at REAL NOT NULL, started_at REAL, finished_at REAL, heartbeat REAL, worker TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status, id);
+CREATE INDEX IF NOT EXISTS ix_jobs_key ON jobs (key, status);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_jobs_client_key ON jobs (client_key);
+CREATE INDEX IF NOT EXISTS ix_jobs_tournament ON jobs (tournament_id, id);
+'''
+
+JOB_FIELDS = ('id', 'kind', 'tournament_id', 'status', 'progress', 'message', 'result', 'error',
+              'attempts', 'created_at', 'started_at', 'finished_at')
+
+
+def task(kind):
+    """Register a function as the handler for jobs of ``kind``."""
+    def register(func):
+        TASKS[kind] = func
+        return func
+    return register
+
+
+def after_commit(func, *args):
+    """Call ``func(*args)`` once the running job's changes are committed and it is marked succeeded.
+
+    Outside a job (a request or a CLI command) it is called straight away.
+    Either way the changes are already committed, so an exception from
+    ``func`` is logged rather than raised.
+    """
+    pending = g.get('job_after_commit')
+    if pending is None:
+        try:
+            func(*args)
+        except Exception:
+            current_app.logger.exception('%s failed after commit', func.__name__)
+    else:
+        pending.append((func, args))
+
+
+def _key(kind, params):
+    return hashlib.sha1(f'{kind}:{json.dumps(params, sort_keys=True)}'.encode()).hexdigest()
+
+
+class JobQueue:
+    """Persistent job table plus the dispatcher that runs this process's share of it."""
+
+    def __init__(self, app, path, workers=2, inline=False, interval=0.5, stale_after=60, max_attempts=3):
+        self.app = app
+        self.path = path
+        self.workers = workers
+        self.inline = inline
+        self.interval = interval
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._wake = threading.Event()
+        self._running = set()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.row_factory = sqlite3.Row
+            # Created on first use, so processes that never submit a job leave no file behind
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, job_id):
+        """Return a job as a dict, or None."""
+        row = self._connect().execute(f'SELECT {", ".join(JOB_FIELDS)} FROM jobs WHERE id = ?',
+                                      (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def recent(self, tournament_id, limit=20):
+        """Return the latest jobs of a tournament, newest first."""
+        rows = self._connect().execute('SELECT id FROM jobs WHERE tournament_id = ? ORDER BY id DESC LIMIT ?',
+                                       (tournament_id, limit)).fetchall()
+        return [self.get(row['id']) for row in rows]
+
+    def latest(self, kind, params):
+        """Return the newest job of ``kind`` with these parameters, whatever its state, or None. Read-only."""
+        row = self._connect().execute('SELECT id FROM jobs WHERE key = ? ORDER BY id DESC LIMIT 1',
+                                      (_key(kind, params),)).fetchone()
+        return self.get(row['id']) if row is not None else None
+
+    def submit(self, kind, params, tournament_id=None, client_key=None):
+        """Queue a job, or return the matching one that already exists (see the module docstring)."""
+        if kind not in TASKS:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        key = _key(kind, params)
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if client_key is not None:
+                existing = conn.execute('SELECT id FROM jobs WHERE client_key = ?', (client_key,)).fetchone()
+            else:
+                existing = conn.execute("SELECT id FROM jobs WHERE key = ? AND status IN ('queued', 'running') "
+                                        'ORDER BY id DESC LIMIT 1', (key,)).fetchone()
+            if existing is None:
+                job_id = conn.execute('INSERT INTO jobs (kind, params, key, client_key, tournament_id, created_at) '
+                                      'VALUES (?, ?, ?, ?, ?, ?)',
+                                      (kind, json.dumps(params), key, client_key, tournament_id, time.time())).lastrowid
+            else:
+                job_id = existing['id']
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+        if existing is None:
+            if self.inline:
+                job = self._claim(job_id)
+                if job is not None:
+                    self._run(job)
+            else:
+                self.start()
+                self._wake.set()
+        return self.get(job_id)
+
+    def retry(self, job_id):
+        """Queue a failed job again with a fresh set of attempts. Returns the job, or None if it can't be retried."""
+        changed = self._connect().execute(
+            "UPDATE jobs SET status = 'queued', attempts = 0, error = NULL, not_before = NULL, progress = 0, "
+            "message = NULL, finished_at = NULL WHERE id = ? AND status = 'failed'", (job_id,)).rowcount
+        if not changed:
+            return None
+        if self.inline:
+            job = self._claim(job_id)
+            if job is not None:
+                self._run(job)
+        else:
+            self.start()
+            self._wake.set()
+        return self.get(job_id)
+
+    def _claim(self, job_id=None):
+        """Mark the next runnable job (or ``job_id``) as running by this worker and return its row."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if job_id is None:
+                row = conn.execute("SELECT * FROM jobs WHERE status = 'queued' AND (not_before IS NULL OR not_before <= ?) "
+                                   'ORDER BY id LIMIT 1', (now,)).fetchone()
+            else:
+                row = conn.execute("SELECT * FROM jobs WHERE id = ? AND status = 'queued'", (job_id,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, "
+                             'heartbeat = ?, worker = ? WHERE id = ?',
+                             (now, now, f'{socket.gethostname()}:{os.getpid()}', row['id']))
+            conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        return row
+
+    def _update(self, job_id, **values):
+        columns = ', '.join(f'{name} = ?' for name in values)
+        self._connect().execute(f'UPDATE jobs SET {columns} WHERE id = ?', (*values.values(), job_id))
+
+    def _run(self, job):
+        """Run a claimed job in the current app context and record the outcome."""
+        job_id = job['id']
+
+        def progress(fraction, message=None):
+            self._update(job_id, progress=fraction, message=message, heartbeat=time.time())
+
+        outer, g.job_after_commit = g.get('job_after_commit'), []
+        try:
+            result = TASKS[job['kind']](progress, **json.loads(job['params']))
+        except Exception as e:
+            db.session.rollback()
+            attempts = job['attempts'] + 1
+            if isinstance(e, ValueError) or attempts >= self.max_attempts:
+                current_app.logger.warning('Job %s (%s) failed: %s', job_id, job['kind'], e)
+                self._update(job_id, status='failed', error=str(e), finished_at=time.time())
+            else:
+                current_app.logger.warning('Job %s (%s) will be retried: %s', job_id, job['kind'], e)
+                self._update(job_id, status='queued', error=str(e), not_before=time.time() + 2 ** attempts)
+            return
+        finally:
+            pending, g.job_after_commit = g.job_after_commit, outer
+        self._update(job_id, status='succeeded', progress=1.0, result=json.dumps(result),
+                     error=None, finished_at=time.time())
+        for func, args in pending:
+            try:
+                func(*args)
+            except Exception:
+                # The job's work is committed; a failed notification mustn't send it round again
+                current_app.logger.exception('Job %s (%s): %s failed after commit', job_id, job['kind'],
+                                             func.__name__)
+
+    def _run_in_context(self, job):
+        try:
+            with self.app.app_context():
+                self._run(job)
+        finally:
+            with self._lock:
+                self._running.discard(job['id'])
+            self._wake.set()
+
+    def start(self, workers=None):
+        """Start the dispatcher thread in this process, once (also after a fork)."""
+        workers = self.workers if workers is None else workers
+        if self.inline or not workers or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._running = set()
+            pool = ThreadPoolExecutor(workers, thread_name_prefix='job')
+            threading.Thread(target=self._dispatch, args=(pool, workers), name='job-dispatcher', daemon=True).start()
+
+    def _dispatch(self, pool, workers):
+        failures = 0
+        while True:
+            try:
+                self._dispatch_once(pool, workers)
+                failures = 0
+            except Exception:
+                # e.g. "database is locked" past the busy timeout; the thread must survive it or
+                # every job queued afterwards waits forever, since start() won't run it again
+                failures += 1
+                self.app.logger.exception('Job dispatcher failed; retrying')
+                time.sleep(min(30, self.interval * 2 ** failures))
+                continue
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _dispatch_once(self, pool, workers):
+        """Refresh heartbeats, requeue jobs of dead workers and claim runnable jobs while threads are free."""
+        now = time.time()
+        conn = self._connect()
+        with self._lock:
+            running = list(self._running)
+        if running:
+            conn.execute(f'UPDATE jobs SET heartbeat = ? WHERE id IN ({", ".join("?" * len(running))})',
+                         (now, *running))
+        # Jobs whose worker stopped sending heartbeats died with it; their transaction rolled back
+        conn.execute("UPDATE jobs SET status = 'failed', error = 'The worker running the job stopped', "
+                     "finished_at = ? WHERE status = 'running' AND heartbeat < ? AND attempts >= ?",
+                     (now, now - self.stale_after, self.max_attempts))
+        conn.execute("UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND heartbeat < ?",
+                     (now - self.stale_after,))
+
+        while len(running) < workers:
+            job = self._claim()
+            if job is None:
+                break
+            with self._lock:
+                self._running.add(job['id'])
+            running.append(job['id'])
+            pool.submit(self._run_in_context, job)
+
+    def run_forever(self, workers=None):
+        """Run a dispatcher in the foreground, for ``flask run-jobs``."""
+        self._pid = None
+        self.inline = False
+        self.start(workers or self.workers or 2)
+        while True:
+            time.sleep(3600)
+
+
+def init_app(app):
+    """Create the queue configured by JOB_BACKEND / JOB_WORKERS / JOBS_PATH / JOB_MAX_ATTEMPTS."""
+    kind = app.config.get('JOB_BACKEND', 'thread')
+    if kind not in ('thread', 'inline'):
+        raise ValueError(f"Unknown JOB_BACKEND '{kind}'")
+    app.extensions['jobs'] = JobQueue(app, app.config['JOBS_PATH'], workers=app.config.get('JOB_WORKERS', 2),
+                                      inline=kind == 'inline', max_attempts=app.config.get('JOB_MAX_ATTEMPTS', 3))
+
+    @app.before_request
+    def start_dispatcher():
+        # Picks up jobs left queued by a worker that restarted; a no-op once started
+        queue = app.extensions['jobs']
+        if queue._pid != os.getpid() and os.path.exists(queue.path):
+            queue.start()
+
+    @app.cli.command('run-jobs')
+    def run_jobs_command():
+        """Run queued background jobs in this process until interrupted."""
+        app.extensions['jobs'].run_forever()
+
+
+def get_queue():
+    return current_app.extensions['jobs']
+
+
+def submit(kind, params, tournament_id=None):
+    """Submit a job from a request, honouring its Idempotency-Key header."""
+    return get_queue().submit(kind, params, tournament_id, client_key=request.headers.get('Idempotency-Key'))
+
+
+def _with_links(job):
+    job['url'] = url_for('jobs.job_status', job_id=job['id'])
+    if job['result'] and job['result'].get('tournament_id'):
+        job['tournament_url'] = url_for('main.view_tournament', tournament_id=job['result']['tournament_id'])
+    return job
+
+
+@bp.route('/jobs/<int:job_id>')
+def job_status(job_id):
+    """A job's status, progress and result."""
+    job = get_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(_with_links(job))
+
+
+@bp.route('/jobs/<int:job_id>/retry', methods=['POST'])
+def retry_job(job_id):
+    """Run a failed job again."""
+    job = get_queue().retry(job_id)
+    if job is None:
+        return jsonify({'error': 'Only failed jobs can be retried'}), 409
+    return jsonify(_with_links(job)), 202
+
+
+@bp.route('/tournament/<int:tournament_id>/jobs')
+def tournament_jobs(tournament_id):
+    """The latest jobs of a tournament, newest first."""
+    return jsonify([_with_links(job) for job in get_queue().recent(tournament_id)])
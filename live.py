@@ -0,0 +1,258 @@
+"""
+Live score push for the Tournament Manager application.
+
+Viewers open one Server-Sent Events stream per tournament instead of
+refreshing the page. After a write commits, the route publishes an event:
+
+  score   the changed matches and the standings of the affected groups
+  reload  the tournament changed shape (draw, schedule, knockout stage);
+          clients refetch from the JSON API
+
+Each event is formatted into an SSE frame once and appended to a short
+per-tournament history; subscribers block on that tournament's condition
+variable and copy out the frames newer than their cursor, so fan-out costs
+no serialisation or database work per viewer. Event ids are tournament
+versions. A score event covers exactly one version step, so a subscriber
+that missed one (history overflow, a reconnect with an old Last-Event-ID,
+a write that didn't publish) is sent a reload instead of a partial delta.
+
+With LIVE_BACKEND=sqlite every worker also appends its events to a shared
+SQLite file and polls it, so a viewer connected to one gunicorn worker sees
+results posted through another. That is the default whenever
+WEB_CONCURRENCY is above 1 (gunicorn.conf.py sets it to the worker count),
+since with the memory backend a viewer would only see the writes that
+happened to land on their own worker.
+
+Streams hold a thread but no database connection, so run gunicorn with
+threaded workers (``-k gthread``). A stream ends after LIVE_STREAM_SECONDS
+and the browser reconnects with Last-Event-ID, picking up anything it
+missed, so a thread is never held by one viewer indefinitely. At most
+LIVE_MAX_STREAMS streams are open per worker; further viewers get a 503
+with Retry-After and try again later, so streams can never take the
+threads that normal requests need (see gunicorn.conf.py).
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque, namedtuple
+
+from flask import Blueprint, Response, current_app, jsonify, request
+
+import api
+import cache
+
+bp = Blueprint('live', __name__, url_prefix='/api/v1')
+
+logger = logging.getLogger(__name__)
+
+# ``since`` is the version the event's delta starts from; 0 for reloads
+Event = namedtuple('Event', 'since version frame')
+
+RETRY_MS = 3000
+BUSY_RETRY_SECONDS = 30  # Retry-After when every stream slot of the worker is taken
+
+
+def sse_frame(version, name, data):
+    return f'id: {version}\nevent: {name}\ndata: {data}\n\n'
+
+
+class _Channel:
+    def __init__(self, history):
+        self.condition = threading.Condition()
+        self.events = deque(maxlen=history)
+
+
+class Broker:
+    """In-process pub/sub of tournament events."""
+
+    def __init__(self, history=64, heartbeat=15.0, max_streams=None):
+        self.history = history
+        self.heartbeat = heartbeat
+        self.relay = None
+        self._streams = threading.BoundedSemaphore(max_streams) if max_streams else None
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def _channel(self, tournament_id):
+        with self._lock:
+            channel = self._channels.get(tournament_id)
+            if channel is None:
+                channel = self._channels[tournament_id] = _Channel(self.history)
+            return channel
+
+    def deliver(self, tournament_id, since, version, name, data):
+        """Add an event to the local history; events older than the newest are dropped."""
+        channel = self._channel(tournament_id)
+        with channel.condition:
+            if channel.events and version <= channel.events[-1].version:
+                return False
+            channel.events.append(Event(since, version, sse_frame(version, name, data)))
+            channel.condition.notify_all()
+            return True
+
+    def open_stream(self):
+        """Claim one of this process's stream slots; False when they are all taken."""
+        return self._streams is None or self._streams.acquire(blocking=False)
+
+    def close_stream(self):
+        if self._streams is not None:
+            self._streams.release()
+
+    def publish(self, tournament_id, since, version, name, data):
+        """Deliver an event to this process's subscribers and to the relay, if any."""
+        self.deliver(tournament_id, since, version, name, data)
+        if self.relay is not None:
+            self.relay.publish(tournament_id, since, version, name, data)
+
+    def wait(self, tournament_id, after, timeout):
+        """Block until there are events newer than version ``after`` or ``timeout`` expires.
+
+        Returns the frames to send, with a reload in place of any gap.
+        """
+        if self.relay is not None:
+            self.relay.start()
+        channel = self._channel(tournament_id)
+        with channel.condition:
+            channel.condition.wait_for(
+                lambda: channel.events and channel.events[-1].version > after, timeout)
+            events = [event for event in channel.events if event.version > after]
+        if events and events[0].since > after:
+            # Changes between ``after`` and this delta were missed
+            latest = events[-1].version
+            return latest, [sse_frame(latest, 'reload', f'{{"version":{latest}}}')]
+        return (events[-1].version if events else after), [event.frame for event in events]
+
+
+class SQLiteRelay:
+    """Share events between worker processes through a SQLite table.
+
+    Every process polls the table from one background thread and delivers
+    new rows to its local broker.
+    """
+
+    def __init__(self, path, broker, interval=0.5, keep=1000):
+        self.path = path
+        self.broker = broker
+        self.interval = interval
+        self.keep = keep
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._connect().execute('CREATE TABLE IF NOT EXISTS live_events '
+                                '(id INTEGER PRIMARY KEY AUTOINCREMENT, tournament_id INTEGER NOT NULL, '
+                                'since INTEGER NOT NULL, version INTEGER NOT NULL, '
+                                'name TEXT NOT NULL, data TEXT NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def publish(self, tournament_id, since, version, name, data):
+        conn = self._connect()
+        row_id = conn.execute('INSERT INTO live_events (tournament_id, since, version, name, data) '
+                              'VALUES (?, ?, ?, ?, ?)',
+                              (tournament_id, since, version, name, data)).lastrowid
+        if row_id % 100 == 0:
+            conn.execute('DELETE FROM live_events WHERE id <= ?', (row_id - self.keep,))
+
+    def start(self):
+        """Start the polling thread in this process, once (also after a fork)."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            last_id = self._connect().execute('SELECT COALESCE(MAX(id), 0) FROM live_events').fetchone()[0]
+            threading.Thread(target=self._poll, args=(last_id,), name='live-relay', daemon=True).start()
+
+    def _poll(self, last_id):
+        while True:
+            time.sleep(self.interval)
+            try:
+                rows = self._connect().execute('SELECT id, tournament_id, since, version, name, data '
+                                               'FROM live_events WHERE id > ? ORDER BY id', (last_id,)).fetchall()
+            except Exception:
+                # One failed read (e.g. the file locked past the timeout) mustn't stop this worker's updates
+                logger.exception('Reading live events from %s failed; retrying', self.path)
+                continue
+            for row_id, tournament_id, since, version, name, data in rows:
+                self.broker.deliver(tournament_id, since, version, name, data)
+                last_id = row_id
+
+
+def init_app(app):
+    """Create the broker configured by LIVE_BACKEND / LIVE_EVENTS_PATH / LIVE_HEARTBEAT / LIVE_MAX_STREAMS."""
+    broker = Broker(heartbeat=app.config.get('LIVE_HEARTBEAT', 15.0), max_streams=app.config.get('LIVE_MAX_STREAMS'))
+    kind = app.config.get('LIVE_BACKEND', 'memory')
+    if kind == 'sqlite':
+        broker.relay = SQLiteRelay(app.config['LIVE_EVENTS_PATH'], broker)
+    elif kind != 'memory':
+        raise ValueError(f"Unknown LIVE_BACKEND '{kind}'")
+    app.extensions['live'] = broker
+
+
+def get_broker():
+    return current_app.extensions['live']
+
+
+def publish_score(tournament_id, version):
+    """Publish the matches changed at ``version`` and their groups' standings. Call after commit."""
+    matches = api.matches_table(tournament_id, since=version - 1)
+    home, away = matches['columns'].index('home_team_id'), matches['columns'].index('away_team_id')
+    team_ids = {row[i] for row in matches['rows'] for i in (home, away) if row[i] is not None}
+    data = api.dumps({
+        'version': version,
+        'matches': matches,
+        'standings': api.standings_table(tournament_id, team_ids),
+    })
+    get_broker().publish(tournament_id, version - 1, version, 'score', data)
+
+
+def publish_reload(tournament_id, version):
+    """Tell viewers to refetch the tournament. Call after commit."""
+    get_broker().publish(tournament_id, 0, version, 'reload', f'{{"version":{version}}}')
+
+
+@bp.route('/tournaments/<int:tournament_id>/events')
+def tournament_events(tournament_id):
+    """Server-Sent Events stream of a tournament's score and reload events."""
+    token = cache.tournament_token(tournament_id)
+    if token is None:
+        return jsonify({'error': 'Tournament not found'}), 404
+    version = int(token[0])
+    last_seen = request.headers.get('Last-Event-ID', type=int)
+    broker = get_broker()
+    if not broker.open_stream():
+        response = jsonify({'error': 'Too many live viewers on this worker, try again shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(BUSY_RETRY_SECONDS)
+        return response
+    deadline = time.monotonic() + current_app.config.get('LIVE_STREAM_SECONDS', 120)
+
+    def stream():
+        yield f'retry: {RETRY_MS}\n\n'
+        cursor = version
+        if last_seen is not None and last_seen < version:
+            yield sse_frame(version, 'reload', f'{{"version":{version}}}')
+        # Bounded: the browser reconnects with Last-Event-ID and misses nothing
+        while (remaining := deadline - time.monotonic()) > 0:
+            cursor, frames = broker.wait(tournament_id, cursor, min(broker.heartbeat, remaining))
+            if not frames:
+                yield ': keepalive\n\n'
+            for frame in frames:
+                yield frame
+
+    response = Response(stream(), mimetype='text/event-stream')
+    response.call_on_close(broker.close_stream)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the stream
+    return response
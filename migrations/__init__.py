@@ -0,0 +1,186 @@
+"""
+Versioned schema migrations for the Tournament Manager application.
+
+The applied versions are recorded in the schema_version table. upgrade()
+creates any missing tables, then runs every migration newer than the
+recorded version inside one transaction. A brand-new database already gets
+the current schema from create_all(), so its migrations are only recorded.
+
+Run it once per deployment through init_db.py, not at import time in every
+web worker. Migrations must be idempotent and set-based: backfills are a
+single UPDATE or INSERT ... SELECT, never a loop over ORM rows.
+"""
+
+from sqlalchemy import inspect, text
+
+from models import db
+import search
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register a migration function that takes a Connection."""
+    def register(func):
+        MIGRATIONS.append((version, description, func))
+        return func
+    return register
+
+
+def _has_column(conn, table, column):
+    return column in {col['name'] for col in inspect(conn).get_columns(table)}
+
+
+@migration(1, "Add matches.group_name and backfill it from the home team's group")
+def add_group_name_to_matches(conn):
+    if not _has_column(conn, 'matches', 'group_name'):
+        conn.execute(text('ALTER TABLE matches ADD COLUMN group_name VARCHAR(50)'))
+    conn.execute(text("""
+        UPDATE matches
+        SET group_name = (SELECT groups.name
+                          FROM teams JOIN groups ON groups.id = teams.group_id
+                          WHERE teams.id = matches.home_team_id)
+        WHERE stage = 'group' AND group_name IS NULL
+    """))
+
+
+@migration(2, 'Add matches.venue')
+def add_venue_to_matches(conn):
+    if not _has_column(conn, 'matches', 'venue'):
+        conn.execute(text('ALTER TABLE matches ADD COLUMN venue VARCHAR(50)'))
+
+
+# Index name, table and columns. These must match the indexes declared in models.py
+LOOKUP_INDEXES = [
+    ('ix_groups_tournament_id', 'groups', ('tournament_id',)),
+    ('ix_teams_group_id', 'teams', ('group_id',)),
+    ('ix_matches_home_team_id', 'matches', ('home_team_id',)),
+    ('ix_matches_away_team_id', 'matches', ('away_team_id',)),
+    ('ix_matches_tournament_stage_group', 'matches', ('tournament_id', 'stage', 'group_name')),
+    ('ix_matches_tournament_schedule', 'matches', ('tournament_id', 'match_date', 'match_time')),
+    ('ix_matches_tournament_status', 'matches', ('tournament_id', 'status')),
+    ('ix_standings_tournament_group', 'standings', ('tournament_id', 'group_id')),
+]
+
+
+@migration(3, 'Add lookup indexes on foreign keys and hot match filters')
+def add_lookup_indexes(conn):
+    for name, table, columns in LOOKUP_INDEXES:
+        conn.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({", ".join(columns)})'))
+
+
+@migration(4, 'Add tournaments.version and tournaments.updated_at for page caching')
+def add_tournament_version(conn):
+    if not _has_column(conn, 'tournaments', 'version'):
+        conn.execute(text('ALTER TABLE tournaments ADD COLUMN version INTEGER NOT NULL DEFAULT 1'))
+    if not _has_column(conn, 'tournaments', 'updated_at'):
+        conn.execute(text('ALTER TABLE tournaments ADD COLUMN updated_at DATETIME'))
+    conn.execute(text('UPDATE tournaments SET updated_at = created_at WHERE updated_at IS NULL'))
+
+
+@migration(5, 'Add matches.bracket_slot for knockout brackets')
+def add_bracket_slot_to_matches(conn):
+    if not _has_column(conn, 'matches', 'bracket_slot'):
+        conn.execute(text('ALTER TABLE matches ADD COLUMN bracket_slot INTEGER'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_matches_tournament_bracket_slot '
+                      'ON matches (tournament_id, bracket_slot)'))
+
+
+@migration(6, 'Add matches.updated_version for API delta queries')
+def add_updated_version_to_matches(conn):
+    if not _has_column(conn, 'matches', 'updated_version'):
+        conn.execute(text('ALTER TABLE matches ADD COLUMN updated_version INTEGER'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_matches_tournament_updated_version '
+                      'ON matches (tournament_id, updated_version)'))
+
+
+@migration(7, 'Add tournament listing indexes and the name search index')
+def add_tournament_listing_indexes(conn):
+    # Keyset pages need a created_at on every row; on SQLite use the format SQLAlchemy writes
+    now = "strftime('%Y-%m-%d %H:%M:%S.000000', 'now')" if conn.dialect.name == 'sqlite' else 'CURRENT_TIMESTAMP'
+    conn.execute(text(f'UPDATE tournaments SET created_at = {now} WHERE created_at IS NULL'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_tournaments_created ON tournaments (created_at, id)'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_tournaments_status_created '
+                      'ON tournaments (status, created_at, id)'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_tournaments_updated_at ON tournaments (updated_at)'))
+    search.install(conn)
+
+
+# Each counted result once from either side: the match is a completed group
+# match with both scores, both teams are in the same group, and it is filed
+# under that group's name (the rules of standings._group_totals())
+_GROUP_RESULTS = """
+    SELECT {team}_team_id AS team_id, {team}_score AS goals_for, {other}_score AS goals_against
+    FROM matches
+    JOIN teams home ON home.id = matches.home_team_id
+    JOIN teams away ON away.id = matches.away_team_id
+    JOIN groups ON groups.id = home.group_id
+    WHERE matches.stage = 'group' AND matches.status = 'completed'
+      AND matches.home_score IS NOT NULL AND matches.away_score IS NOT NULL
+      AND away.group_id = home.group_id AND matches.group_name = groups.name
+"""
+
+
+@migration(8, 'Backfill standings from the played group matches')
+def backfill_standings(conn):
+    # Teams that already have a row keep it; flask rebuild-standings repairs drift
+    results = ' UNION ALL '.join((_GROUP_RESULTS.format(team='home', other='away'),
+                                  _GROUP_RESULTS.format(team='away', other='home')))
+    conn.execute(text(f"""
+        INSERT INTO standings (tournament_id, group_id, team_id, team_name, played, wins, draws, losses,
+                               goals_for, goals_against, points)
+        SELECT groups.tournament_id, groups.id, teams.id, teams.name,
+               COUNT(results.team_id),
+               COALESCE(SUM(CASE WHEN results.goals_for > results.goals_against THEN 1 ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN results.goals_for = results.goals_against THEN 1 ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN results.goals_for < results.goals_against THEN 1 ELSE 0 END), 0),
+               COALESCE(SUM(results.goals_for), 0),
+               COALESCE(SUM(results.goals_against), 0),
+               COALESCE(SUM(CASE WHEN results.goals_for > results.goals_against THEN 3
+                                 WHEN results.goals_for = results.goals_against THEN 1 ELSE 0 END), 0)
+        FROM teams
+        JOIN groups ON groups.id = teams.group_id
+        LEFT JOIN ({results}) AS results ON results.team_id = teams.id
+        WHERE NOT EXISTS (SELECT 1 FROM standings WHERE standings.team_id = teams.id)
+        GROUP BY groups.tournament_id, groups.id, teams.id, teams.name
+    """))
+
+
+def current_version(conn):
+    """Return the highest applied version, creating the version table if needed."""
+    conn.execute(text('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)'))
+    return conn.execute(text('SELECT MAX(version) FROM schema_version')).scalar() or 0
+
+
+def latest_version():
+    """Return the version this code brings a database up to."""
+    return max(version for version, _, _ in MIGRATIONS)
+
+
+def upgrade(engine=None):
+    """Bring the database up to the latest version.
+
+    Returns (version, applied) where ``applied`` lists the descriptions of
+    the migrations that ran. Raises RuntimeError, changing nothing, if the
+    database is at a version newer than this code knows about.
+    """
+    engine = engine or db.engine
+    applied = []
+    with engine.begin() as conn:
+        fresh = not inspect(conn).has_table('tournaments')
+        version = current_version(conn)
+        if version > latest_version():
+            raise RuntimeError(f'Database schema is at version {version}, newer than this code '
+                               f'(version {latest_version()}); deploy the newer code instead')
+        db.metadata.create_all(conn)
+
+        for number, description, func in sorted(MIGRATIONS, key=lambda m: m[0]):
+            if number <= version:
+                continue
+            if not fresh:
+                func(conn)
+            conn.execute(text('INSERT INTO schema_version (version) VALUES (:version)'), {'version': number})
+            applied.append(description)
+            version = number
+
+    return version, applied
@@ -6,6 +6,11 @@ db = SQLAlchemy()
 
 class Tournament(db.Model):
     __tablename__ = 'tournaments'
+    __table_args__ = (
+        db.Index('ix_tournaments_created', 'created_at', 'id'),  # Keyset pagination of the home page
+        db.Index('ix_tournaments_status_created', 'status', 'created_at', 'id'),
+        db.Index('ix_tournaments_updated_at', 'updated_at'),  # Home page cache token
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -13,6 +18,8 @@ class Tournament(db.Model):
     end_date = db.Column(db.Date, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(20), default='group')  # group, knockout, completed
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # Bumped on every write, used for caching
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
     groups = relationship('Group', back_populates='tournament', cascade='all, delete-orphan')
@@ -23,7 +30,7 @@ class Group(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
-    tournament_id = db.Column(db.Integer, db.ForeignKey('tournaments.id'), nullable=False)
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournaments.id'), nullable=False, index=True)
     
     # Relationships
     tournament = relationship('Tournament', back_populates='groups')
@@ -34,31 +41,79 @@ class Team(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    group_id = db.Column(db.Integer, db.ForeignKey('groups.id'), nullable=False)
+    group_id = db.Column(db.Integer, db.ForeignKey('groups.id'), nullable=False, index=True)
     
     # Relationships
     group = relationship('Group', back_populates='teams')
     home_matches = relationship('Match', foreign_keys='Match.home_team_id', back_populates='home_team')
     away_matches = relationship('Match', foreign_keys='Match.away_team_id', back_populates='away_team')
+    standing = relationship('Standing', back_populates='team', uselist=False, cascade='all, delete-orphan')
 
 class Match(db.Model):
     __tablename__ = 'matches'
+    __table_args__ = (
+        db.Index('ix_matches_tournament_stage_group', 'tournament_id', 'stage', 'group_name'),
+        db.Index('ix_matches_tournament_schedule', 'tournament_id', 'match_date', 'match_time'),
+        db.Index('ix_matches_tournament_status', 'tournament_id', 'status'),
+        db.Index('ix_matches_tournament_bracket_slot', 'tournament_id', 'bracket_slot'),
+        db.Index('ix_matches_tournament_updated_version', 'tournament_id', 'updated_version'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     tournament_id = db.Column(db.Integer, db.ForeignKey('tournaments.id'), nullable=False)
-    home_team_id = db.Column(db.Integer, db.ForeignKey('teams.id'))
-    away_team_id = db.Column(db.Integer, db.ForeignKey('teams.id'))
+    home_team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), index=True)
+    away_team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), index=True)
     home_team_name = db.Column(db.String(100))
     away_team_name = db.Column(db.String(100))
     home_score = db.Column(db.Integer)
     away_score = db.Column(db.Integer)
     match_date = db.Column(db.Date, nullable=False)
     match_time = db.Column(db.Time, nullable=False)
-    stage = db.Column(db.String(20), default='group')  # group, quarterfinal, semifinal, final
+    stage = db.Column(db.String(20), default='group')  # group, round_of_N, quarterfinal, semifinal, final
     status = db.Column(db.String(20), default='scheduled')  # scheduled, in_progress, completed
     group_name = db.Column(db.String(50))  # Store the group name for easier filtering
+    venue = db.Column(db.String(50))  # Pitch the match is played on
+    bracket_slot = db.Column(db.Integer)  # Knockout position: 1 = final, winner of s plays in s // 2
+    updated_version = db.Column(db.Integer)  # Tournament version of the last change, for API delta queries
     
     # Relationships
     tournament = relationship('Tournament', back_populates='matches')
     home_team = relationship('Team', foreign_keys=[home_team_id], back_populates='home_matches')
     away_team = relationship('Team', foreign_keys=[away_team_id], back_populates='away_matches')
+
+class Standing(db.Model):
+    __tablename__ = 'standings'
+    __table_args__ = (
+        db.Index('ix_standings_tournament_group', 'tournament_id', 'group_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournaments.id'), nullable=False)
+    group_id = db.Column(db.Integer, db.ForeignKey('groups.id'), nullable=False)
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=False, unique=True)
+    team_name = db.Column(db.String(100), nullable=False)
+    played = db.Column(db.Integer, nullable=False, default=0)
+    wins = db.Column(db.Integer, nullable=False, default=0)
+    draws = db.Column(db.Integer, nullable=False, default=0)
+    losses = db.Column(db.Integer, nullable=False, default=0)
+    goals_for = db.Column(db.Integer, nullable=False, default=0)
+    goals_against = db.Column(db.Integer, nullable=False, default=0)
+    points = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Relationships
+    team = relationship('Team', back_populates='standing')
+
+class TournamentSnapshot(db.Model):
+    __tablename__ = 'tournament_snapshots'
+    
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournaments.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False)  # Tournament version the snapshot was built at
+    data = db.Column(db.LargeBinary, nullable=False)  # Pickled snapshot.Snapshot
+
+class TournamentForecast(db.Model):
+    __tablename__ = 'tournament_forecasts'
+    
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournaments.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False)  # Tournament version the forecast is current for
+    inputs = db.Column(db.String(40), nullable=False)  # SHA-1 of the results, fixtures and settings simulated
+    data = db.Column(db.Text, nullable=False)  # JSON, see forecast.py
@@ -0,0 +1,119 @@
+"""
+Read queries for the Tournament Manager pages.
+
+The templates walk tournament.groups, group.teams and tournament.matches,
+which are lazy relationships in models.py. The helpers here load what each
+page needs in a fixed number of SELECTs, independent of how many
+tournaments, groups or teams there are.
+"""
+
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import selectinload
+
+from models import db, Tournament, Group, Team, Match
+import search
+
+TournamentSummary = namedtuple('TournamentSummary', 'tournament group_count team_count match_count')
+Page = namedtuple('Page', 'items next_cursor')
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(tournament):
+    """Return the opaque cursor for the page that follows ``tournament``."""
+    return urlsafe_b64encode(f'{tournament.created_at.isoformat()}|{tournament.id}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from a cursor; raises ValueError if it is malformed."""
+    try:
+        created_at, tournament_id = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode().split('|')
+        return datetime.fromisoformat(created_at), int(tournament_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+def _counts():
+    """Correlated per-tournament counts; each is an index lookup per listed tournament."""
+    return (
+        select(func.count(Group.id)).where(Group.tournament_id == Tournament.id).scalar_subquery(),
+        select(func.count(Team.id)).join(Group, Group.id == Team.group_id)
+        .where(Group.tournament_id == Tournament.id).scalar_subquery(),
+        select(func.count(Match.id)).where(Match.tournament_id == Tournament.id).scalar_subquery(),
+    )
+
+
+def listing_filters(args):
+    """Return tournament_page() keyword arguments from request args; raises ValueError on a bad value."""
+    def parse_date(name):
+        value = args.get(name)
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+    return {
+        'after': args.get('after') or None,
+        'limit': max(1, min(int(args.get('limit') or PAGE_SIZE), MAX_PAGE_SIZE)),
+        'status': args.get('status') or None,
+        'start': parse_date('from'),
+        'end': parse_date('to'),
+        'terms': args.get('q', '').strip() or None,
+    }
+
+
+def tournament_page(after=None, limit=PAGE_SIZE, status=None, start=None, end=None, terms=None):
+    """Return a Page of TournamentSummary, newest first, in a single query.
+
+    Pages are read by keyset: ``after`` is the cursor of the previous page
+    and the query seeks past it on the (created_at, id) index instead of
+    counting an OFFSET, so every page costs the same however many
+    tournaments there are. ``start`` / ``end`` keep the tournaments that
+    overlap that date range; ``terms`` searches the names (see search.py).
+    """
+    statement = select(Tournament, *_counts())
+    if after:
+        created_at, tournament_id = decode_cursor(after)
+        statement = statement.where(or_(Tournament.created_at < created_at,
+                                        and_(Tournament.created_at == created_at, Tournament.id < tournament_id)))
+    if status:
+        statement = statement.where(Tournament.status == status)
+    if start is not None:
+        statement = statement.where(Tournament.end_date >= start)
+    if end is not None:
+        statement = statement.where(Tournament.start_date <= end)
+    if terms:
+        matches = search.name_filter(db.session, terms)
+        if matches is not None:
+            statement = statement.where(matches)
+
+    # One extra row tells us whether there is a next page
+    rows = db.session.execute(
+        statement.order_by(Tournament.created_at.desc(), Tournament.id.desc()).limit(limit + 1)
+    ).all()
+    items = [TournamentSummary(*row) for row in rows[:limit]]
+    next_cursor = encode_cursor(items[-1].tournament) if len(rows) > limit else None
+    return Page(items, next_cursor)
+
+
+def dashboard_totals():
+    """Return the totals shown in the home page stat cards, in a single query."""
+    row = db.session.execute(select(
+        select(func.count(Tournament.id)).scalar_subquery().label('tournament_count'),
+        select(func.count(Team.id)).scalar_subquery().label('team_count'),
+        select(func.count(Match.id)).scalar_subquery().label('match_count'),
+        select(func.count(Tournament.id))
+        .where(Tournament.status == 'group')
+        .scalar_subquery().label('active_count'),
+    )).one()
+    return dict(row._mapping)
+
+
+def tournament_with_groups(tournament_id):
+    """Load a tournament with its groups and teams eagerly, or abort with 404."""
+    return (Tournament.query
+            .options(selectinload(Tournament.groups).selectinload(Group.teams))
+            .get_or_404(tournament_id))
@@ -0,0 +1,345 @@
+"""
+Group tables with tie-breakers for the Tournament Manager application.
+
+compute() works on columnar results: one sequence per match column (home
+team, away team, home goals, away goals) plus each team's group, with teams
+numbered 0..n-1. The totals of every group are aggregated at once with
+bincount-style sums, using NumPy when it is installed and the array module
+otherwise, and all teams are sorted in one pass on the leading criteria.
+Only runs of teams that are still level go through tie-break resolution,
+which builds head-to-head mini tables from the matches between the tied
+teams.
+
+Fair-play points (lower is better) are used when the caller provides them;
+the match schema records no cards, so tournament_tables() ranks every team
+equal on fair play. Teams level on every criterion are ordered by entry
+(team ID) instead of drawing lots.
+"""
+
+from array import array
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import select
+
+from models import db, Group, Team, Match, Standing
+
+_numpy = None  # The numpy module once imported, or False if it isn't installed
+
+# ``criteria`` in order; 'head_to_head' compares the tied teams' matches
+# against each other on the ``head_to_head`` fields. With ``reapply``, the
+# mini table is rebuilt for any smaller group of teams it leaves level.
+Rules = namedtuple('Rules', 'criteria head_to_head reapply')
+
+RULES = {
+    # FIFA World Cup: overall goal figures first, then results between the tied teams
+    'fifa': Rules(('points', 'goal_difference', 'goals_for', 'head_to_head', 'fair_play'),
+                  ('points', 'goal_difference', 'goals_for'), False),
+    # UEFA club competitions: results between the tied teams first
+    'uefa': Rules(('points', 'head_to_head', 'goal_difference', 'goals_for', 'away_goals', 'wins', 'fair_play'),
+                  ('points', 'goal_difference', 'goals_for', 'away_goals'), True),
+}
+
+STAT_FIELDS = ('played', 'wins', 'draws', 'losses', 'goals_for', 'goals_against', 'points', 'away_goals')
+STORED_FIELDS = STAT_FIELDS[:-1]  # The standings table has no away_goals column
+
+Table = namedtuple('Table', 'order stats')
+GroupTable = namedtuple('GroupTable', 'group_id name rows')
+
+
+def get_numpy():
+    """Return NumPy, imported on first use, or None if it isn't installed.
+
+    Importing NumPy takes longer than the rest of the application, so it is
+    left until a table is ranked or a forecast simulated (or app.warm_up()).
+    """
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - NumPy is optional
+            numpy = False
+        _numpy = numpy
+    return _numpy or None
+
+
+def _aggregate(team_count, home, away, home_goals, away_goals):
+    """Return {stat: list} with one entry per team."""
+    np = get_numpy()
+    if np is not None:
+        home, away = np.asarray(home, dtype=np.intp), np.asarray(away, dtype=np.intp)
+        home_goals, away_goals = np.asarray(home_goals, dtype=np.int64), np.asarray(away_goals, dtype=np.int64)
+
+        def total(weights_home, weights_away):
+            return (np.bincount(home, weights_home, minlength=team_count)
+                    + np.bincount(away, weights_away, minlength=team_count)).astype(np.int64)
+
+        home_win, away_win = home_goals > away_goals, away_goals > home_goals
+        draw = home_goals == away_goals
+        ones = np.ones(len(home), dtype=np.int64)
+        stats = {
+            'played': total(ones, ones),
+            'wins': total(home_win, away_win),
+            'draws': total(draw, draw),
+            'losses': total(away_win, home_win),
+            'goals_for': total(home_goals, away_goals),
+            'goals_against': total(away_goals, home_goals),
+            'away_goals': np.bincount(away, away_goals, minlength=team_count).astype(np.int64),
+        }
+        stats['points'] = 3 * stats['wins'] + stats['draws']
+        return {field: values.tolist() for field, values in stats.items()}
+
+    stats = {field: array('q', bytes(8 * team_count)) for field in STAT_FIELDS}
+    played, wins, draws, losses = stats['played'], stats['wins'], stats['draws'], stats['losses']
+    goals_for, goals_against, away_total = stats['goals_for'], stats['goals_against'], stats['away_goals']
+    for h, a, hg, ag in zip(home, away, home_goals, away_goals):
+        played[h] += 1
+        played[a] += 1
+        goals_for[h] += hg
+        goals_against[h] += ag
+        goals_for[a] += ag
+        goals_against[a] += hg
+        away_total[a] += ag
+        if hg > ag:
+            wins[h] += 1
+            losses[a] += 1
+        elif hg < ag:
+            wins[a] += 1
+            losses[h] += 1
+        else:
+            draws[h] += 1
+            draws[a] += 1
+    stats['points'] = array('q', (3 * w + d for w, d in zip(wins, draws)))
+    return {field: values.tolist() for field, values in stats.items()}
+
+
+def _matches_by_group(group_of, home):
+    """Return {group: [match index, ...]}, used to find the matches between tied teams."""
+    np = get_numpy()
+    if np is not None and len(home):
+        groups = np.asarray(group_of)[np.asarray(home, dtype=np.intp)]
+        order = np.argsort(groups, kind='stable')
+        keys, starts = np.unique(groups[order], return_index=True)
+        return {key: chunk.tolist() for key, chunk in zip(keys.tolist(), np.split(order, starts[1:]))}
+    by_group = {}
+    for index, team in enumerate(home):
+        by_group.setdefault(group_of[team], []).append(index)
+    return by_group
+
+
+def compute(group_of, home, away, home_goals, away_goals, fair_play=None, team_ids=None, rules='fifa', stats=None):
+    """Rank every team in its group.
+
+    ``group_of`` gives each team's group number; ``home``/``away`` are team
+    numbers and ``home_goals``/``away_goals`` the scores of the completed
+    matches, which must be between teams of the same group. ``team_ids``
+    sets the final ordering of teams level on everything (default: team
+    number). Returns a Table whose ``order`` lists the team numbers sorted
+    by group and then position, and whose ``stats`` maps each of
+    STAT_FIELDS plus goal_difference and fair_play to a per-team list.
+
+    ``stats`` may give the per-team totals already aggregated (e.g. the
+    persisted standings), with or without away_goals. The matches are then
+    only used to break ties, and only those of groups with teams level on
+    the leading criteria need to be passed.
+    """
+    if isinstance(rules, str):
+        if rules not in RULES:
+            raise ValueError(f"Unknown standings rules '{rules}'")
+        rules = RULES[rules]
+    team_count = len(group_of)
+    if stats is None:
+        stats = _aggregate(team_count, home, away, home_goals, away_goals)
+    else:
+        stats = {field: list(values) for field, values in stats.items()}
+        if 'away_goals' not in stats:
+            away_total = [0] * team_count
+            for a, ag in zip(away, away_goals):
+                away_total[a] += ag
+            stats['away_goals'] = away_total
+    stats['goal_difference'] = [f - a for f, a in zip(stats['goals_for'], stats['goals_against'])]
+    stats['fair_play'] = list(fair_play) if fair_play is not None else [0] * team_count
+    team_ids = list(team_ids) if team_ids is not None else list(range(team_count))
+
+    # Higher is better for every criterion except fair-play points
+    values = {name: stats[name] for name in rules.criteria if name != 'head_to_head'}
+    if 'fair_play' in values:
+        values['fair_play'] = [-points for points in stats['fair_play']]
+
+    leading = []
+    for name in rules.criteria:
+        if name == 'head_to_head':
+            break
+        leading.append(values[name])
+
+    np = get_numpy()
+    if np is not None and team_count:
+        keys = [np.asarray(team_ids)] + [-np.asarray(v) for v in reversed(leading)] + [np.asarray(group_of)]
+        order = np.lexsort(keys).tolist()
+    else:
+        order = sorted(range(team_count),
+                       key=lambda t: (group_of[t],) + tuple(-v[t] for v in leading) + (team_ids[t],))
+
+    if len(leading) == len(rules.criteria):
+        return Table(order, stats)
+
+    by_group = None
+
+    def head_to_head(teams):
+        nonlocal by_group
+        if by_group is None:
+            by_group = _matches_by_group(group_of, home)
+        tied = set(teams)
+        mini = {team: dict.fromkeys(('points', 'goal_difference', 'goals_for', 'away_goals'), 0) for team in teams}
+        for m in by_group.get(group_of[teams[0]], ()):
+            h, a = home[m], away[m]
+            if h in tied and a in tied:
+                hg, ag = home_goals[m], away_goals[m]
+                mini[h]['goals_for'] += hg
+                mini[a]['goals_for'] += ag
+                mini[a]['away_goals'] += ag
+                mini[h]['goal_difference'] += hg - ag
+                mini[a]['goal_difference'] += ag - hg
+                if hg > ag:
+                    mini[h]['points'] += 3
+                elif hg < ag:
+                    mini[a]['points'] += 3
+                else:
+                    mini[h]['points'] += 1
+                    mini[a]['points'] += 1
+        return {team: tuple(mini[team][field] for field in rules.head_to_head) for team in teams}
+
+    def resolve(teams, position):
+        """Order teams that are level on criteria[:position]."""
+        if len(teams) < 2 or position == len(rules.criteria):
+            return sorted(teams, key=team_ids.__getitem__)
+        name = rules.criteria[position]
+        if name == 'head_to_head':
+            keys = head_to_head(teams)
+        else:
+            keys = {team: values[name][team] for team in teams}
+
+        buckets = {}
+        for team in teams:
+            buckets.setdefault(keys[team], []).append(team)
+        if len(buckets) == 1:
+            return resolve(teams, position + 1)
+
+        ordered = []
+        for key in sorted(buckets, reverse=True):
+            bucket = buckets[key]
+            if name == 'head_to_head' and rules.reapply and len(bucket) > 1:
+                ordered.extend(resolve(bucket, position))
+            else:
+                ordered.extend(resolve(bucket, position + 1))
+        return ordered
+
+    # Resolve each run of teams in the same group that the sort left level
+    def level_key(team):
+        return (group_of[team],) + tuple(v[team] for v in leading)
+
+    ranked = []
+    start = 0
+    while start < team_count:
+        end = start + 1
+        key = level_key(order[start])
+        while end < team_count and level_key(order[end]) == key:
+            end += 1
+        if end - start == 1:
+            ranked.append(order[start])
+        else:
+            ranked.extend(resolve(order[start:end], len(leading)))
+        start = end
+    return Table(ranked, stats)
+
+
+def _level_groups(group_of, stats, rules):
+    """Return the group numbers where two teams are level on the criteria before head-to-head."""
+    leading = []
+    for name in rules.criteria:
+        if name == 'head_to_head':
+            break
+        if name == 'goal_difference':
+            leading.append([f - a for f, a in zip(stats['goals_for'], stats['goals_against'])])
+        elif name != 'fair_play':  # Every team is equal on fair play (see the module docstring)
+            leading.append(stats[name])
+    seen, level = set(), set()
+    for team, group in enumerate(group_of):
+        key = (group,) + tuple(values[team] for values in leading)
+        if key in seen:
+            level.add(group)
+        seen.add(key)
+    return level
+
+
+def tournament_tables(tournament_id, rules=None, from_matches=False):
+    """Return a GroupTable per group of a tournament, in group order.
+
+    Rows are dicts with group_id, team_id, name and STORED_FIELDS, in
+    table order. Only completed group-stage matches between two teams of the
+    group named on the match count. ``rules`` defaults to the
+    STANDINGS_RULES setting.
+
+    The totals come from the persisted standings rows (see standings.py),
+    and match results are only read for the groups with teams level on the
+    leading criteria, to break those ties. With ``from_matches``, or when a
+    team has no standings row yet, every total is recomputed from the
+    matches instead.
+    """
+    if rules is None:
+        rules = current_app.config.get('STANDINGS_RULES', 'fifa')
+    if isinstance(rules, str):
+        if rules not in RULES:
+            raise ValueError(f"Unknown standings rules '{rules}'")
+        rules = RULES[rules]
+
+    groups = db.session.execute(
+        select(Group.id, Group.name).where(Group.tournament_id == tournament_id).order_by(Group.id)
+    ).all()
+    teams = db.session.execute(
+        select(Team.id, Team.name, Team.group_id, *(getattr(Standing, field) for field in STORED_FIELDS))
+        .join(Group, Group.id == Team.group_id)
+        .outerjoin(Standing, Standing.team_id == Team.id)
+        .where(Group.tournament_id == tournament_id)
+        .order_by(Team.group_id, Team.id)
+    ).all()
+
+    group_index = {group_id: i for i, (group_id, _) in enumerate(groups)}
+    team_index = {team[0]: i for i, team in enumerate(teams)}
+    group_of = array('l', (group_index[team[2]] for team in teams))
+
+    stats = None
+    if not from_matches and all(team[3] is not None for team in teams):
+        stats = {field: [team[3 + i] for team in teams] for i, field in enumerate(STORED_FIELDS)}
+    tied_names = None
+    if stats is not None:
+        tied_names = [groups[group][1] for group in sorted(_level_groups(group_of, stats, rules))]
+
+    home, away, home_goals, away_goals = array('l'), array('l'), array('l'), array('l')
+    if tied_names is None or tied_names:
+        statement = (
+            select(Match.home_team_id, Match.away_team_id, Match.home_score, Match.away_score, Match.group_name)
+            .where(Match.tournament_id == tournament_id, Match.stage == 'group', Match.status == 'completed',
+                   Match.home_score.isnot(None), Match.away_score.isnot(None))
+        )
+        if tied_names is not None:
+            statement = statement.where(Match.group_name.in_(tied_names))
+        for home_id, away_id, home_score, away_score, group_name in db.session.execute(statement):
+            h, a = team_index.get(home_id), team_index.get(away_id)
+            if h is None or a is None or group_of[h] != group_of[a] or groups[group_of[h]].name != group_name:
+                continue
+            home.append(h)
+            away.append(a)
+            home_goals.append(home_score)
+            away_goals.append(away_score)
+
+    table = compute(group_of, home, away, home_goals, away_goals,
+                    team_ids=[team[0] for team in teams], rules=rules, stats=stats)
+
+    rows_by_group = [[] for _ in groups]
+    for t in table.order:
+        team_id, name, group_id = teams[t][:3]
+        row = {'group_id': group_id, 'team_id': team_id, 'name': name}
+        row.update((field, table.stats[field][t]) for field in STORED_FIELDS)
+        rows_by_group[group_of[t]].append(row)
+    return [GroupTable(group_id, name, rows) for (group_id, name), rows in zip(groups, rows_by_group)]
@@ -0,0 +1,152 @@
+"""
+Batch result entry for the Tournament Manager application.
+
+The referee desk often has a whole session of results to enter at once.
+apply_results() validates every row up front, writes all valid scores with
+one executemany UPDATE and applies the standings deltas for the whole batch
+with another, instead of one request, standings update and commit per
+match. Invalid rows are reported back with their row number and skipped.
+"""
+
+import csv
+import io
+from collections import namedtuple
+
+from sqlalchemy import bindparam, select, update
+
+from models import db, Match
+import bracket
+import cache
+import standings
+
+# The columns of a match that validation and the standings deltas need
+MatchResult = namedtuple('MatchResult', 'id stage group_name bracket_slot home_team_id away_team_id '
+                                        'status home_score away_score')
+
+
+def parse_results_csv(text):
+    """Return result dicts from CSV text with match_id, home_score, away_score columns.
+
+    A header row starting with ``match_id`` is skipped. Values are left as
+    strings; apply_results() validates them.
+    """
+    rows = []
+    for i, row in enumerate(csv.reader(io.StringIO(text))):
+        if not row or not ''.join(row).strip():
+            continue
+        if i == 0 and row[0].strip().lower() in ('match_id', 'match', 'id'):
+            continue
+        rows.append({'match_id': row[0].strip(),
+                     'home_score': row[1].strip() if len(row) > 1 else '',
+                     'away_score': row[2].strip() if len(row) > 2 else ''})
+    return rows
+
+
+def _parse_row(row):
+    """Return (match_id, home_score, away_score) as ints, or raise ValueError."""
+    try:
+        match_id = int(row['match_id'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('Missing or invalid match_id')
+    try:
+        home_score, away_score = int(row['home_score']), int(row['away_score'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('Invalid score format')
+    if home_score < 0 or away_score < 0:
+        raise ValueError('Scores cannot be negative')
+    return match_id, home_score, away_score
+
+
+def apply_results(tournament, rows):
+    """Validate and apply a batch of results to a tournament's matches.
+
+    ``rows`` is a list of dicts with match_id, home_score and away_score.
+    Returns {'applied': count, 'errors': [{'row', 'match_id', 'error'}]},
+    with rows numbered from 1. Knockout winners are advanced as in
+    update_match. The caller is responsible for bumping the tournament
+    version and committing.
+    """
+    errors = []
+    scores = {}
+    for number, row in enumerate(rows, 1):
+        try:
+            match_id, home_score, away_score = _parse_row(row)
+        except ValueError as e:
+            match_id = row.get('match_id') if isinstance(row, dict) else None
+            errors.append({'row': number, 'match_id': match_id, 'error': str(e)})
+            continue
+        if match_id in scores:
+            errors.append({'row': number, 'match_id': match_id, 'error': 'Duplicate result for this match'})
+            continue
+        scores[match_id] = (number, home_score, away_score)
+
+    current = {}
+    if scores:
+        for row in db.session.execute(
+            select(*(getattr(Match, field) for field in MatchResult._fields))
+            .where(Match.tournament_id == tournament.id, Match.id.in_(scores))
+        ):
+            current[row.id] = MatchResult(*row)
+
+    # Knockout results can't be entered once the next round has been played
+    parent_slots = {match.bracket_slot // 2 for match in current.values()
+                    if match.bracket_slot is not None and match.bracket_slot > 1}
+    completed_slots = set()
+    if parent_slots:
+        completed_slots = set(db.session.execute(
+            select(Match.bracket_slot).where(Match.tournament_id == tournament.id,
+                                             Match.bracket_slot.in_(parent_slots),
+                                             Match.status == 'completed')
+        ).scalars())
+        # A playable parent result in the same batch counts as played
+        completed_slots.update(match.bracket_slot for match in current.values()
+                               if match.bracket_slot in parent_slots
+                               and match.home_team_id is not None and match.away_team_id is not None)
+
+    changes = []
+    for match_id, (number, home_score, away_score) in scores.items():
+        match = current.get(match_id)
+        error = None
+        if match is None:
+            error = 'Match not found in this tournament'
+        elif match.home_team_id is None or match.away_team_id is None:
+            error = 'Both teams must be known before entering a score'
+        elif match.bracket_slot is not None and home_score == away_score:
+            error = 'Knockout matches need a winner'
+        elif match.bracket_slot is not None and match.bracket_slot // 2 in completed_slots:
+            error = 'The next round match has already been played'
+        if error:
+            errors.append({'row': number, 'match_id': match_id, 'error': error})
+            continue
+        previous = standings.match_state(match)
+        changes.append((match._replace(status='completed', home_score=home_score, away_score=away_score),
+                        previous))
+
+    errors.sort(key=lambda error: error['row'])
+    if not changes:
+        return {'applied': 0, 'errors': errors}
+
+    # One prepared UPDATE for every valid result
+    table = Match.__table__
+    db.session.execute(
+        update(table)
+        .where(table.c.id == bindparam('b_match_id'))
+        .values(home_score=bindparam('new_home_score'), away_score=bindparam('new_away_score'),
+                status='completed'),
+        [{'b_match_id': match.id, 'new_home_score': match.home_score, 'new_away_score': match.away_score}
+         for match, _ in changes],
+    )
+    standings.apply_match_changes(changes)
+    cache.touch_matches(match.id for match, _ in changes)
+    db.session.expire_all()
+
+    # Deepest rounds first, so a winner is placed before its next match is looked up
+    knockout_ids = [match.id for match, _ in sorted(changes, key=lambda change: -(change[0].bracket_slot or 0))
+                    if match.bracket_slot is not None]
+    if knockout_ids:
+        matches = {match.id: match for match in Match.query.filter(Match.id.in_(knockout_ids))}
+        for match_id in knockout_ids:
+            if bracket.advance_winner(matches[match_id]):
+                tournament.status = 'completed'
+
+    return {'applied': len(changes), 'errors': errors}
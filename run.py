@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
-from app import app, db
+from app import create_app
+import migrations
 
-# Create database tables if they don't exist
+app = create_app()
+
+# Bring the database schema up to date before serving
 with app.app_context():
-    db.create_all()
+    migrations.upgrade()
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=8080)
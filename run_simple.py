@@ -1,5 +1,12 @@
 #!/usr/bin/env python3
-from app_simple import app
+from app import create_app
+import migrations
+
+# One process, no page cache and jobs run in the request: the simplest setup to debug
+app = create_app({'PAGE_CACHE': 'none', 'JOB_BACKEND': 'inline'})
+
+with app.app_context():
+    migrations.upgrade()
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5004)
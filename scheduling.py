@@ -0,0 +1,128 @@
+"""
+Round-robin fixture generation for the Tournament Manager application.
+
+Fixtures are built with the circle (Berger) method, so every team plays at
+most once per round. Rounds are handed to timetable.plan() in order, which
+places them across the available venues inside the tournament's dates, and
+the whole schedule is written with a single executemany INSERT.
+"""
+
+from sqlalchemy import insert, select
+
+from models import db, Group, Team, Match
+import timetable
+
+
+def circle_rounds(teams):
+    """Return the rounds of a single round robin as lists of (home, away) pairs.
+
+    Uses the circle method: the first team stays fixed while the others
+    rotate one place per round. With an odd number of teams one team sits
+    out each round. Home and away alternate so nobody is always at home.
+    """
+    teams = list(teams)
+    if len(teams) < 2:
+        return []
+    if len(teams) % 2:
+        teams.append(None)
+
+    n = len(teams)
+    rounds = []
+    for r in range(n - 1):
+        pairs = []
+        for i in range(n // 2):
+            home, away = teams[i], teams[n - 1 - i]
+            if home is None or away is None:
+                continue
+            # The fixed team alternates each round; the others by board position
+            if (r if i == 0 else i) % 2:
+                home, away = away, home
+            pairs.append((home, away))
+        rounds.append(pairs)
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+    return rounds
+
+
+def venue_name(index):
+    """Return the display name of the venue at ``index``."""
+    return f'Pitch {index + 1}'
+
+
+def group_fixtures(tournament_id):
+    """Return {group name: rounds} for every group in a tournament.
+
+    Each round is a list of ((home_id, home_name), (away_id, away_name)) pairs.
+    """
+    rows = db.session.execute(
+        select(Group.id, Group.name, Team.id, Team.name)
+        .join(Team, Team.group_id == Group.id)
+        .where(Group.tournament_id == tournament_id)
+        .order_by(Group.id, Team.id)
+    ).all()
+
+    teams_by_group = {}
+    for _, group_name, team_id, team_name in rows:
+        teams_by_group.setdefault(group_name, []).append((team_id, team_name))
+
+    return {name: circle_rounds(teams) for name, teams in teams_by_group.items()}
+
+
+def round_order(fixtures):
+    """Flatten {group: rounds} into timetable Fixtures, round 1 of every group first."""
+    num_rounds = max((len(rounds) for rounds in fixtures.values()), default=0)
+    ordered = []
+    for r in range(num_rounds):
+        for group_name, rounds in fixtures.items():
+            if r < len(rounds):
+                for home, away in rounds[r]:
+                    ordered.append(timetable.Fixture((group_name, home, away), home[0], away[0]))
+    return ordered
+
+
+def schedule_rows(tournament_id, placements):
+    """Turn timetable placements into Match insert rows."""
+    rows = []
+    for placement in placements:
+        group_name, home, away = placement.fixture.key
+        rows.append({
+            'tournament_id': tournament_id,
+            'home_team_id': home[0],
+            'away_team_id': away[0],
+            'home_team_name': home[1],
+            'away_team_name': away[1],
+            'match_date': placement.kickoff.date(),
+            'match_time': placement.kickoff.time(),
+            'venue': venue_name(placement.venue),
+            'stage': 'group',
+            'group_name': group_name,
+            'status': 'scheduled',
+        })
+    return rows
+
+
+def generate_round_robin_schedule(tournament, venues=1, rest_minutes=0, blackouts=(), improve=False):
+    """Create the group-stage matches for a tournament.
+
+    Matches are fitted between the tournament's start and end dates by
+    timetable.plan(). Raises ValueError if the tournament already has group
+    matches or if they don't all fit in the window. Returns the plan
+    metrics. The caller is responsible for committing.
+    """
+    existing = db.session.execute(
+        select(Match.id).where(Match.tournament_id == tournament.id, Match.stage == 'group').limit(1)
+    ).first()
+    if existing is not None:
+        raise ValueError('The group stage schedule has already been generated')
+
+    result = timetable.plan(round_order(group_fixtures(tournament.id)),
+                            tournament.start_date, tournament.end_date,
+                            venues=venues, rest_minutes=rest_minutes,
+                            blackouts=blackouts, improve=improve)
+    if result.unscheduled:
+        raise ValueError(f'Only {result.metrics["scheduled"]} of {result.metrics["fixtures"]} matches '
+                         f'fit between the start and end dates; add venues or extend the tournament')
+
+    rows = schedule_rows(tournament.id, result.placements)
+    if rows:
+        db.session.execute(insert(Match), rows)
+    return result.metrics
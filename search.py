@@ -0,0 +1,95 @@
+"""
+Tournament name search for the Tournament Manager application.
+
+On SQLite the names are indexed in an FTS5 table, ``tournaments_fts``,
+kept in step with ``tournaments`` by triggers; a search for ``spring cup``
+matches names containing words starting with ``spring`` and ``cup``. On
+PostgreSQL a pg_trgm GIN index on ``lower(name)`` serves substring matches.
+Anywhere else (or on a SQLite build without FTS5) the search falls back to a
+case-insensitive substring scan.
+
+install() creates the index and is run by create_all() for new databases
+and by migration 7 for existing ones.
+"""
+
+import re
+
+from sqlalchemy import event, func, select, text
+
+from models import Tournament
+
+FTS_TABLE = 'tournaments_fts'
+
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name, content='tournaments', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"""CREATE TRIGGER IF NOT EXISTS tournaments_fts_insert AFTER INSERT ON tournaments BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, name) VALUES (new.id, new.name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tournaments_fts_delete AFTER DELETE ON tournaments BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tournaments_fts_update AFTER UPDATE OF name ON tournaments BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO {FTS_TABLE} (rowid, name) VALUES (new.id, new.name);
+    END""",
+    # Index the rows that already exist
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+POSTGRESQL_DDL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS ix_tournaments_name_trgm ON tournaments USING gin (lower(name) gin_trgm_ops)',
+]
+
+# Engine URL -> whether the FTS table exists, checked once per process
+_has_fts = {}
+
+
+def install(conn):
+    """Create the name search index for the connection's database, if it supports one."""
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        if not conn.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar():
+            return
+        for statement in SQLITE_DDL:
+            conn.execute(text(statement))
+    elif dialect == 'postgresql':
+        for statement in POSTGRESQL_DDL:
+            conn.execute(text(statement))
+    _has_fts.pop(str(conn.engine.url), None)
+
+
+@event.listens_for(Tournament.__table__, 'after_create')
+def _create_index(table, conn, **kwargs):
+    install(conn)
+
+
+def _fts_available(session):
+    engine = session.get_bind()
+    key = str(engine.url)
+    if key not in _has_fts:
+        _has_fts[key] = session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+        ).first() is not None
+    return _has_fts[key]
+
+
+def fts_query(terms):
+    """Turn free text into an FTS5 query matching every word as a prefix, or '' if it has no words."""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', terms))
+
+
+def name_filter(session, terms):
+    """Return a WHERE clause matching tournaments whose name matches ``terms``, or None to match all."""
+    terms = terms.strip()
+    if not terms:
+        return None
+    if session.get_bind().dialect.name == 'sqlite' and _fts_available(session):
+        query = fts_query(terms)
+        if not query:
+            return None
+        matches = (select(text('rowid')).select_from(text(FTS_TABLE))
+                   .where(text(f'{FTS_TABLE} MATCH :query').bindparams(query=query)))
+        return Tournament.id.in_(matches)
+    return func.lower(Tournament.name).contains(terms.lower(), autoescape=True)
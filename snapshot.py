@@ -0,0 +1,109 @@
+"""
+Precomputed read model of a tournament page.
+
+A Snapshot holds what the tournament page renders: the tournament and its
+groups with their teams. It is built from Core row tuples (no ORM
+objects), made of namedtuples and tuples only, and stored pickled in the
+``tournament_snapshots`` table next to the version it was built at.
+
+cache.bump() marks the tournament, and once the write transaction has
+committed the snapshot is rebuilt and stored in a short transaction of its
+own, so the write's locks are never held for it. Page views only read: a
+missing or outdated snapshot (the post-commit rebuild failed, or the data
+predates it) is built in memory for that request and not stored. Blobs are
+only ever produced by this module, which is what makes pickle acceptable
+here.
+"""
+
+import logging
+import pickle
+from collections import namedtuple
+
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import db, Tournament, Group, Team, TournamentSnapshot
+
+TournamentInfo = namedtuple('TournamentInfo', 'id name start_date end_date status')
+GroupInfo = namedtuple('GroupInfo', 'id name teams')
+TeamInfo = namedtuple('TeamInfo', 'id name')
+Snapshot = namedtuple('Snapshot', 'version tournament groups')
+
+logger = logging.getLogger(__name__)
+
+
+def build(tournament_id, version, connection=None):
+    """Build the Snapshot of a tournament at ``version``, reading through ``connection`` or the session."""
+    execute = (connection or db.session).execute
+    tournament = execute(
+        select(Tournament.id, Tournament.name, Tournament.start_date, Tournament.end_date, Tournament.status)
+        .where(Tournament.id == tournament_id)
+    ).one()
+    teams = execute(
+        select(Team.id, Team.name, Team.group_id)
+        .join(Group, Group.id == Team.group_id)
+        .where(Group.tournament_id == tournament_id)
+        .order_by(Team.id)
+    ).all()
+    teams_by_group = {}
+    for team_id, name, group_id in teams:
+        teams_by_group.setdefault(group_id, []).append(TeamInfo(team_id, name))
+    groups = tuple(
+        GroupInfo(group_id, name, tuple(teams_by_group.get(group_id, ())))
+        for group_id, name in execute(
+            select(Group.id, Group.name).where(Group.tournament_id == tournament_id).order_by(Group.id))
+    )
+    return Snapshot(version=version, tournament=TournamentInfo(*tournament), groups=groups)
+
+
+def store(tournament_id, version, connection):
+    """Build and save the snapshot for ``version`` through ``connection``; returns it.
+
+    A snapshot stored for a later version by a concurrent writer is kept.
+    """
+    built = build(tournament_id, version, connection)
+    data = pickle.dumps(built, protocol=pickle.HIGHEST_PROTOCOL)
+    connection.execute(delete(TournamentSnapshot).where(TournamentSnapshot.tournament_id == tournament_id,
+                                                        TournamentSnapshot.version < version))
+    connection.execute(insert(TournamentSnapshot).values(tournament_id=tournament_id, version=version, data=data))
+    return built
+
+
+def refresh_after_commit(tournament_id, version):
+    """Rebuild the tournament's snapshot once the current transaction commits (see the module docstring)."""
+    db.session.info.setdefault('snapshot_versions', {})[tournament_id] = version
+
+
+@event.listens_for(Session, 'after_commit')
+def _store_refreshed(session):
+    pending = session.info.pop('snapshot_versions', None)
+    for tournament_id, version in (pending or {}).items():
+        try:
+            with db.engine.begin() as connection:
+                store(tournament_id, version, connection)
+        except IntegrityError:
+            pass  # A later version was stored first
+        except Exception:
+            # The write is committed; page views build the snapshot themselves until the next one
+            logger.exception('Storing the snapshot of tournament %s failed', tournament_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_refreshed(session):
+    session.info.pop('snapshot_versions', None)
+
+
+def load(tournament_id):
+    """Return the tournament's current Snapshot, or None if the tournament doesn't exist. Never writes."""
+    row = db.session.execute(
+        select(Tournament.version, TournamentSnapshot.version, TournamentSnapshot.data)
+        .outerjoin(TournamentSnapshot, TournamentSnapshot.tournament_id == Tournament.id)
+        .where(Tournament.id == tournament_id)
+    ).first()
+    if row is None:
+        return None
+    version, stored_version, data = row
+    if stored_version == version:
+        return pickle.loads(data)
+    return build(tournament_id, version)
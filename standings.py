@@ -0,0 +1,222 @@
+"""
+Persisted group standings for the Tournament Manager application.
+
+Each team has one row in the standings table holding its group-stage
+aggregates. Score changes are applied as deltas by update_match, and
+rebuild_standings() recomputes everything from the matches table to repair
+drift. Table order, with tie-breakers, comes from ranking.py.
+"""
+
+from sqlalchemy import bindparam, select, update
+
+from models import db, Group, Match, Standing
+
+STAT_FIELDS = ('played', 'wins', 'draws', 'losses', 'goals_for', 'goals_against', 'points')
+
+
+def empty_row(name):
+    """Return a zeroed standings row in the format used by the templates."""
+    row = {'name': name}
+    row.update((field, 0) for field in STAT_FIELDS)
+    return row
+
+
+def result_stats(home_score, away_score):
+    """Return the (home, away) stat contributions of a completed match."""
+    home = dict.fromkeys(STAT_FIELDS, 0)
+    away = dict.fromkeys(STAT_FIELDS, 0)
+
+    home['played'] = away['played'] = 1
+    home['goals_for'] = away['goals_against'] = home_score
+    home['goals_against'] = away['goals_for'] = away_score
+
+    if home_score > away_score:
+        home['wins'] = away['losses'] = 1
+        home['points'] = 3
+    elif home_score < away_score:
+        away['wins'] = home['losses'] = 1
+        away['points'] = 3
+    else:
+        home['draws'] = away['draws'] = 1
+        home['points'] = away['points'] = 1
+
+    return home, away
+
+
+def counts_for_standings(status, home_score, away_score):
+    """Whether a match result should contribute to the group tables."""
+    return status == 'completed' and home_score is not None and away_score is not None
+
+
+def _group_totals(group, matches):
+    """Return {team id: row} for one group, accumulated from ``matches``."""
+    teams = {team.id: empty_row(team.name) for team in group.teams}
+
+    for match in matches:
+        if match.stage == 'group' and match.group_name == group.name and match.home_team_id in teams and match.away_team_id in teams:
+            if counts_for_standings(match.status, match.home_score, match.away_score):
+                home, away = result_stats(match.home_score, match.away_score)
+                for field in STAT_FIELDS:
+                    teams[match.home_team_id][field] += home[field]
+                    teams[match.away_team_id][field] += away[field]
+
+    return teams
+
+
+def match_state(match):
+    """Capture the parts of a match that affect standings, before editing it."""
+    return (match.status, match.home_score, match.away_score)
+
+
+def _eligible_rows(match):
+    """Return the (home, away) standings rows a group match counts towards, or None."""
+    if match.stage != 'group' or match.home_team_id is None or match.away_team_id is None:
+        return None
+
+    rows = {row.team_id: row for row in
+            Standing.query.filter(Standing.team_id.in_([match.home_team_id, match.away_team_id]))}
+    home = rows.get(match.home_team_id)
+    away = rows.get(match.away_team_id)
+    if home is None or away is None or home.group_id != away.group_id:
+        return None
+
+    group = db.session.get(Group, home.group_id)
+    if group is None or group.name != match.group_name:
+        return None
+
+    return home, away
+
+
+def _apply(home_row, away_row, home_score, away_score, sign):
+    home, away = result_stats(home_score, away_score)
+    for field in STAT_FIELDS:
+        setattr(home_row, field, getattr(home_row, field) + sign * home[field])
+        setattr(away_row, field, getattr(away_row, field) + sign * away[field])
+
+
+def apply_match_change(match, previous):
+    """Update the persisted standings for a match whose result changed.
+
+    ``previous`` is the value of match_state() taken before the edit. The old
+    contribution is removed and the new one added, so corrections to an
+    already-completed match are handled the same way as a first result.
+    The caller is responsible for committing.
+    """
+    rows = _eligible_rows(match)
+    if rows is None:
+        return
+    home_row, away_row = rows
+
+    old_status, old_home, old_away = previous
+    if counts_for_standings(old_status, old_home, old_away):
+        _apply(home_row, away_row, old_home, old_away, -1)
+    if counts_for_standings(match.status, match.home_score, match.away_score):
+        _apply(home_row, away_row, match.home_score, match.away_score, 1)
+
+
+def apply_match_changes(changes):
+    """Update the persisted standings for many result changes at once.
+
+    ``changes`` is a list of (match, previous) pairs as for
+    apply_match_change(), where ``match`` may be any object with the Match
+    columns (e.g. a row tuple) holding the new result. Deltas are summed per
+    team and written with one executemany UPDATE. The caller is responsible
+    for committing.
+    """
+    team_ids = {team_id for match, _ in changes if match.stage == 'group'
+                for team_id in (match.home_team_id, match.away_team_id) if team_id is not None}
+    if not team_ids:
+        return
+    group_of = dict(db.session.execute(
+        select(Standing.team_id, Standing.group_id).where(Standing.team_id.in_(team_ids))
+    ).all())
+    group_names = dict(db.session.execute(
+        select(Group.id, Group.name).where(Group.id.in_(set(group_of.values())))
+    ).all())
+
+    deltas = {}
+
+    def add(team_id, stats, sign):
+        totals = deltas.setdefault(team_id, dict.fromkeys(STAT_FIELDS, 0))
+        for field in STAT_FIELDS:
+            totals[field] += sign * stats[field]
+
+    for match, (old_status, old_home, old_away) in changes:
+        # Same eligibility rule as _eligible_rows()
+        group_id = group_of.get(match.home_team_id)
+        if (match.stage != 'group' or group_id is None or group_of.get(match.away_team_id) != group_id
+                or group_names.get(group_id) != match.group_name):
+            continue
+        if counts_for_standings(old_status, old_home, old_away):
+            home, away = result_stats(old_home, old_away)
+            add(match.home_team_id, home, -1)
+            add(match.away_team_id, away, -1)
+        if counts_for_standings(match.status, match.home_score, match.away_score):
+            home, away = result_stats(match.home_score, match.away_score)
+            add(match.home_team_id, home, 1)
+            add(match.away_team_id, away, 1)
+
+    params = []
+    for team_id, totals in deltas.items():
+        values = {f'd_{field}': value for field, value in totals.items()}
+        values['b_team_id'] = team_id
+        params.append(values)
+    if params:
+        table = Standing.__table__
+        db.session.execute(
+            update(table)
+            .where(table.c.team_id == bindparam('b_team_id'))
+            .values({field: table.c[field] + bindparam(f'd_{field}') for field in STAT_FIELDS}),
+            params,
+        )
+
+
+def rebuild_standings(tournament):
+    """Recompute every standings row for a tournament from its matches.
+
+    Rows are created for teams that have none. The caller is responsible
+    for committing.
+    """
+    existing = {row.team_id: row for row in
+                Standing.query.filter_by(tournament_id=tournament.id)}
+    matches = Match.query.filter_by(tournament_id=tournament.id, stage='group').all()
+    seen = set()
+
+    for group in tournament.groups:
+        for team_id, values in _group_totals(group, matches).items():
+            row = existing.get(team_id)
+            if row is None:
+                row = Standing(tournament_id=tournament.id, team_id=team_id)
+                db.session.add(row)
+            row.group_id = group.id
+            row.team_name = values['name']
+            for field in STAT_FIELDS:
+                setattr(row, field, values[field])
+            seen.add(team_id)
+
+    # Drop rows for teams that no longer belong to the tournament
+    for team_id, row in existing.items():
+        if team_id not in seen:
+            db.session.delete(row)
+
+
+def _stored_totals(tournament):
+    """Read the persisted rows as {team id: row} in the format of _group_totals()."""
+    totals = {}
+    for row in Standing.query.filter_by(tournament_id=tournament.id):
+        values = {'name': row.team_name}
+        values.update((field, getattr(row, field)) for field in STAT_FIELDS)
+        totals[row.team_id] = values
+    return totals
+
+
+def find_drift(tournament):
+    """Return the names of groups whose stored totals differ from a full recompute."""
+    stored = _stored_totals(tournament)
+    matches = Match.query.filter_by(tournament_id=tournament.id, stage='group').all()
+    drifted = []
+    for group in tournament.groups:
+        expected = _group_totals(group, matches)
+        if {team_id: stored.get(team_id) for team_id in expected} != expected:
+            drifted.append(group.name)
+    return drifted
@@ -0,0 +1,72 @@
+import os
+import sys
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app  # noqa: E402
+import bulk  # noqa: E402
+import migrations  # noqa: E402
+import scheduling  # noqa: E402
+from models import db, Tournament  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    """An app on a fresh SQLite database, with jobs run in the request and no page cache."""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'),
+        'JOBS_PATH': str(tmp_path / 'jobs.db'),
+        'JOB_BACKEND': 'inline',
+        'PAGE_CACHE': 'none',
+        'LIVE_BACKEND': 'memory',
+        'FORECAST_ITERATIONS': 200,
+        'FORECAST_PROCESSES': 1,
+    })
+    with app.app_context():
+        migrations.upgrade()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_tournament(app):
+    """Return a function that creates a scheduled tournament of ``groups`` x ``per_group`` teams; returns its ID."""
+    def make(groups=4, per_group=4, schedule=True):
+        created = bulk.create_tournament(f'Test {groups}x{per_group}', date(2024, 6, 1), date(2024, 7, 31),
+                                         [f'Team {i}' for i in range(groups * per_group)], groups)
+        if schedule:
+            scheduling.generate_round_robin_schedule(db.session.get(Tournament, created['tournament_id']),
+                                                     venues=groups)
+        db.session.commit()
+        return created['tournament_id']
+    return make
+
+
+@pytest.fixture
+def count_queries(app):
+    """Return a function that runs ``call()`` and returns the number of SQL statements it executed."""
+    executed = []
+
+    def record(*args):
+        executed.append(1)
+
+    def count(call):
+        executed.clear()
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            call()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        return len(executed)
+    return count
@@ -0,0 +1,24 @@
+"""ETags of the versioned JSON API."""
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+
+def test_small_bodies_share_one_etag(client, make_tournament):
+    url = f'/api/v1/tournaments/{make_tournament(groups=1, per_group=2)}'
+    plain, compressed = client.get(url), client.get(url, headers=GZIP)
+    assert 'Content-Encoding' not in compressed.headers
+    assert compressed.data == plain.data
+    assert compressed.headers['ETag'] == plain.headers['ETag']
+    assert not plain.headers['ETag'].endswith('-gz"')
+
+
+def test_compressed_bodies_get_their_own_etag(client, make_tournament):
+    url = f'/api/v1/tournaments/{make_tournament(groups=4, per_group=4)}/matches'
+    plain, compressed = client.get(url), client.get(url, headers=GZIP)
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['ETag'] == plain.headers['ETag'][:-1] + '-gz"'
+
+    for response, headers in ((plain, {}), (compressed, GZIP)):
+        revalidated = client.get(url, headers=dict(headers, **{'If-None-Match': response.headers['ETag']}))
+        assert revalidated.status_code == 304
+        assert revalidated.headers['ETag'] == response.headers['ETag']
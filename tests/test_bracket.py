@@ -0,0 +1,102 @@
+"""Knockout bracket seeding, byes and winner propagation."""
+
+import random
+
+import pytest
+
+import bracket
+from models import db, Match, Tournament
+
+
+def first_round(slots, field):
+    """Return the first-round (home, away) pairs of a bracket for ``field`` qualifiers."""
+    size = 1
+    while size < field:
+        size *= 2
+    return size, [sides for slot, sides in slots.items() if slot >= size // 2]
+
+
+@pytest.mark.parametrize('field', [3, 5, 6, 7, 12])
+def test_top_seeds_get_the_byes(field):
+    seeded = [(seed, f'Team {seed}', seed) for seed in range(1, field + 1)]
+    slots = bracket.build_bracket(seeded)
+    size, pairs = first_round(slots, field)
+
+    assert len(slots) == field - 1  # every match but the byes, one loser each
+    playing = {team[0] for pair in pairs for team in pair}
+    byes = {team[0] for slot, sides in slots.items() if slot < size // 2 for team in sides if team is not None}
+    assert byes == set(range(1, size - field + 1))
+    assert playing | byes == set(range(1, field + 1)) and not playing & byes
+
+
+def test_first_round_avoids_same_group_pairs():
+    # Seeds 1 and 8 are both from group A, seeds 3 and 6 both from group C
+    seeded = [(1, 'A1', 'A'), (2, 'B1', 'B'), (3, 'C1', 'C'), (4, 'D1', 'D'),
+              (5, 'B2', 'B'), (6, 'C2', 'C'), (7, 'D2', 'D'), (8, 'A2', 'A')]
+    _, pairs = first_round(bracket.build_bracket(seeded), len(seeded))
+    assert sorted(team[0] for pair in pairs for team in pair) == list(range(1, 9))
+    assert all(home[2] != away[2] for home, away in pairs)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_first_round_avoids_same_group_pairs_with_byes(seed):
+    rng = random.Random(seed)
+    groups, per_group = rng.randint(2, 8), rng.randint(2, 3)
+    seeded = []
+    for position in range(per_group):
+        tier = list(range(groups))
+        rng.shuffle(tier)
+        seeded.extend((position * 100 + group, f'Team {position}{group}', group) for group in tier)
+    _, pairs = first_round(bracket.build_bracket(seeded), len(seeded))
+    assert all(home[2] != away[2] for home, away in pairs)
+
+
+def knockout(client, make_tournament):
+    """Advance a 2x3 tournament with two qualifiers per group; return its ID and {slot: match}."""
+    tournament_id = make_tournament(groups=2, per_group=3)
+    assert client.post(f'/tournament/{tournament_id}/advance', data={'qualifiers': 2}).status_code == 302
+    matches = Match.query.filter(Match.tournament_id == tournament_id, Match.bracket_slot.isnot(None))
+    return tournament_id, {match.bracket_slot: match for match in matches}
+
+
+def play(client, match, home_score, away_score):
+    assert client.post(f'/match/{match.id}/update',
+                       data={'home_score': home_score, 'away_score': away_score}).status_code == 302
+    db.session.expire_all()
+
+
+def test_winners_move_into_the_parent_match(client, make_tournament):
+    tournament_id, slots = knockout(client, make_tournament)
+    assert sorted(slots) == [1, 2, 3]
+    final, semis = slots[1], (slots[2], slots[3])
+    assert final.home_team_id is None and final.away_team_id is None
+
+    play(client, semis[0], 2, 1)
+    play(client, semis[1], 0, 3)
+    assert (final.home_team_id, final.away_team_id) == (semis[0].home_team_id, semis[1].away_team_id)
+    assert final.home_team_name == semis[0].home_team_name
+
+    play(client, final, 1, 0)
+    assert db.session.get(Tournament, tournament_id).status == 'completed'
+
+
+def test_a_corrected_result_replaces_the_winner(client, make_tournament):
+    _, slots = knockout(client, make_tournament)
+    final, semi = slots[1], slots[2]
+
+    play(client, semi, 2, 1)
+    assert final.home_team_id == semi.home_team_id
+    play(client, semi, 1, 2)
+    assert (final.home_team_id, final.home_team_name) == (semi.away_team_id, semi.away_team_name)
+
+
+def test_no_correction_once_the_parent_is_played(client, make_tournament):
+    _, slots = knockout(client, make_tournament)
+    final, semis = slots[1], (slots[2], slots[3])
+    play(client, semis[0], 2, 1)
+    play(client, semis[1], 2, 1)
+    play(client, final, 1, 0)
+
+    play(client, semis[0], 0, 1)  # Rejected: the final already has its result
+    assert (semis[0].home_score, semis[0].away_score) == (2, 1)
+    assert final.home_team_id == semis[0].home_team_id
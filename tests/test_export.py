@@ -0,0 +1,28 @@
+"""Filters and caching of the CSV and iCalendar exports."""
+
+import time
+
+from sqlalchemy import select
+
+from models import db, Group, Team
+
+
+def test_feed_is_the_same_until_the_tournament_changes(client, make_tournament):
+    url = f'/tournament/{make_tournament(groups=2, per_group=3)}/export/fixtures.ics'
+    first = client.get(url)
+    time.sleep(1.1)
+    second = client.get(url)
+    assert first.status_code == 200
+    assert second.data == first.data
+    assert second.headers['ETag'] == first.headers['ETag']
+
+
+def test_bad_or_unknown_team_is_an_error(client, make_tournament):
+    tournament_id = make_tournament(groups=1, per_group=2)
+    other_team = db.session.execute(select(Team.id).join(Group, Group.id == Team.group_id)
+                                    .where(Group.tournament_id == make_tournament(1, 2))).scalars().first()
+    url = f'/tournament/{tournament_id}/export/fixtures.csv'
+    assert client.get(url + '?team=abc').status_code == 400
+    assert client.get(url + f'?team={other_team}').status_code == 404
+    assert client.get(url + '?from=June').status_code == 400
+    assert client.get(url + '?team=').status_code == 200
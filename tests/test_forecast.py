@@ -0,0 +1,69 @@
+"""Qualification forecasts shown on the groups page."""
+
+from sqlalchemy import event, select
+
+import cache
+import forecast
+import jobs
+import ranking
+import standings
+from models import db, Match, Team, Tournament
+
+# T1 beats T0, and the two finish level on points, goal difference and goals
+RESULTS = {(0, 1): (0, 1), (0, 2): (1, 0), (0, 3): (1, 0), (1, 2): (1, 0), (1, 3): (0, 1), (2, 3): (0, 0)}
+
+
+def play(tournament_id, results):
+    teams = db.session.execute(select(Team.id).order_by(Team.id)).scalars().all()
+    for match in Match.query.filter_by(tournament_id=tournament_id):
+        pair = tuple(sorted((teams.index(match.home_team_id), teams.index(match.away_team_id))))
+        scores = results[pair]
+        if teams.index(match.home_team_id) != pair[0]:
+            scores = scores[::-1]
+        match.home_score, match.away_score = scores
+        match.status = 'completed'
+    standings.rebuild_standings(db.session.get(Tournament, tournament_id))
+    cache.bump(tournament_id)
+    db.session.commit()
+
+
+def test_finished_group_matches_the_real_table(client, make_tournament):
+    tournament_id = make_tournament(groups=1, per_group=4)
+    play(tournament_id, RESULTS)
+    assert client.get(f'/tournament/{tournament_id}/groups').status_code == 200
+
+    chances = forecast.current(tournament_id).chances
+    table = ranking.tournament_tables(tournament_id)[0].rows
+    assert [chances[row['team_id']] for row in table] == [(1.0, 1.0), (1.0, 0.0), (0.0, 0.0), (0.0, 0.0)]
+
+
+def test_viewing_the_groups_page_writes_nothing(app, client, make_tournament):
+    tournament_id = make_tournament(groups=2, per_group=3)
+    url = f'/tournament/{tournament_id}/groups'
+    client.get(url)
+    cache.bump(tournament_id)  # a write that leaves the forecast inputs as they were
+    db.session.commit()
+
+    writes = []
+
+    def record(conn, cursor, statement, *args):
+        if not statement.lstrip().upper().startswith(('SELECT', 'PRAGMA')):
+            writes.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        assert client.get(url).status_code == 200
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert writes == []
+    with app.test_request_context():
+        assert len(jobs.get_queue().recent(tournament_id)) == 1
+
+
+def test_default_iterations_drop_without_numpy(app, monkeypatch, caplog):
+    app.config['FORECAST_ITERATIONS'] = 0
+    assert forecast._settings()[0] == forecast.DEFAULT_ITERATIONS
+    monkeypatch.setattr(ranking, '_numpy', False)
+    monkeypatch.setattr(forecast, '_warned', False)
+    assert forecast._settings()[0] == forecast.FALLBACK_ITERATIONS
+    assert 'NumPy is not installed' in caplog.text
@@ -0,0 +1,59 @@
+"""The hot tournament queries are index lookups, not table scans (EXPLAIN QUERY PLAN)."""
+
+from sqlalchemy import event, text
+
+import migrations
+from models import db, Match
+
+
+def plans_of(client, requests):
+    """Run ``requests`` (method, url, kwargs) and return [(sql, plan details)] for every SELECT they issued."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        for method, url, kwargs in requests:
+            assert client.open(url, method=method, **kwargs).status_code < 400, url
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    connection = db.engine.raw_connection()
+    try:
+        return [(statement, [row[3] for row in connection.execute('EXPLAIN QUERY PLAN ' + statement, parameters)])
+                for statement, parameters in statements]
+    finally:
+        connection.close()
+
+
+def test_lookup_indexes_are_created_idempotently(app):
+    migrations.upgrade()
+    names = set(db.session.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+    assert {name for name, _, _ in migrations.LOOKUP_INDEXES} <= names
+
+
+def test_tournament_queries_use_indexes(client, make_tournament):
+    tournament_id = make_tournament()
+    match_id = db.session.execute(
+        db.select(Match.id).where(Match.tournament_id == tournament_id)).scalars().first()
+    base = f'/tournament/{tournament_id}'
+    plans = plans_of(client, [
+        ('GET', base, {}),
+        ('GET', f'{base}/groups', {}),
+        ('GET', f'/api/v1/tournaments/{tournament_id}/standings', {}),
+        ('GET', f'/api/v1/tournaments/{tournament_id}/matches', {}),
+        ('GET', f'{base}/export/fixtures.csv', {}),
+        ('POST', f'/match/{match_id}/update', {'data': {'home_score': 1, 'away_score': 0}}),
+        ('POST', f'{base}/results', {'json': [{'match_id': match_id, 'home_score': 2, 'away_score': 2}]}),
+    ])
+
+    scans = [(statement, details) for statement, details in plans
+             if any(detail.startswith('SCAN') and detail != 'SCAN CONSTANT ROW' for detail in details)]
+    assert scans == []
+    used = ' '.join(detail for _, details in plans for detail in details)
+    for name in ('ix_groups_tournament_id', 'ix_teams_group_id', 'ix_matches_tournament_stage_group',
+                 'ix_matches_tournament_schedule', 'ix_matches_tournament_status'):
+        assert name in used
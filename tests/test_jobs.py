@@ -0,0 +1,47 @@
+"""Outcome of background jobs."""
+
+import sqlite3
+import time
+
+import jobs
+import live
+
+
+def test_failed_notification_does_not_rerun_committed_work(app, client, make_tournament, monkeypatch):
+    tournament_id = make_tournament(groups=2, per_group=3, schedule=False)
+
+    def unreachable(*args):
+        raise OSError('live relay unavailable')
+
+    monkeypatch.setattr(live, 'publish_reload', unreachable)
+    with app.test_request_context():
+        job = jobs.submit('schedule', {'tournament_id': tournament_id, 'venues': 2, 'rest_minutes': 0,
+                                       'blackouts': [], 'improve': False}, tournament_id)
+    assert job['status'] == 'succeeded'
+    assert job['attempts'] == 1 and job['error'] is None
+
+
+def test_after_commit_runs_at_once_outside_a_job(app):
+    called = []
+    with app.test_request_context():
+        jobs.after_commit(called.append, 1)
+    assert called == [1]
+
+
+def test_dispatcher_survives_a_failed_claim(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(jobs.TASKS, 'echo', lambda progress, value: {'value': value})
+    queue = jobs.JobQueue(app, str(tmp_path / 'threaded.db'), workers=1, interval=0.01)
+    claim, failures = queue._claim, []
+
+    def flaky_claim(job_id=None):
+        if not failures:
+            failures.append(1)
+            raise sqlite3.OperationalError('database is locked')
+        return claim(job_id)
+
+    monkeypatch.setattr(queue, '_claim', flaky_claim)
+    job = queue.submit('echo', {'value': 1})
+    deadline = time.time() + 10
+    while queue.get(job['id'])['status'] != 'succeeded' and time.time() < deadline:
+        time.sleep(0.01)
+    assert failures and queue.get(job['id'])['result'] == {'value': 1}
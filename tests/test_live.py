@@ -0,0 +1,76 @@
+"""Live event streams and the backend they use."""
+
+import sqlite3
+import threading
+
+from app import create_app
+import live
+from models import db, Match
+
+
+def test_stream_ends_and_resumes_from_last_event_id(app, client, make_tournament):
+    tournament_id = make_tournament(groups=1, per_group=2)
+    app.config['LIVE_STREAM_SECONDS'] = 0.2
+    url = f'/api/v1/tournaments/{tournament_id}/events'
+    body = client.get(url).get_data(as_text=True)
+    assert body.startswith('retry:')
+    resumed = client.get(url, headers={'Last-Event-ID': '0'}).get_data(as_text=True)
+    assert 'event: reload' in resumed
+
+
+def test_events_cross_workers_through_the_sqlite_relay(tmp_path):
+    path = str(tmp_path / 'live.db')
+    sender, receiver = live.Broker(), live.Broker()
+    sender.relay = live.SQLiteRelay(path, sender, interval=0.01)
+    receiver.relay = live.SQLiteRelay(path, receiver, interval=0.01)
+    connect, failures = receiver.relay._connect, []
+
+    def flaky_connect():
+        # The receiving relay's first read fails; it must keep polling
+        if not failures and threading.current_thread().name == 'live-relay':
+            failures.append(1)
+            raise sqlite3.OperationalError('database is locked')
+        return connect()
+
+    receiver.relay._connect = flaky_connect
+    receiver.relay.start()
+    sender.publish(7, 0, 3, 'reload', '{"version":3}')
+    version, frames = receiver.wait(7, 0, timeout=5)
+    assert failures and version == 3
+    assert frames == [live.sse_frame(3, 'reload', '{"version":3}')]
+
+
+def test_sqlite_relay_is_the_default_with_several_workers(monkeypatch, tmp_path):
+    monkeypatch.delenv('LIVE_BACKEND', raising=False)
+    config = {'LIVE_EVENTS_PATH': str(tmp_path / 'live.db'), 'JOBS_PATH': str(tmp_path / 'jobs.db')}
+    monkeypatch.setenv('WEB_CONCURRENCY', '1')
+    assert create_app(config).config['LIVE_BACKEND'] == 'memory'
+    monkeypatch.setenv('WEB_CONCURRENCY', '3')
+    assert create_app(config).config['LIVE_BACKEND'] == 'sqlite'
+
+
+def test_streams_beyond_the_limit_are_turned_away(app, client, make_tournament):
+    url = f'/api/v1/tournaments/{make_tournament(groups=1, per_group=2)}/events'
+    app.config['LIVE_STREAM_SECONDS'] = 0.1
+    app.extensions['live'] = live.Broker(max_streams=1)
+    first = client.get(url, buffered=False)
+    busy = client.get(url)
+    assert busy.status_code == 503 and busy.headers['Retry-After']
+    first.close()
+    assert client.get(url).status_code == 200
+
+
+def test_a_failed_publish_does_not_fail_the_saved_result(app, client, make_tournament, monkeypatch):
+    def publish_fails(tournament_id, version):
+        raise sqlite3.OperationalError('database is locked')
+
+    monkeypatch.setattr(live, 'publish_score', publish_fails)
+    tournament_id = make_tournament(groups=1, per_group=4)
+    match_ids = db.session.execute(db.select(Match.id).where(Match.tournament_id == tournament_id)).scalars().all()
+    first, second = match_ids[:2]
+    assert client.post(f'/match/{first}/update', data={'home_score': 1, 'away_score': 0}).status_code == 302
+    response = client.post(f'/tournament/{tournament_id}/results',
+                           json=[{'match_id': second, 'home_score': 2, 'away_score': 2}])
+    assert response.status_code == 200 and response.get_json()['applied'] == 1
+    db.session.expire_all()
+    assert [db.session.get(Match, match_id).status for match_id in (first, second)] == ['completed'] * 2
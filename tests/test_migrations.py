@@ -0,0 +1,21 @@
+"""Schema versions recorded by migrations.upgrade()."""
+
+import pytest
+from sqlalchemy import text
+
+import migrations
+from models import db
+
+
+def test_upgrade_is_a_no_op_at_the_latest_version(app):
+    assert migrations.upgrade() == (migrations.latest_version(), [])
+
+
+def test_upgrade_refuses_a_newer_schema(app):
+    newer = migrations.latest_version() + 1
+    with db.engine.begin() as conn:
+        conn.execute(text('INSERT INTO schema_version (version) VALUES (:version)'), {'version': newer})
+    with pytest.raises(RuntimeError, match=f'version {newer}'):
+        migrations.upgrade()
+    with db.engine.connect() as conn:
+        assert migrations.current_version(conn) == newer
@@ -0,0 +1,30 @@
+"""Page query counts stay flat as tournaments are added and grow."""
+
+import pytest
+
+
+def get(client, url):
+    def call():
+        response = client.get(url)
+        assert response.status_code == 200, url
+    return call
+
+
+def test_home_page_queries_do_not_grow_with_tournaments(client, make_tournament, count_queries):
+    counts = []
+    for added in (3, 9):  # 3 tournaments, then 12
+        for _ in range(added):
+            make_tournament(groups=2, per_group=3)
+        client.get('/')
+        counts.append((count_queries(get(client, '/')), count_queries(get(client, '/api/v1/tournaments'))))
+    assert counts[0] == counts[1]
+
+
+@pytest.mark.parametrize('path', ['', '/groups'])
+def test_tournament_page_queries_do_not_grow_with_teams(client, make_tournament, count_queries, path):
+    counts = []
+    for groups, per_group in ((2, 3), (8, 6)):
+        url = f'/tournament/{make_tournament(groups, per_group)}{path}'
+        client.get(url)  # Warms up the forecast the page is served from
+        counts.append(count_queries(get(client, url)))
+    assert counts[0] == counts[1]
@@ -0,0 +1,49 @@
+"""Tie-breakers of ranking.compute() for three teams level on points."""
+
+import pytest
+
+import ranking
+
+A, C, B, D = range(4)  # Team numbers are also the entry order: C is entered before B
+
+# A, B and C each beat one of the others (A and C winning away, B at home),
+# ending level on the mini table except A's goals; B beat C
+MATCHES = [(B, A, 1, 2), (C, A, 2, 1), (B, C, 1, 0),
+           (A, D, 1, 0), (B, D, 2, 1), (C, D, 2, 1)]
+
+
+@pytest.fixture(params=['numpy', 'array'])
+def backend(request, monkeypatch):
+    if request.param == 'array':
+        monkeypatch.setattr(ranking, '_numpy', False)  # False: get_numpy() reports it missing
+    elif ranking.get_numpy() is None:
+        pytest.skip('NumPy is not installed')
+
+
+def rank(rules, fair_play=None, stats=None):
+    home, away, home_goals, away_goals = (list(column) for column in zip(*MATCHES))
+    return ranking.compute([0] * 4, home, away, home_goals, away_goals, fair_play=fair_play,
+                           rules=rules, stats=stats).order
+
+
+def test_the_three_teams_are_level_overall(backend):
+    stats = ranking.compute([0] * 4, *(list(column) for column in zip(*MATCHES))).stats
+    assert [stats[field][:3] for field in ('points', 'goal_difference', 'goals_for')] == [[6] * 3, [1] * 3, [4] * 3]
+
+
+def test_uefa_reapplies_head_to_head_to_the_teams_left_level(backend):
+    # A leads the three-team mini table on goals; B and C are level on it, and B won their match
+    assert rank('uefa') == [A, B, C, D]
+
+
+def test_fifa_moves_on_to_fair_play_for_the_teams_left_level(backend):
+    # No reapplication: B and C go to fair play, and then to the entry order
+    assert rank('fifa') == [A, C, B, D]
+    assert rank('fifa', fair_play=[0, 2, 0, 0]) == [A, B, C, D]
+
+
+@pytest.mark.parametrize('rules', ['fifa', 'uefa'])
+def test_stored_totals_break_ties_the_same_way(backend, rules):
+    stats = ranking.compute([0] * 4, *(list(column) for column in zip(*MATCHES))).stats
+    stored = {field: stats[field] for field in ranking.STORED_FIELDS}
+    assert rank(rules, stats=stored) == rank(rules)
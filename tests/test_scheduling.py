@@ -0,0 +1,45 @@
+"""Round-robin fixtures and the group-stage schedule."""
+
+from datetime import date
+from itertools import combinations
+
+import pytest
+
+import bulk
+import scheduling
+from models import db, Match, Tournament
+
+
+@pytest.mark.parametrize('count', [2, 3, 4, 5, 7, 8])
+def test_every_pair_meets_exactly_once(count):
+    rounds = scheduling.circle_rounds(range(count))
+    pairs = [frozenset(pair) for round_pairs in rounds for pair in round_pairs]
+    assert sorted(pairs, key=sorted) == sorted(map(frozenset, combinations(range(count), 2)), key=sorted)
+    assert len(rounds) == (count if count % 2 else count - 1)
+    for round_pairs in rounds:
+        teams = [team for pair in round_pairs for team in pair]
+        assert len(teams) == len(set(teams))  # nobody plays twice in a round
+        assert len(round_pairs) == count // 2  # with an odd count exactly one team sits out
+
+
+def test_home_and_away_are_balanced():
+    rounds = scheduling.circle_rounds(range(6))
+    homes = [home for round_pairs in rounds for home, _ in round_pairs]
+    assert all(2 <= homes.count(team) <= 3 for team in range(6))
+
+
+def test_schedule_that_does_not_fit_is_refused(app):
+    created = bulk.create_tournament('Short', date(2024, 6, 1), date(2024, 6, 1),
+                                     [f'Team {i}' for i in range(8)], 1)
+    tournament = db.session.get(Tournament, created['tournament_id'])
+    # 28 matches, but one day holds 7 kickoffs on one pitch
+    with pytest.raises(ValueError, match='Only 7 of 28 matches fit'):
+        scheduling.generate_round_robin_schedule(tournament, venues=1)
+    assert db.session.query(Match).filter_by(tournament_id=tournament.id).count() == 0
+
+
+def test_schedule_is_generated_once(app, make_tournament):
+    tournament = db.session.get(Tournament, make_tournament(groups=2, per_group=3))
+    assert db.session.query(Match).filter_by(tournament_id=tournament.id).count() == 6
+    with pytest.raises(ValueError, match='already been generated'):
+        scheduling.generate_round_robin_schedule(tournament)
@@ -0,0 +1,40 @@
+"""The tournament page snapshot is stored by writers and only read by page views."""
+
+from sqlalchemy import event, select
+
+import cache
+from models import db, Tournament, TournamentSnapshot
+
+
+def stored_version(tournament_id):
+    return db.session.scalar(select(TournamentSnapshot.version)
+                             .where(TournamentSnapshot.tournament_id == tournament_id))
+
+
+def test_a_write_stores_the_snapshot_after_its_commit(app, make_tournament):
+    tournament_id = make_tournament(groups=2, per_group=3)
+    version = cache.bump(tournament_id)
+    assert stored_version(tournament_id) != version
+    db.session.commit()
+    assert stored_version(tournament_id) == version == db.session.get(Tournament, tournament_id).version
+
+
+def test_viewing_the_tournament_page_writes_nothing(app, client, make_tournament):
+    tournament_id = make_tournament(groups=2, per_group=3)
+    cache.bump(tournament_id)
+    db.session.rollback()  # no snapshot is stored for the current version
+
+    writes = []
+
+    def record(conn, cursor, statement, *args):
+        if not statement.lstrip().upper().startswith(('SELECT', 'PRAGMA')):
+            writes.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(f'/tournament/{tournament_id}')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    assert b'Team 5' in response.data
+    assert writes == []
@@ -0,0 +1,14 @@
+"""What importing the application loads up front."""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_lazy_modules_are_not_imported_with_the_app():
+    code = 'import sys, app; print(",".join(m for m in app.LAZY_MODULES if m in sys.modules))'
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    assert output.strip() == ''
@@ -0,0 +1,78 @@
+"""Match placement constraints: pitches, rest and blackouts."""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import scheduling
+import timetable
+
+START, END = date(2024, 6, 1), date(2024, 6, 10)
+
+
+def fixtures(groups=3, per_group=6):
+    """Round-ordered fixtures for ``groups`` round robins, as scheduling builds them."""
+    teams = {f'Group {g}': [(g * 100 + i, f'Team {g}.{i}') for i in range(per_group)] for g in range(groups)}
+    return scheduling.round_order({name: scheduling.circle_rounds(members) for name, members in teams.items()})
+
+
+def kickoffs_by_team(placements):
+    by_team = {}
+    for placement in placements:
+        for team in (placement.fixture.home, placement.fixture.away):
+            by_team.setdefault(team, []).append(placement.kickoff)
+    return {team: sorted(kickoffs) for team, kickoffs in by_team.items()}
+
+
+@pytest.mark.parametrize('improve', [False, True])
+def test_no_team_plays_twice_in_a_slot(improve):
+    result = timetable.plan(fixtures(), START, END, venues=3, improve=improve)
+    assert not result.unscheduled
+    slots = {}
+    for placement in result.placements:
+        slots.setdefault(placement.kickoff, []).append(placement)
+    for placements in slots.values():
+        assert sorted(p.venue for p in placements) == list(range(len(placements)))  # at most 3 pitches
+        teams = [team for p in placements for team in (p.fixture.home, p.fixture.away)]
+        assert len(teams) == len(set(teams))
+
+
+@pytest.mark.parametrize('improve', [False, True])
+def test_rest_between_a_teams_matches(improve):
+    rest = 120
+    result = timetable.plan(fixtures(), START, END, venues=3, rest_minutes=rest, improve=improve)
+    assert not result.unscheduled
+    gap = timedelta(minutes=timetable.DEFAULT_MATCH_MINUTES + rest)
+    for kickoffs in kickoffs_by_team(result.placements).values():
+        assert all(b - a >= gap for a, b in zip(kickoffs, kickoffs[1:]))
+    assert result.metrics['min_rest_minutes'] >= rest
+
+
+@pytest.mark.parametrize('improve', [False, True])
+def test_no_kickoff_touches_a_blackout(improve):
+    blackouts = [timetable.parse_blackout('2024-06-02'),
+                 timetable.parse_blackout('2024-06-01T12:00/2024-06-01T15:00')]
+    result = timetable.plan(fixtures(), START, END, venues=2, blackouts=blackouts, improve=improve)
+    assert not result.unscheduled
+    length = timedelta(minutes=timetable.DEFAULT_MATCH_MINUTES)
+    for placement in result.placements:
+        assert not any(placement.kickoff < end and placement.kickoff + length > start for start, end in blackouts)
+    assert any(p.kickoff.date() == START for p in result.placements)
+
+
+def test_a_window_too_small_reports_the_leftovers():
+    all_fixtures = fixtures(groups=2, per_group=8)
+    result = timetable.plan(all_fixtures, START, START, venues=2)
+    assert len(result.placements) == 14  # 7 kickoffs on 2 pitches
+    assert len(result.placements) + len(result.unscheduled) == len(all_fixtures)
+    assert result.metrics['unscheduled'] == len(all_fixtures) - 14
+
+
+def test_kickoffs_and_blackout_parsing():
+    day = timetable.kickoff_times(START, START)
+    assert day[0] == datetime(2024, 6, 1, 10, 0) and day[-1] == datetime(2024, 6, 1, 19, 0)
+    assert len(day) == 7
+    with pytest.raises(ValueError, match='ends before it starts'):
+        timetable.parse_blackout('2024-06-01T15:00/2024-06-01T12:00')
+    with pytest.raises(ValueError, match='venue'):
+        timetable.plan(fixtures(), START, END, venues=0)
@@ -0,0 +1,241 @@
+"""
+Constraint-based match placement for the Tournament Manager application.
+
+plan() fits a list of fixtures into a tournament's date window, honouring
+the number of pitches that can be used at once, a minimum rest time between
+a team's matches and blackout periods in which no match may be played.
+
+Placement is greedy: fixtures are taken in order (round by round) and each
+goes into the earliest kickoff slot with a free pitch at which both teams
+are rested. An optional local-search pass then moves fixtures from late
+slots into earlier gaps in the teams' schedules, which compacts the event.
+All times are handled as integer minutes from the start of the window.
+"""
+
+from bisect import bisect_left, insort
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+Fixture = namedtuple('Fixture', 'key home away')
+Placement = namedtuple('Placement', 'fixture kickoff venue')
+Plan = namedtuple('Plan', 'placements unscheduled metrics')
+
+DEFAULT_DAY_START = time(10, 0)
+DEFAULT_DAY_END = time(20, 0)
+DEFAULT_MATCH_MINUTES = 90
+
+
+def parse_blackout(text):
+    """Parse a blackout period.
+
+    Accepts a single date (``2024-06-03``, the whole day) or a range of
+    ``YYYY-MM-DDTHH:MM`` datetimes separated by ``/``. Returns a
+    (start, end) tuple of datetimes.
+    """
+    text = text.strip()
+    if '/' not in text:
+        day = datetime.strptime(text, '%Y-%m-%d')
+        return day, day + timedelta(days=1)
+    start, end = (datetime.strptime(part.strip(), '%Y-%m-%dT%H:%M') for part in text.split('/', 1))
+    if end <= start:
+        raise ValueError(f'Blackout ends before it starts: {text}')
+    return start, end
+
+
+def kickoff_times(start_date, end_date, day_start=DEFAULT_DAY_START, day_end=DEFAULT_DAY_END,
+                  match_minutes=DEFAULT_MATCH_MINUTES, blackouts=()):
+    """Return every kickoff datetime in the window that doesn't touch a blackout.
+
+    Kickoffs are match_minutes apart from day_start, and the last one of a
+    day is the last that starts before day_end.
+    """
+    length = timedelta(minutes=match_minutes)
+    kickoffs = []
+    day = start_date
+    while day <= end_date:
+        current = datetime.combine(day, day_start)
+        while current.date() == day and current.time() < day_end:
+            if not any(current < end and current + length > start for start, end in blackouts):
+                kickoffs.append(current)
+            current += length
+        day += timedelta(days=1)
+    return kickoffs
+
+
+class _TeamCalendar:
+    """Sorted kickoff minutes per team, with rest checks."""
+
+    def __init__(self, span):
+        self.span = span  # match length plus required rest
+        self.kickoffs = {}
+
+    def add(self, team, minute):
+        insort(self.kickoffs.setdefault(team, []), minute)
+
+    def remove(self, team, minute):
+        games = self.kickoffs[team]
+        del games[bisect_left(games, minute)]
+
+    def ready(self, team):
+        """Earliest minute after the team's last game at which it may play again."""
+        games = self.kickoffs.get(team)
+        return games[-1] + self.span if games else 0
+
+    def free_intervals(self, team):
+        """Return [(lo, hi)] minute intervals in which a kickoff keeps the rest rule."""
+        games = self.kickoffs.get(team, [])
+        intervals = []
+        lo = 0
+        for minute in games:
+            if minute - self.span >= lo:
+                intervals.append((lo, minute - self.span))
+            lo = minute + self.span
+        intervals.append((lo, float('inf')))
+        return intervals
+
+
+def _intersect(a, b):
+    """Intersect two sorted lists of closed intervals."""
+    result = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        lo = max(a[i][0], b[j][0])
+        hi = min(a[i][1], b[j][1])
+        if lo <= hi:
+            result.append((lo, hi))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def plan(fixtures, start_date, end_date, venues=1, rest_minutes=0, blackouts=(),
+         day_start=DEFAULT_DAY_START, day_end=DEFAULT_DAY_END,
+         match_minutes=DEFAULT_MATCH_MINUTES, improve=False, max_passes=3):
+    """Place fixtures into the window; returns a Plan.
+
+    ``fixtures`` is a sequence of Fixture tuples in priority order (earlier
+    rounds first). Fixtures that cannot be placed are returned in
+    ``Plan.unscheduled``; ``Plan.metrics`` reports utilisation figures.
+    """
+    if venues < 1:
+        raise ValueError('At least one venue is required')
+
+    kickoff_datetimes = kickoff_times(start_date, end_date, day_start, day_end,
+                                      match_minutes, blackouts)
+    origin = datetime.combine(start_date, time(0, 0))
+    minutes = [int((k - origin).total_seconds() // 60) for k in kickoff_datetimes]
+
+    capacity = [venues] * len(minutes)
+    open_slots = list(range(len(minutes)))  # sorted indices of slots with a free pitch
+    calendar = _TeamCalendar(match_minutes + rest_minutes)
+    slot_of = {}
+    unscheduled = []
+
+    def take(slot, fixture):
+        capacity[slot] -= 1
+        if capacity[slot] == 0:
+            del open_slots[bisect_left(open_slots, slot)]
+        slot_of[fixture] = slot
+        calendar.add(fixture.home, minutes[slot])
+        calendar.add(fixture.away, minutes[slot])
+
+    def release(fixture):
+        slot = slot_of.pop(fixture)
+        if capacity[slot] == 0:
+            insort(open_slots, slot)
+        capacity[slot] += 1
+        calendar.remove(fixture.home, minutes[slot])
+        calendar.remove(fixture.away, minutes[slot])
+
+    # Greedy pass: earliest open slot at which both teams are rested
+    for fixture in fixtures:
+        earliest = max(calendar.ready(fixture.home), calendar.ready(fixture.away))
+        pos = bisect_left(open_slots, bisect_left(minutes, earliest))
+        if pos == len(open_slots):
+            unscheduled.append(fixture)
+            continue
+        take(open_slots[pos], fixture)
+
+    def earliest_fit(fixture, before):
+        """Earliest open slot before ``before`` that fits both teams' calendars."""
+        for lo, hi in _intersect(calendar.free_intervals(fixture.home),
+                                 calendar.free_intervals(fixture.away)):
+            pos = bisect_left(open_slots, bisect_left(minutes, lo))
+            if pos == len(open_slots) or open_slots[pos] >= before:
+                return None
+            if minutes[open_slots[pos]] <= hi:
+                return open_slots[pos]
+        return None
+
+    # Local search: pull late fixtures into earlier gaps, then retry leftovers
+    moves = 0
+    if improve:
+        for _ in range(max_passes):
+            moved_this_pass = 0
+            for fixture in sorted(slot_of, key=slot_of.get, reverse=True):
+                current = slot_of[fixture]
+                release(fixture)
+                best = earliest_fit(fixture, current)
+                take(current if best is None else best, fixture)
+                if best is not None:
+                    moved_this_pass += 1
+            moves += moved_this_pass
+            if not moved_this_pass:
+                break
+
+        still_unscheduled = []
+        for fixture in unscheduled:
+            slot = earliest_fit(fixture, len(minutes))
+            if slot is None:
+                still_unscheduled.append(fixture)
+            else:
+                take(slot, fixture)
+        unscheduled = still_unscheduled
+
+    # Assign pitches in fixture order within each slot
+    used = {}
+    placements = []
+    for fixture in sorted(slot_of, key=slot_of.get):
+        slot = slot_of[fixture]
+        venue = used.get(slot, 0)
+        used[slot] = venue + 1
+        placements.append(Placement(fixture, kickoff_datetimes[slot], venue))
+
+    metrics = _metrics(placements, unscheduled, kickoff_datetimes, venues, calendar, match_minutes)
+    metrics['improvement_moves'] = moves
+    return Plan(placements, unscheduled, metrics)
+
+
+def _metrics(placements, unscheduled, kickoff_datetimes, venues, calendar, match_minutes):
+    metrics = {
+        'fixtures': len(placements) + len(unscheduled),
+        'scheduled': len(placements),
+        'unscheduled': len(unscheduled),
+        'venues': venues,
+        'window_slots': len(kickoff_datetimes) * venues,
+    }
+    metrics['window_utilisation'] = (round(len(placements) / metrics['window_slots'], 4)
+                                     if metrics['window_slots'] else 0.0)
+    if not placements:
+        return metrics
+
+    first = placements[0].kickoff
+    last = placements[-1].kickoff
+    used_days = {p.kickoff.date() for p in placements}
+    slots_in_span = sum(1 for k in kickoff_datetimes if first.date() <= k.date() <= last.date())
+
+    gaps = []
+    for games in calendar.kickoffs.values():
+        gaps.extend(b - a - match_minutes for a, b in zip(games, games[1:]))
+
+    metrics.update({
+        'first_kickoff': first.isoformat(),
+        'last_kickoff': last.isoformat(),
+        'days_used': len(used_days),
+        'pitch_utilisation': round(len(placements) / (slots_in_span * venues), 4),
+        'min_rest_minutes': min(gaps) if gaps else None,
+        'avg_rest_minutes': round(sum(gaps) / len(gaps), 1) if gaps else None,
+    })
+    return metrics
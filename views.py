@@ -0,0 +1,474 @@
+"""
+Page routes, background job tasks and CLI commands of the Tournament Manager application.
+
+Registered by app.create_app() as the ``main`` blueprint, so its endpoints
+are named ``main.home``, ``main.view_tournament`` and so on. Modules that
+only some requests use (bulk, draw, scheduling, timetable, bracket,
+results) are imported inside the views and tasks that need them, which
+keeps starting a process or running a CLI command cheap; app.warm_up()
+imports them ahead of time in a preloading gunicorn master.
+"""
+
+from flask import Blueprint, current_app, render_template, request, jsonify, redirect, url_for, flash, abort
+from datetime import datetime
+import click
+from models import db, Tournament, Match
+import standings
+import queries
+import cache
+import live
+import snapshot
+import jobs
+import forecast
+
+# cli_group=None puts the commands at the top level: ``flask rebuild-standings``
+bp = Blueprint('main', __name__, cli_group=None)
+
+# Custom template filters
+@bp.app_template_filter('datetime')
+def format_datetime(value, format='%Y-%m-%d'):
+    """Format a datetime object to a specified format"""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        try:
+            value = datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            return value
+    return value.strftime(format)
+
+# Context processor for templates
+@bp.app_context_processor
+def inject_now():
+    return {'now': datetime.utcnow()}
+
+# Routes
+@bp.route('/')
+@cache.cached_page('home', cache.home_token)
+def home():
+    try:
+        filters = queries.listing_filters(request.args)
+        page = queries.tournament_page(**filters)
+    except ValueError:
+        flash('Invalid search filters or page link', 'error')
+        return redirect(url_for('main.home'))
+    # Counted once per change to any tournament, not per listing page and filter
+    totals = cache.cached_value('totals', cache.home_token()[0], queries.dashboard_totals)
+    
+    # Filters without the cursor, for the next-page and first-page links
+    args = {key: value for key, value in request.args.items() if key != 'after' and value}
+    return render_template('index.html', tournaments=page.items, next_cursor=page.next_cursor,
+                           filters=filters, args=args, totals=totals)
+
+@bp.route('/tournament/new', methods=['GET'])
+def new_tournament():
+    return render_template('new_tournament.html')
+
+@bp.route('/tournament/create', methods=['POST'])
+def create_tournament():
+    import bulk
+    
+    try:
+        all_teams = [name.strip() for name in request.form['all_teams'].split('\n') if name.strip()]
+        num_groups = int(request.form.get('num_groups', 1))
+        
+        if len(all_teams) < num_groups:
+            flash('You need at least as many teams as groups', 'error')
+            return redirect(url_for('main.new_tournament'))
+        
+        # Groups, teams and standings rows are inserted in batches
+        created = bulk.create_tournament(
+            name=request.form['name'],
+            start_date=datetime.strptime(request.form['start_date'], '%Y-%m-%d').date(),
+            end_date=datetime.strptime(request.form['end_date'], '%Y-%m-%d').date(),
+            team_names=all_teams,
+            num_groups=num_groups,
+        )
+        db.session.commit()
+        
+        # Redirect to the tournament view page instead of view_groups
+        return redirect(url_for('main.view_tournament', tournament_id=created['tournament_id']))
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error creating tournament: {str(e)}', 'error')
+        return redirect(url_for('main.new_tournament'))
+
+@bp.route('/tournament/import', methods=['POST'])
+def import_tournament():
+    """Create a tournament from a large roster sent as JSON or a CSV upload.
+    
+    JSON bodies carry name, start_date, end_date, num_groups and a list of
+    team names in ``teams``. Form posts carry the same fields with the roster
+    as a CSV file in ``file`` (one team per row). The tournament is created
+    by a background job: the response is 202 with the job's status URL,
+    whose result names the tournament once it is done (201 with the
+    tournament straight away when JOB_BACKEND is inline).
+    """
+    import bulk
+    
+    try:
+        if request.is_json:
+            data = request.get_json()
+            team_names = [str(name).strip() for name in data.get('teams', []) if str(name).strip()]
+        else:
+            data = request.form
+            upload = request.files.get('file')
+            if upload is None:
+                return jsonify({'error': 'No CSV file uploaded'}), 400
+            team_names = bulk.parse_team_csv(upload.read().decode('utf-8-sig'))
+        
+        params = {
+            'name': data['name'],
+            'start_date': datetime.strptime(data['start_date'], '%Y-%m-%d').date().isoformat(),
+            'end_date': datetime.strptime(data['end_date'], '%Y-%m-%d').date().isoformat(),
+            'team_names': team_names,
+            'num_groups': int(data.get('num_groups', 1)),
+        }
+    except KeyError as e:
+        return jsonify({'error': f'Missing field: {e.args[0]}'}), 400
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    job = jobs.submit('import', params)
+    if job['status'] == 'failed':
+        return jsonify({'error': job['error']}), 400
+    if job['status'] == 'succeeded':
+        created = dict(job['result'], job_id=job['id'])
+        created['url'] = url_for('main.view_tournament', tournament_id=created['tournament_id'])
+        return jsonify(created), 201
+    return jsonify({'job_id': job['id'], 'status': job['status'],
+                    'url': url_for('jobs.job_status', job_id=job['id'])}), 202
+
+@jobs.task('import')
+def import_task(progress, name, start_date, end_date, team_names, num_groups):
+    """Create a tournament from an imported roster."""
+    import bulk
+    
+    # Groups, teams and standings rows are inserted in batches
+    created = bulk.create_tournament(
+        name=name,
+        start_date=datetime.strptime(start_date, '%Y-%m-%d').date(),
+        end_date=datetime.strptime(end_date, '%Y-%m-%d').date(),
+        team_names=team_names,
+        num_groups=num_groups,
+    )
+    db.session.commit()
+    return created
+
+@bp.route('/tournament/<int:tournament_id>/groups')
+@cache.cached_page('groups', forecast.page_token)
+def view_groups(tournament_id):
+    """View the groups and teams for a tournament, with each team's chance to qualify."""
+    tournament = queries.tournament_with_groups(tournament_id)
+    groups = tournament.groups
+    
+    # The forecast is simulated by a background job whenever the results have changed;
+    # one job per version, so views while it runs (or after it failed) only read its state
+    chances = forecast.current(tournament_id)
+    job = None
+    if chances is None and forecast.has_fixtures(tournament_id):
+        params = {'tournament_id': tournament_id, 'version': tournament.version}
+        job = jobs.get_queue().latest('forecast', params)
+        if job is None:
+            job = jobs.submit('forecast', params, tournament_id)
+        if job['status'] == 'succeeded':
+            chances = forecast.current(tournament_id)
+    
+    return render_template('view_groups.html', tournament=tournament, groups=groups,
+                           forecast=chances, forecast_job=job)
+
+@jobs.task('forecast')
+def forecast_task(progress, tournament_id, version):
+    """Simulate the rest of the group stage for the teams' chances to qualify."""
+    result = forecast.refresh(tournament_id, progress=progress)
+    db.session.commit()
+    return {'tournament_id': tournament_id, 'version': result.version, 'iterations': result.iterations}
+
+def get_tournament(tournament_id):
+    """Return a tournament for a job, raising ValueError if it no longer exists."""
+    tournament = db.session.get(Tournament, tournament_id)
+    if tournament is None:
+        raise ValueError(f'Tournament {tournament_id} not found')
+    return tournament
+
+def flash_job(job, action, done):
+    """Flash how a submitted job went: ``done(result)`` once it succeeded, otherwise its error or that it is running."""
+    if job['status'] == 'succeeded':
+        flash(done(job['result']), 'success')
+    elif job['status'] == 'failed':
+        flash(f"Error {action}: {job['error']}", 'error')
+    else:
+        flash(f"{action.capitalize()} in the background (job {job['id']}); "
+              f"the page will refresh when it's done.", 'success')
+
+@bp.route('/tournament/<int:tournament_id>/shuffle')
+def shuffle_groups(tournament_id):
+    """Randomly reassign teams to groups.
+    
+    Teams are moved in place, so their IDs and match history are kept.
+    Pass ``?mode=pots`` for a seeded-pot draw that spreads the top seeds
+    (earliest entered teams) across the groups.
+    """
+    import draw
+    
+    tournament = Tournament.query.get_or_404(tournament_id)
+    mode = request.args.get('mode', 'random')
+    if mode not in draw.DRAW_MODES:
+        flash(f"Error shuffling groups: Unknown draw mode '{mode}'", 'error')
+        return redirect(url_for('main.view_tournament', tournament_id=tournament_id))
+    
+    job = jobs.submit('shuffle', {'tournament_id': tournament.id, 'mode': mode}, tournament.id)
+    flash_job(job, 'shuffling groups', lambda result: 'Groups have been shuffled successfully!')
+    return redirect(url_for('main.view_tournament', tournament_id=tournament_id))
+
+@jobs.task('shuffle')
+def shuffle_task(progress, tournament_id, mode):
+    """Shuffle a tournament's teams between its groups."""
+    import draw
+    
+    tournament = get_tournament(tournament_id)
+    draw.shuffle_teams(tournament, mode=mode, seed=current_app.config['SHUFFLE_SEED'])
+    
+    # Teams changed groups, so the standings must be recomputed
+    progress(0.5, 'Recomputing standings')
+    standings.rebuild_standings(tournament)
+    version = cache.bump(tournament.id)
+    
+    db.session.commit()
+    jobs.after_commit(live.publish_reload, tournament.id, version)
+    return {'tournament_id': tournament.id}
+
+def generate_round_robin_schedule(tournament_id, venues=None, rest_minutes=None, blackouts=(), improve=False):
+    """Generate a round-robin schedule for the tournament."""
+    import scheduling
+    
+    tournament = get_tournament(tournament_id)
+    if venues is None:
+        venues = current_app.config['SCHEDULE_VENUES']
+    if rest_minutes is None:
+        rest_minutes = current_app.config['SCHEDULE_REST_MINUTES']
+    
+    metrics = scheduling.generate_round_robin_schedule(
+        tournament, venues=venues, rest_minutes=rest_minutes, blackouts=blackouts, improve=improve)
+    version = cache.bump(tournament.id)
+    db.session.commit()
+    jobs.after_commit(live.publish_reload, tournament.id, version)
+    return metrics
+
+@jobs.task('schedule')
+def schedule_task(progress, tournament_id, venues, rest_minutes, blackouts, improve):
+    """Generate the group-stage schedule; ``blackouts`` are lines for timetable.parse_blackout()."""
+    import timetable
+    
+    metrics = generate_round_robin_schedule(
+        tournament_id, venues=venues, rest_minutes=rest_minutes,
+        blackouts=[timetable.parse_blackout(line) for line in blackouts], improve=improve)
+    return dict(metrics, tournament_id=tournament_id, venues=venues)
+
+@bp.route('/tournament/<int:tournament_id>/schedule', methods=['POST'])
+def generate_schedule(tournament_id):
+    import timetable
+    
+    try:
+        venues = int(request.form.get('venues') or current_app.config['SCHEDULE_VENUES'])
+        rest_minutes = int(request.form.get('rest_minutes') or current_app.config['SCHEDULE_REST_MINUTES'])
+        blackouts = [line.strip() for line in request.form.get('blackouts', '').splitlines() if line.strip()]
+        for line in blackouts:
+            timetable.parse_blackout(line)
+    except ValueError as e:
+        flash(f'Error generating schedule: {str(e)}', 'error')
+        return redirect(url_for('main.view_tournament', tournament_id=tournament_id))
+    
+    job = jobs.submit('schedule', {'tournament_id': tournament_id, 'venues': venues, 'rest_minutes': rest_minutes,
+                                   'blackouts': blackouts, 'improve': bool(request.form.get('improve'))},
+                      tournament_id)
+    flash_job(job, 'generating schedule',
+              lambda metrics: f"Generated {metrics['scheduled']} group matches across {metrics['venues']} venue(s) "
+                              f"over {metrics.get('days_used', 0)} day(s).")
+    return redirect(url_for('main.view_tournament', tournament_id=tournament_id))
+
+@bp.route('/tournament/<int:tournament_id>')
+@cache.cached_page('tournament', cache.tournament_token)
+def view_tournament(tournament_id):
+    # Groups and teams, stored by the last write (see snapshot.py)
+    page = snapshot.load(tournament_id)
+    if page is None:
+        abort(404)
+    
+    return render_template('view_tournament.html', tournament=page.tournament, groups=page.groups)
+
+@bp.route('/match/<int:match_id>/update', methods=['POST'])
+def update_match(match_id):
+    import bracket
+    
+    match = Match.query.get_or_404(match_id)
+    
+    try:
+        home_score = int(request.form.get('home_score', ''))
+        away_score = int(request.form.get('away_score', ''))
+    except (ValueError, TypeError):
+        flash('Invalid score format', 'error')
+        return redirect(url_for('main.view_tournament', tournament_id=match.tournament_id))
+    
+    try:
+        if match.home_team_id is None or match.away_team_id is None:
+            raise ValueError('Both teams must be known before entering a score')
+        
+        previous = standings.match_state(match)
+        match.home_score = home_score
+        match.away_score = away_score
+        match.status = 'completed'
+        standings.apply_match_change(match, previous)
+        
+        # Knockout winners move straight into their next-round match
+        if match.bracket_slot is not None and bracket.advance_winner(match):
+            match.tournament.status = 'completed'
+        
+        version = cache.bump(match.tournament_id)
+        db.session.commit()
+        
+        # Push the new score and standings to live viewers
+        jobs.after_commit(live.publish_score, match.tournament_id, version)
+        flash('Match updated successfully!', 'success')
+    except ValueError as e:
+        db.session.rollback()
+        flash(str(e), 'error')
+    
+    return redirect(url_for('main.view_tournament', tournament_id=match.tournament_id))
+
+@bp.route('/tournament/<int:tournament_id>/results', methods=['POST'])
+def enter_results(tournament_id):
+    """Apply a batch of results in one transaction.
+    
+    Accepts a JSON body (a list of {match_id, home_score, away_score}, or
+    an object with that list in ``results``), a CSV upload in ``file``, or
+    CSV text in the ``results`` form field. JSON and upload requests get a
+    JSON report with per-row errors; form posts are redirected back to the
+    tournament with a summary message.
+    """
+    import results
+    
+    tournament = Tournament.query.get_or_404(tournament_id)
+    wants_json = request.is_json or 'file' in request.files
+    
+    if request.is_json:
+        data = request.get_json()
+        rows = data.get('results', []) if isinstance(data, dict) else data
+    elif 'file' in request.files:
+        rows = results.parse_results_csv(request.files['file'].read().decode('utf-8-sig'))
+    else:
+        rows = results.parse_results_csv(request.form.get('results', ''))
+    
+    try:
+        report = results.apply_results(tournament, rows if isinstance(rows, list) else [])
+        version = None
+        if report['applied']:
+            version = cache.bump(tournament.id)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        if wants_json:
+            return jsonify({'error': str(e)}), 400
+        flash(f'Error entering results: {str(e)}', 'error')
+        return redirect(url_for('main.view_tournament', tournament_id=tournament_id))
+    
+    if version is not None:
+        jobs.after_commit(live.publish_score, tournament.id, version)
+    
+    if wants_json:
+        report['version'] = version
+        return jsonify(report), 200 if report['applied'] or not report['errors'] else 400
+    
+    flash(f"{report['applied']} result(s) saved.", 'success' if report['applied'] else 'error')
+    # Only the first few errors fit in the session cookie
+    for error in report['errors'][:10]:
+        flash(f"Row {error['row']} (match {error['match_id']}): {error['error']}", 'error')
+    if len(report['errors']) > 10:
+        flash(f"...and {len(report['errors']) - 10} more row(s) with errors.", 'error')
+    return redirect(url_for('main.view_tournament', tournament_id=tournament_id))
+
+@bp.route('/tournament/<int:tournament_id>/advance', methods=['POST'])
+def advance_tournament(tournament_id):
+    tournament = Tournament.query.get_or_404(tournament_id)
+    
+    if tournament.status == 'group':
+        try:
+            per_group = int(request.form.get('qualifiers') or current_app.config['KNOCKOUT_QUALIFIERS'])
+        except ValueError as e:
+            flash(f'Error advancing tournament: {str(e)}', 'error')
+            return redirect(url_for('main.view_tournament', tournament_id=tournament_id))
+        
+        job = jobs.submit('advance', {'tournament_id': tournament.id, 'per_group': per_group}, tournament.id)
+        flash_job(job, 'advancing tournament',
+                  lambda result: f"Tournament advanced to knockout stage! {result['created']} knockout matches created.")
+    
+    return redirect(url_for('main.view_tournament', tournament_id=tournament_id))
+
+@jobs.task('advance')
+def advance_task(progress, tournament_id, per_group):
+    """Move a tournament from the group stage to the knockout stage."""
+    import bracket
+    
+    tournament = get_tournament(tournament_id)
+    if tournament.status != 'group':
+        raise ValueError('The tournament is no longer in the group stage')
+    
+    # Seed the bracket from the group standings and create every knockout match
+    created = bracket.create_knockout_matches(
+        tournament, per_group=per_group, venues=current_app.config['SCHEDULE_VENUES'])
+    tournament.status = 'knockout'
+    
+    version = cache.bump(tournament.id)
+    db.session.commit()
+    jobs.after_commit(live.publish_reload, tournament.id, version)
+    return {'tournament_id': tournament.id, 'created': created}
+
+@bp.route('/cache/stats')
+def cache_stats():
+    """Page cache hit/miss counters for this worker process."""
+    return jsonify(cache.get_cache().stats())
+
+@bp.cli.command('rebuild-standings')
+@click.argument('tournament_id', type=int, required=False)
+@click.option('--check', is_flag=True, help='Only report tournaments whose stored standings have drifted.')
+def rebuild_standings_command(tournament_id, check):
+    """Recompute persisted standings from match results to repair drift."""
+    if tournament_id is None:
+        tournaments = Tournament.query.all()
+    else:
+        tournaments = [Tournament.query.get_or_404(tournament_id)]
+    
+    if check:
+        drifted = [t for t in tournaments if standings.find_drift(t)]
+        for tournament in drifted:
+            click.echo(f'Standings drifted for tournament {tournament.id} ({tournament.name})')
+        click.echo(f'{len(drifted)} of {len(tournaments)} tournament(s) drifted.')
+        return
+    
+    versions = {}
+    for tournament in tournaments:
+        standings.rebuild_standings(tournament)
+        versions[tournament.id] = cache.bump(tournament.id)
+    db.session.commit()
+    for tournament_id, version in versions.items():
+        live.publish_reload(tournament_id, version)
+    click.echo(f'Rebuilt standings for {len(tournaments)} tournament(s).')
+
+@bp.cli.command('generate-schedule')
+@click.argument('tournament_id', type=int)
+@click.option('--venues', type=int, default=None, help='Number of pitches to schedule in parallel.')
+@click.option('--rest', 'rest_minutes', type=int, default=None, help='Minimum minutes between the end of a team\'s match and its next kickoff.')
+@click.option('--blackout', 'blackouts', multiple=True, help='Date (YYYY-MM-DD) or YYYY-MM-DDTHH:MM/YYYY-MM-DDTHH:MM range with no matches.')
+@click.option('--improve', is_flag=True, help='Run the local-search pass to compact the schedule.')
+def generate_schedule_command(tournament_id, venues, rest_minutes, blackouts, improve):
+    """Generate the group-stage round-robin schedule for a tournament."""
+    import timetable
+    
+    try:
+        metrics = generate_round_robin_schedule(
+            tournament_id, venues=venues, rest_minutes=rest_minutes,
+            blackouts=[timetable.parse_blackout(b) for b in blackouts], improve=improve)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for key, value in metrics.items():
+        click.echo(f'{key}: {value}')
@@ -3,7 +3,9 @@ WSGI entry point for the Tournament Manager application.
 This file is used by Gunicorn to serve the application in production.
 """
 
-from app import app
+from app import create_app
+
+app = create_app()
 
 if __name__ == "__main__":
     app.run()